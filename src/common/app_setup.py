@@ -1,8 +1,11 @@
 """Module for additional configuration for application instance"""
+import asyncio
 import os
 import sqlite3
+from asyncio import AbstractEventLoop
 from typing import Any, AnyStr, Callable, Dict, Optional, Type
 
+import httpx
 from cryptography.fernet import Fernet
 from sanic import Sanic
 from sanic.config import SANIC_PREFIX, Config
@@ -11,8 +14,16 @@ from sanic.request import Request
 from sanic.router import Router
 from sanic.signals import SignalRouter
 
-from src.domain.dropbox_utils import DropboxAuthenticator
-from src.resources.monefy_service import (data_aggregation_bp,
+from src.common.page_cache import RenderedPageCache
+from src.domain.aggregation_cache import AggregationResultCache
+from src.domain.backup_index import MonefyBackupListing
+from src.domain.backup_ingestion import IngestedBackupRegistry
+from src.domain.backup_mirror import MonefyBackupMirror
+from src.domain.dropbox_pool import DropboxClientPool
+from src.domain.dropbox_utils import CSV_DIRECTORY_PATH, DropboxAuthenticator
+from src.domain.transaction_ledger import MonefyTransactionLedger
+from src.domain.user_profiles import UserProfileCache
+from src.resources.monefy_service import (analytics_bp, data_aggregation_bp,
                                           dropbox_authentication_bp,
                                           dropbox_webhook_bp, healthcheck_bp,
                                           homepage_bp, monefy_info_bp)
@@ -56,6 +67,7 @@ class ApplicationLauncher(Sanic):
         )
         self.setup_app_config()
         self.setup_app_context()
+        self.setup_app_listeners()
         self.setup_app_blueprints()
 
     def setup_app_config(self) -> None:
@@ -72,6 +84,43 @@ class ApplicationLauncher(Sanic):
             "https://www.dropbox.com/",
         ]
         self.config.SECRET = Fernet.generate_key()
+        self.config.MONEFY_MIRROR_MAX_SIZE = self.config.get(
+            "MONEFY_MIRROR_MAX_SIZE", 256 * 1024 * 1024
+        )
+        self.config.MONEFY_INGESTED_BACKUPS_SIZE = self.config.get(
+            "MONEFY_INGESTED_BACKUPS_SIZE", 64
+        )
+        self.config.MONEFY_AGGREGATION_CACHE_SIZE = self.config.get(
+            "MONEFY_AGGREGATION_CACHE_SIZE", 256 * 1024 * 1024
+        )
+        self.config.MONEFY_INFO_PAGE_SIZE = self.config.get(
+            "MONEFY_INFO_PAGE_SIZE", 100
+        )
+        self.config.MONEFY_INFO_MAX_PAGE_SIZE = self.config.get(
+            "MONEFY_INFO_MAX_PAGE_SIZE", 1000
+        )
+        self.config.MONEFY_PAGE_CACHE_SIZE = self.config.get(
+            "MONEFY_PAGE_CACHE_SIZE", 1024
+        )
+        self.config.MONEFY_PROFILE_CACHE_SIZE = self.config.get(
+            "MONEFY_PROFILE_CACHE_SIZE", 1024
+        )
+        self.config.MONEFY_PROFILE_TTL = self.config.get("MONEFY_PROFILE_TTL", 3600)
+        self.config.DROPBOX_CLIENT_POOL_SIZE = self.config.get(
+            "DROPBOX_CLIENT_POOL_SIZE", 256
+        )
+        self.config.DROPBOX_CLIENT_POOL_TTL = self.config.get(
+            "DROPBOX_CLIENT_POOL_TTL", 300
+        )
+        self.config.DROPBOX_KEEPALIVE_CONNECTIONS = self.config.get(
+            "DROPBOX_KEEPALIVE_CONNECTIONS", 20
+        )
+        self.config.DROPBOX_KEEPALIVE_EXPIRY = self.config.get(
+            "DROPBOX_KEEPALIVE_EXPIRY", 5
+        )
+        self.config.DROPBOX_WEBHOOK_CONCURRENCY = self.config.get(
+            "DROPBOX_WEBHOOK_CONCURRENCY", 4
+        )
 
     def setup_app_context(self) -> None:
         """Method that attach properties and data to ctx object"""
@@ -80,6 +129,36 @@ class ApplicationLauncher(Sanic):
         self.ctx.sqlite_connection = sqlite3.connect(db_path)
         self.ctx.sqlite_cursor = self.ctx.sqlite_connection.cursor()
         self.ctx.token_cryptography = Fernet(Fernet.generate_key())
+        self.ctx.monefy_backup_listing = MonefyBackupListing(self.ctx.sqlite_connection)
+        self.ctx.monefy_backup_mirror = MonefyBackupMirror(
+            os.path.join(CSV_DIRECTORY_PATH, "mirror"),
+            self.config.MONEFY_MIRROR_MAX_SIZE,
+        )
+        self.ctx.monefy_ingested_backups = IngestedBackupRegistry(
+            self.config.MONEFY_INGESTED_BACKUPS_SIZE
+        )
+        # ledger connection is used only by ledger thread
+        self.ctx.monefy_transaction_ledger = MonefyTransactionLedger(
+            sqlite3.connect(db_path, check_same_thread=False)
+        )
+        self.ctx.monefy_aggregation_cache = AggregationResultCache(
+            os.path.join(os.getcwd(), "monefy_results"),
+            self.config.MONEFY_AGGREGATION_CACHE_SIZE,
+        )
+        self.ctx.monefy_page_cache = RenderedPageCache(
+            self.config.MONEFY_PAGE_CACHE_SIZE
+        )
+        self.ctx.monefy_user_profiles = UserProfileCache(
+            self.ctx.sqlite_connection,
+            self.config.MONEFY_PROFILE_CACHE_SIZE,
+            self.config.MONEFY_PROFILE_TTL,
+        )
+        self.ctx.dropbox_upload_semaphore = asyncio.Semaphore(
+            self.config.DROPBOX_WEBHOOK_CONCURRENCY
+        )
+        self.ctx.dropbox_client_pool = DropboxClientPool(
+            self.config.DROPBOX_CLIENT_POOL_SIZE, self.config.DROPBOX_CLIENT_POOL_TTL
+        )
 
         self.ctx.sqlite_cursor.execute(
             """
@@ -93,6 +172,117 @@ class ApplicationLauncher(Sanic):
         )
             """
         )
+        self.ctx.sqlite_cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS dropbox_cursors (
+            account_id TEXT PRIMARY KEY,
+            cursor TEXT
+        )
+            """
+        )
+        self.ctx.sqlite_cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS monefy_backups (
+            account_id TEXT,
+            backup_timestamp TEXT,
+            name TEXT,
+            rev TEXT,
+            content_hash TEXT,
+            size INTEGER,
+            PRIMARY KEY (account_id, backup_timestamp)
+        )
+            """
+        )
+        self.ctx.sqlite_cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS monefy_ledgers (
+            account_id TEXT PRIMARY KEY,
+            backup_key TEXT,
+            length INTEGER,
+            prefix_tail_digest TEXT,
+            prefix_tail_size INTEGER,
+            fieldnames TEXT,
+            amount_scale INTEGER,
+            delimiter TEXT,
+            decimal_separator TEXT,
+            date_format TEXT
+        )
+            """
+        )
+        self.ctx.sqlite_cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS transactions (
+            account_id TEXT,
+            row_number INTEGER,
+            date INTEGER,
+            account TEXT,
+            category TEXT,
+            amount INTEGER,
+            currency TEXT,
+            converted_amount INTEGER,
+            converted_currency TEXT,
+            description TEXT,
+            amount_digits INTEGER,
+            converted_amount_digits INTEGER,
+            PRIMARY KEY (account_id, row_number)
+        )
+            """
+        )
+        for rollup_table in ("daily_rollups", "monthly_rollups"):
+            self.ctx.sqlite_cursor.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {rollup_table} (
+                account_id TEXT,
+                bucket INTEGER,
+                category TEXT,
+                currency TEXT,
+                income INTEGER,
+                expense INTEGER,
+                amount INTEGER,
+                transactions INTEGER,
+                PRIMARY KEY (account_id, bucket, category, currency)
+            )
+                """
+            )
+        self.ctx.sqlite_cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS transactions_account_date
+            ON transactions (account_id, date)
+            """
+        )
+        self.ctx.sqlite_cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS transactions_account_category
+            ON transactions (account_id, category)
+            """
+        )
+
+    def setup_app_listeners(self) -> None:
+        """Method that registers application server lifecycle listeners"""
+        self.register_listener(self.compile_page_templates, "before_server_start")
+        self.register_listener(self.open_dropbox_http_client, "before_server_start")
+        self.register_listener(self.close_dropbox_http_client, "after_server_stop")
+
+    @staticmethod
+    async def compile_page_templates(app: Sanic, _: AbstractEventLoop) -> None:
+        """Compile page templates once before worker starts serving requests"""
+        app.ctx.monefy_page_cache.compile_templates(app.ext.environment)
+
+    @staticmethod
+    async def open_dropbox_http_client(app: Sanic, _: AbstractEventLoop) -> None:
+        """Create HTTP client shared by all async Dropbox clients of the worker"""
+        app.ctx.dropbox_http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0),
+            limits=httpx.Limits(
+                max_keepalive_connections=app.config.DROPBOX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=app.config.DROPBOX_KEEPALIVE_EXPIRY,
+            ),
+        )
+
+    @staticmethod
+    async def close_dropbox_http_client(app: Sanic, _: AbstractEventLoop) -> None:
+        """Close HTTP client shared by async Dropbox clients"""
+        await app.ctx.dropbox_http_client.aclose()
 
     def setup_app_blueprints(self) -> None:
         """Method that adds existed blueprints to application"""
@@ -100,6 +290,7 @@ class ApplicationLauncher(Sanic):
             homepage_bp,
             monefy_info_bp,
             data_aggregation_bp,
+            analytics_bp,
             healthcheck_bp,
             dropbox_webhook_bp,
             dropbox_authentication_bp,
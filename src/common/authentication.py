@@ -33,17 +33,18 @@ using an Authorization header and through secure cookies
 from functools import wraps
 from typing import Any, Callable
 
+import httpx
 import jwt
 from dropbox.oauth import OAuth2FlowResult
 from sanic.exceptions import Unauthorized
 from sanic.log import logger
 from sanic.request import Request
-from sanic.response import HTTPResponse, redirect
-from sanic_ext import render
+from sanic.response import HTTPResponse, html, redirect
 
 from src.common.cookies import set_cookie
 from src.common.utils import get_monefied_app
-from src.domain.dropbox_utils import DropboxClient, DropboxUser
+from src.domain.dropbox_utils import AsyncDropboxClient, DropboxUser
+from src.domain.user_profiles import UserProfile
 
 
 class Authenticator:
@@ -98,6 +99,9 @@ class Authenticator:
             "scope": user_auth_info.scope,
         }
 
+        monefied_app = get_monefied_app()
+        monefied_app.ctx.monefy_page_cache.invalidate(auth_info["account_id"])
+        monefied_app.ctx.monefy_user_profiles.discard(auth_info["account_id"])
         if user_info := self.get_user_if_exist(auth_info):
             self.update_user(auth_info)
             _, user_uuid, _, _, name, avatar = user_info
@@ -112,9 +116,9 @@ class Authenticator:
             return response
         logger.info("authenticate new user")
         dropbox_client = self.get_user_dropbox_client(
-            request, auth_info["access_token"]
+            request, auth_info["access_token"], auth_info["account_id"]
         )
-        dropbox_user_info = dropbox_client.get_dropbox_user_info()
+        dropbox_user_info = await dropbox_client.get_dropbox_user_info()
         jwt_token = self.get_encoded_jwt_token(
             request,
             dropbox_user_info.user_uuid,
@@ -207,11 +211,12 @@ class Authenticator:
         request: Request, authentication_info: dict[Any, Any], jwt_token: str
     ) -> HTTPResponse:
         """Render response after authentication"""
-        response = await render(
-            "auth.html",
-            content_type="text/html; charset=utf-8",
-            context={"message": "success auth with web app"},
-        )
+        page_cache = get_monefied_app().ctx.monefy_page_cache
+        if (auth_page := page_cache.get("auth.html")) is None:
+            auth_page = await page_cache.render(
+                "auth.html", {"message": "success auth with web app"}
+            )
+        response = html(auth_page)
         set_cookie(
             response=response,
             domain="127.0.0.1" if request.app.config.get("LOCAL") else "monefied.xyz",
@@ -225,21 +230,30 @@ class Authenticator:
         return response
 
     def get_user_dropbox_client(
-        self, request: Request, new_access_token: str | None = None
-    ) -> DropboxClient:
+        self,
+        request: Request,
+        new_access_token: str | None = None,
+        account_id: str | None = None,
+    ) -> AsyncDropboxClient:
         """Get user dropbox client after authentication or from existed jwt token"""
         monefied_app = get_monefied_app()
 
+        if new_access_token and account_id is None:
+            return AsyncDropboxClient(new_access_token)
         if new_access_token:
-            return DropboxClient(new_access_token)
+            return monefied_app.ctx.dropbox_client_pool.get_client(
+                account_id, new_access_token
+            )
         jwt_data = self.get_decoded_jwt_token(request)
-        user_access_token = monefied_app.ctx.sqlite_cursor.execute(
+        user_access_token, user_account_id = monefied_app.ctx.sqlite_cursor.execute(
             f"""
-                    SELECT access_token FROM users
+                    SELECT access_token, account_id FROM users
                     WHERE uuid = '{jwt_data["user_uuid"]}'
                     """
-        ).fetchone()[0]
-        return DropboxClient(user_access_token)
+        ).fetchone()
+        return monefied_app.ctx.dropbox_client_pool.get_client(
+            user_account_id, user_access_token
+        )
 
     @staticmethod
     def get_decoded_jwt_token(request: Request) -> dict[str, str]:
@@ -256,7 +270,10 @@ class Authenticator:
 
     async def render_homepage_for_user_or_guest(self, request: Request) -> HTTPResponse:
         """Method that render homepage response
-        depends on user authentication status"""
+        depends on user authentication status.
+        User and guest homepages are rendered once until user profile changes,
+        user profile is served from cache and refreshed in background"""
+        page_cache = get_monefied_app().ctx.monefy_page_cache
         if request.cookies.get("jwt_token"):
             try:
                 dp_client = self.get_user_dropbox_client(request)
@@ -264,25 +281,51 @@ class Authenticator:
                 response = redirect("/")
                 del response.cookies["jwt_token"]
                 return response
-            user_info = dp_client.get_dropbox_user_info()
-            response = await render(
+            user_profiles = get_monefied_app().ctx.monefy_user_profiles
+            if (user_profile := user_profiles.get(dp_client.account_id)) is None:
+                await self.refresh_user_profile(dp_client)
+                jwt_data = self.get_decoded_jwt_token(request)
+                user_profile = user_profiles.get(dp_client.account_id) or UserProfile(
+                    jwt_data["user_name"], jwt_data["user_photo"]
+                )
+            elif user_profiles.is_stale(user_profile):
+                request.app.add_task(self.refresh_user_profile(dp_client))
+            homepage = page_cache.get("home.html", dp_client.account_id)
+            if homepage is None:
+                homepage = await page_cache.render(
+                    "home.html",
+                    {
+                        "message": f"Hello {user_profile.name}",
+                        "avatar": user_profile.avatar,
+                        "name": user_profile.name,
+                        "authenticated": True,
+                    },
+                    dp_client.account_id,
+                )
+            return html(homepage)
+        if (homepage := page_cache.get("home.html")) is None:
+            homepage = await page_cache.render(
                 "home.html",
-                content_type="text/html; charset=utf-8",
-                context={
-                    "message": f"Hello {user_info.user_name}",
-                    "avatar": user_info.user_profile_photo_url,
-                    "name": user_info.user_name,
-                    "authenticated": True,
-                },
+                {"message": "Please authenticate with Dropbox", "authenticated": False},
             )
-            return response
-        return await render(
-            "home.html",
-            context={
-                "message": "Please authenticate with Dropbox",
-                "authenticated": False,
-            },
-        )
+        return html(homepage)
+
+    @staticmethod
+    async def refresh_user_profile(dropbox_client: AsyncDropboxClient) -> None:
+        """Refresh user profile from Dropbox and forget rendered user pages
+        if profile changed"""
+        monefied_app = get_monefied_app()
+        try:
+            profile_changed = await monefied_app.ctx.monefy_user_profiles.refresh(
+                dropbox_client
+            )
+        except httpx.HTTPError as refresh_error:
+            logger.warning(
+                f"profile refresh of {dropbox_client.account_id} failed: {refresh_error}"
+            )
+            return
+        if profile_changed:
+            monefied_app.ctx.monefy_page_cache.invalidate(dropbox_client.account_id)
 
 
 def check_jwt_token(request: Request) -> bool:
@@ -0,0 +1,124 @@
+"""Validators of conditional GET and range requests for responses
+built from Monefy backup"""
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any
+
+from sanic.request import Request
+
+from src.common.http_codes import RangeNotSatisfiable
+from src.domain.backup_index import MONEFY_BACKUP_FILE_PATTERN
+
+
+@dataclass
+class BackupValidators:
+    """
+    Strong ETag of response derived from backup revision and request options
+    and Last-Modified time from Monefy backup file name timestamp
+    """
+
+    etag: str
+    last_modified: datetime | None = None
+
+    @classmethod
+    def for_backup(
+        cls, monefy_backup: dict[str, Any], response_key: tuple[Any, ...]
+    ) -> "BackupValidators":
+        """Get validators of response of provided key built from Monefy backup"""
+        etag = f'"{hashlib.sha256(repr(response_key).encode()).hexdigest()[:32]}"'
+        if not (
+            backup_match := MONEFY_BACKUP_FILE_PATTERN.fullmatch(monefy_backup["name"])
+        ):
+            return cls(etag)
+        backup_datetime = datetime.strptime(backup_match.group(1), "%Y-%m-%d_%H-%M-%S")
+        return cls(etag, backup_datetime.replace(tzinfo=timezone.utc))
+
+    @property
+    def headers(self) -> dict[str, str]:
+        """Get ETag and Last-Modified response headers"""
+        if self.last_modified is None:
+            return {"ETag": self.etag}
+        return {
+            "ETag": self.etag,
+            "Last-Modified": format_datetime(self.last_modified, usegmt=True),
+        }
+
+    def is_not_modified(self, request: Request) -> bool:
+        """Check if conditional request validators match response.
+        If-None-Match takes precedence over If-Modified-Since"""
+        if if_none_match := request.headers.get("If-None-Match"):
+            etags = {
+                etag.strip().removeprefix("W/") for etag in if_none_match.split(",")
+            }
+            return "*" in etags or self.etag in etags
+        if_modified_since = request.headers.get("If-Modified-Since")
+        if not if_modified_since or self.last_modified is None:
+            return False
+        try:
+            return self.last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+
+    def matches_if_range(self, request: Request) -> bool:
+        """Check if Range header should be applied. If-Range entity tag is compared
+        strongly with ETag and If-Range date should be equal to Last-Modified"""
+        if not (if_range := request.headers.get("If-Range")):
+            return True
+        if if_range.startswith('"'):
+            return if_range == self.etag
+        if if_range.startswith("W/") or self.last_modified is None:
+            return False
+        try:
+            return self.last_modified == parsedate_to_datetime(if_range)
+        except (TypeError, ValueError):
+            return False
+
+
+@dataclass
+class ByteRange:
+    """Single byte range of file requested with Range header, end is inclusive"""
+
+    start: int
+    end: int
+    total: int
+
+    @property
+    def size(self) -> int:
+        """Get range size in bytes"""
+        return self.end - self.start + 1
+
+    @classmethod
+    def from_request(cls, request: Request, total: int) -> "ByteRange | None":
+        """
+        Parse 'bytes=start-end', 'bytes=start-' or 'bytes=-suffix' Range header,
+        range end is clamped to file end. Whole file is sent for missing, invalid
+        or multiple ranges Range header
+        """
+        range_header = request.headers.get("Range", "")
+        unit, _, byte_range = range_header.partition("=")
+        if unit.strip().lower() != "bytes" or "," in byte_range:
+            return None
+        first_byte, separator, last_byte = byte_range.strip().partition("-")
+        if (
+            not separator
+            or not (first_byte or last_byte)
+            or not all(
+                position.isdigit() for position in (first_byte, last_byte) if position
+            )
+        ):
+            return None
+        if first_byte:
+            start = int(first_byte)
+            if last_byte and int(last_byte) < start:
+                return None
+            end = min(int(last_byte), total - 1) if last_byte else total - 1
+        else:
+            start, end = max(total - int(last_byte), 0), total - 1
+        if start > end:
+            raise RangeNotSatisfiable(
+                f"Requested range not satisfiable for {total} bytes",
+                total,
+            )
+        return cls(start, end, total)
@@ -9,3 +9,16 @@ class NotAcceptable(SanicException):
 
     status_code = 406
     quiet = True
+
+
+class RangeNotSatisfiable(SanicException):
+    """
+    **Status**: 416 Range Not Satisfiable
+    """
+
+    status_code = 416
+    quiet = True
+
+    def __init__(self, message: str, total: int) -> None:
+        super().__init__(message)
+        self.headers = {"Content-Range": f"bytes */{total}"}
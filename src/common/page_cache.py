@@ -0,0 +1,76 @@
+"""Templates compiled once at server start and cache of rendered pages"""
+from collections import OrderedDict
+from typing import Any
+
+from jinja2 import Environment, Template
+
+PAGE_TEMPLATES = ("auth.html", "home.html", "info.html")
+
+# template name and account id of user page, guest pages have no account id
+RenderedPageKey = tuple[str, str | None]
+
+
+class RenderedPageCache:
+    """
+    Templates compiled once at server start and bounded cache of rendered pages
+    that depend only on user profile, such as guest and user homepages.
+    User pages are invalidated when user profile or Monefy backup changes
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.environment: Environment | None = None
+        self.templates: dict[str, Template] = {}
+        self.rendered_pages: OrderedDict[RenderedPageKey, str] = OrderedDict()
+
+    def compile_templates(
+        self, environment: Environment, template_names: tuple[str, ...] = PAGE_TEMPLATES
+    ) -> None:
+        """Compile templates of application pages once"""
+        self.environment = environment
+        self.templates = {
+            template_name: environment.get_template(template_name)
+            for template_name in template_names
+        }
+        self.rendered_pages.clear()
+
+    def get_template(self, template_name: str) -> Template:
+        """Get compiled template, template that wasn't compiled at start
+        is compiled on first use"""
+        if template_name not in self.templates:
+            if self.environment is None:
+                raise RuntimeError("page templates are not compiled")
+            self.templates[template_name] = self.environment.get_template(template_name)
+        return self.templates[template_name]
+
+    def get(self, template_name: str, account_id: str | None = None) -> str | None:
+        """Get rendered page of user or guest page"""
+        page_key = (template_name, account_id)
+        if (rendered_page := self.rendered_pages.get(page_key)) is not None:
+            self.rendered_pages.move_to_end(page_key)
+        return rendered_page
+
+    async def render(
+        self,
+        template_name: str,
+        context: dict[str, Any],
+        account_id: str | None = None,
+    ) -> str:
+        """Render page with compiled template and remember rendered page"""
+        template = self.get_template(template_name)
+        rendered_page = (
+            await template.render_async(**context)
+            if template.environment.is_async
+            else template.render(**context)
+        )
+        self.rendered_pages[(template_name, account_id)] = rendered_page
+        while len(self.rendered_pages) > self.max_size:
+            self.rendered_pages.popitem(last=False)
+        return rendered_page
+
+    def invalidate(self, account_id: str) -> None:
+        """Forget rendered pages of user after profile or backup change"""
+        for page_key in [
+            page_key for page_key in self.rendered_pages if page_key[1] == account_id
+        ]:
+            del self.rendered_pages[page_key]
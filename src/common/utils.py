@@ -1,21 +1,42 @@
 """Common utilities for application"""
 import json
 from decimal import Decimal
+from typing import Any
 
 from sanic import Sanic
 
+try:
+    import ujson
+except ImportError:  # pragma: no cover - ujson isn't installed on every platform
+    ujson = None  # type: ignore[assignment]
+
 
 def get_monefied_app() -> Sanic:
     """Get sanic monefy application instance"""
     return Sanic.get_app("Monefy-Web-App")
 
 
-class DecimalEncoder(json.JSONEncoder):
-    """Extend JSONEncoder with Decimal type checking"""
-
-    def default(self, o):
-
-        if isinstance(o, Decimal):
-            return str(o)
-
-        return json.JSONEncoder.default(self, o)
+def format_decimals(json_data: Any) -> Any:
+    """Replace Decimal values of json like object with strings,
+    so json data can be encoded without per value encoder callbacks"""
+    if isinstance(json_data, Decimal):
+        return str(json_data)
+    if isinstance(json_data, dict):
+        return {key: format_decimals(value) for key, value in json_data.items()}
+    if isinstance(json_data, (list, tuple)):
+        return [format_decimals(value) for value in json_data]
+    return json_data
+
+
+def json_dumps(json_data: Any, pretty: bool = False) -> str:
+    """
+    Encode json data without Decimal values with ujson if it is installed
+    or with standard json module. Json is compact unless pretty one is requested
+    """
+    if ujson is not None:
+        return ujson.dumps(
+            json_data, indent=4 if pretty else 0, escape_forward_slashes=False
+        )
+    if pretty:
+        return json.dumps(json_data, indent=4)
+    return json.dumps(json_data, separators=(",", ":"))
@@ -0,0 +1,150 @@
+"""Content addressed on-disk cache of Monefy data aggregation result files"""
+import hashlib
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable
+
+from sanic.log import logger
+
+# account id, backup key, format, summarized, pretty, group by and transaction query
+AggregationCacheKey = tuple[str, str, str, bool, bool, str, str]
+
+
+class AggregationResultCache:
+    """
+    Aggregation result files addressed by digest of account, backup revision
+    and aggregation arguments. Results are written atomically, so concurrent
+    requests never see partially written file, least recently used results
+    are evicted when cache exceeds its size limit. Result sizes are tracked
+    in memory, results returned less than serve time ago aren't evicted,
+    so they can still be opened for response.
+    Account results aren't served after Dropbox webhook reports account changes
+    until account backup is aggregated again
+    """
+
+    def __init__(
+        self, directory_path: str, max_size: int, serve_time: float = 60
+    ) -> None:
+        self.directory_path = directory_path
+        self.max_size = max_size
+        self.serve_time = serve_time
+        self.stale_accounts: set[str] = set()
+        # result file sizes in least recently used order
+        self.results: OrderedDict[str, int] = OrderedDict()
+        self.results_loaded = False
+        self.cache_size = 0
+        self.served_results: dict[str, float] = {}
+
+    def result_path(self, cache_key: AggregationCacheKey, file_format: str) -> str:
+        """Get content addressed path of result file"""
+        key_digest = hashlib.sha256(repr(cache_key).encode()).hexdigest()
+        return os.path.join(self.directory_path, f"{key_digest}.{file_format}")
+
+    def load_results(self) -> None:
+        """Scan result files written by previous runs once"""
+        if self.results_loaded:
+            return
+        self.results_loaded = True
+        if not os.path.isdir(self.directory_path):
+            return
+        results = []
+        with os.scandir(self.directory_path) as cache_entries:
+            for entry in cache_entries:
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    entry_stat = entry.stat()
+                    results.append(
+                        (entry_stat.st_mtime, entry_stat.st_size, entry.path)
+                    )
+        for _, size, result_path in sorted(results):
+            self.add_result(result_path, size)
+
+    def add_result(self, result_path: str, size: int) -> None:
+        """Track result file size as the most recently used result"""
+        self.cache_size += size - self.results.pop(result_path, 0)
+        self.results[result_path] = size
+
+    def discard_result(self, result_path: str) -> None:
+        """Stop tracking removed result file"""
+        self.cache_size -= self.results.pop(result_path, 0)
+        self.served_results.pop(result_path, None)
+
+    def get(self, cache_key: AggregationCacheKey) -> str | None:
+        """Get cached result file path if result was already written"""
+        if cache_key[0] in self.stale_accounts:
+            return None
+        self.load_results()
+        result_path = self.result_path(cache_key, cache_key[2])
+        try:
+            os.utime(result_path)
+            result_size = self.results.get(result_path)
+            if result_size is None:
+                # result written by another worker process
+                result_size = os.path.getsize(result_path)
+        except FileNotFoundError:
+            self.discard_result(result_path)
+            return None
+        self.add_result(result_path, result_size)
+        self.served_results[result_path] = time.monotonic()
+        logger.info(f"{os.path.basename(result_path)} found in aggregation cache")
+        return result_path
+
+    def store(
+        self,
+        cache_key: AggregationCacheKey | None,
+        file_format: str,
+        write_result: Callable[[str], Any],
+    ) -> str:
+        """
+        Write result file with provided function to temporary path
+        and atomically add it to cache. Result without cache key gets unique path
+        and is kept only until it is evicted
+        """
+        self.load_results()
+        os.makedirs(self.directory_path, exist_ok=True)
+        result_path = (
+            self.result_path(cache_key, file_format)
+            if cache_key
+            else os.path.join(self.directory_path, f"{uuid.uuid4().hex}.{file_format}")
+        )
+        temporary_path = f"{result_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            write_result(temporary_path)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+        result_size = os.path.getsize(temporary_path)
+        os.replace(temporary_path, result_path)
+        if cache_key:
+            self.stale_accounts.discard(cache_key[0])
+        self.add_result(result_path, result_size)
+        self.served_results[result_path] = time.monotonic()
+        self.evict(keep=result_path)
+        return result_path
+
+    def evict(self, keep: str | None = None) -> None:
+        """Remove least recently used results until cache fits its size limit,
+        recently served results are kept"""
+        now = time.monotonic()
+        self.served_results = {
+            result_path: served_at
+            for result_path, served_at in self.served_results.items()
+            if now - served_at < self.serve_time
+        }
+        for result_path in list(self.results):
+            if self.cache_size <= self.max_size:
+                break
+            if result_path == keep or result_path in self.served_results:
+                continue
+            logger.info(f"evict {os.path.basename(result_path)} from aggregation cache")
+            try:
+                os.remove(result_path)
+            except FileNotFoundError:
+                pass
+            self.discard_result(result_path)
+
+    def invalidate(self, account_id: str) -> None:
+        """Stop serving account results until account backup is aggregated again"""
+        self.stale_accounts.add(account_id)
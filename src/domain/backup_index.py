@@ -0,0 +1,144 @@
+"""Incremental index of Monefy backup files stored in user Dropbox storage"""
+import bisect
+import re
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Any
+
+MONEFY_BACKUP_FILE_PATTERN = re.compile(
+    r"monefy-(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})\.csv"
+)
+
+
+@dataclass
+class MonefyBackupIndex:
+    """
+    Sorted index of Monefy backup files of one Dropbox account
+    with Dropbox listing cursor to fetch only changed folder entries.
+    Backup timestamp format (%Y-%m-%d_%H-%M-%S) sorts the same way as datetime,
+    so timestamps are kept as strings
+    """
+
+    cursor: str | None = None
+    timestamps: list[str] = field(default_factory=list)
+    backups: dict[str, dict[str, Any]] = field(default_factory=dict)
+
+    def add(self, backup_timestamp: str, backup: dict[str, Any]) -> None:
+        """Add backup file metadata to index"""
+        if backup_timestamp not in self.backups:
+            bisect.insort(self.timestamps, backup_timestamp)
+        self.backups[backup_timestamp] = backup
+
+    def remove(self, backup_timestamp: str) -> None:
+        """Remove backup file metadata from index"""
+        if self.backups.pop(backup_timestamp, None) is not None:
+            self.timestamps.pop(bisect.bisect_left(self.timestamps, backup_timestamp))
+
+    def apply_entries(
+        self, entries: list[dict[str, Any]]
+    ) -> tuple[list[tuple[str, dict[str, Any]]], list[str]]:
+        """Apply Dropbox folder listing entries to index,
+        return added backups and removed backup timestamps"""
+        added_backups, removed_timestamps = [], []
+        for entry in entries:
+            if not (
+                backup_match := MONEFY_BACKUP_FILE_PATTERN.fullmatch(entry["name"])
+            ):
+                continue
+            backup_timestamp = backup_match.group(1)
+            if entry.get(".tag", "file") == "file":
+                backup = {
+                    "name": entry["name"],
+                    "rev": entry.get("rev"),
+                    "content_hash": entry.get("content_hash"),
+                    "size": entry.get("size"),
+                }
+                self.add(backup_timestamp, backup)
+                added_backups.append((backup_timestamp, backup))
+            elif entry[".tag"] == "deleted":
+                self.remove(backup_timestamp)
+                removed_timestamps.append(backup_timestamp)
+        return added_backups, removed_timestamps
+
+    def latest(self) -> tuple[str, dict[str, Any]] | None:
+        """Get latest backup timestamp and metadata"""
+        if not self.timestamps:
+            return None
+        return self.timestamps[-1], self.backups[self.timestamps[-1]]
+
+
+class MonefyBackupListing:
+    """Per account Monefy backup indexes persisted to application database"""
+
+    def __init__(self, sqlite_connection: sqlite3.Connection) -> None:
+        self.sqlite_connection = sqlite_connection
+        self.backup_indexes: dict[str, MonefyBackupIndex] = {}
+
+    def get_index(self, account_id: str) -> MonefyBackupIndex:
+        """Get account backup index from memory or load it from database"""
+        if account_id in self.backup_indexes:
+            return self.backup_indexes[account_id]
+
+        backup_index = MonefyBackupIndex()
+        cursor_row = self.sqlite_connection.execute(
+            "SELECT cursor FROM dropbox_cursors WHERE account_id = ?", (account_id,)
+        ).fetchone()
+        if cursor_row:
+            backup_index.cursor = cursor_row[0]
+            backup_rows = self.sqlite_connection.execute(
+                """
+                SELECT backup_timestamp, name, rev, content_hash, size FROM monefy_backups
+                WHERE account_id = ?
+                """,
+                (account_id,),
+            )
+            for timestamp, name, rev, content_hash, size in backup_rows:
+                backup = {"name": name, "rev": rev, "content_hash": content_hash}
+                backup["size"] = size
+                backup_index.add(timestamp, backup)
+        self.backup_indexes[account_id] = backup_index
+        return backup_index
+
+    def save_changes(
+        self,
+        account_id: str,
+        backup_index: MonefyBackupIndex,
+        added_backups: list[tuple[str, dict[str, Any]]],
+        removed_timestamps: list[str],
+    ) -> None:
+        """Persist account listing cursor and changed backup entries"""
+        self.sqlite_connection.executemany(
+            """
+            INSERT OR REPLACE INTO monefy_backups
+            (account_id, backup_timestamp, name, rev, content_hash, size)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    account_id,
+                    timestamp,
+                    backup["name"],
+                    backup["rev"],
+                    backup["content_hash"],
+                    backup["size"],
+                )
+                for timestamp, backup in added_backups
+            ],
+        )
+        self.sqlite_connection.executemany(
+            "DELETE FROM monefy_backups WHERE account_id = ? AND backup_timestamp = ?",
+            [(account_id, timestamp) for timestamp in removed_timestamps],
+        )
+        self.sqlite_connection.execute(
+            "INSERT OR REPLACE INTO dropbox_cursors (account_id, cursor) VALUES (?, ?)",
+            (account_id, backup_index.cursor),
+        )
+        self.sqlite_connection.commit()
+
+    def reset_index(self, account_id: str) -> MonefyBackupIndex:
+        """Drop account backup index when Dropbox listing cursor was reset"""
+        self.sqlite_connection.execute(
+            "DELETE FROM monefy_backups WHERE account_id = ?", (account_id,)
+        )
+        self.backup_indexes[account_id] = MonefyBackupIndex()
+        return self.backup_indexes[account_id]
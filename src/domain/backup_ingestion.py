@@ -0,0 +1,397 @@
+"""Incremental ingestion state of append-only Monefy backup files"""
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any, AsyncIterable, AsyncIterator
+
+import aiofiles
+from sanic.log import logger
+
+from src.common.utils import get_monefied_app
+from src.domain.backup_mirror import MonefyBackupMirror
+from src.domain.csv_stream import (MonefyCsvStreamParser,
+                                   iter_monefy_transactions)
+from src.domain.transaction_store import MonefyTransactionStore
+
+if TYPE_CHECKING:
+    from src.domain.dropbox_utils import AsyncDropboxClient
+    from src.domain.transaction_ledger import RollupRow
+    from src.domain.transaction_query import TransactionQuery
+
+PREFIX_TAIL_SIZE = 4 * 1024
+CONTENT_HASH_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+def monefy_backup_key(monefy_backup: dict[str, Any]) -> str:
+    """Get key of Monefy backup content in local mirror"""
+    return monefy_backup.get("content_hash") or monefy_backup["rev"]
+
+
+class DropboxContentHasher:
+    """
+    Dropbox content hash calculated by chunks:
+    sha256 of concatenated sha256 digests of every 4 MB block of file
+    """
+
+    def __init__(self) -> None:
+        self.block_digests = hashlib.sha256()
+        self.block = hashlib.sha256()
+        self.block_size = 0
+
+    def update(self, content: bytes) -> None:
+        """Add file content chunk to content hash"""
+        while content:
+            block_part = content[: CONTENT_HASH_BLOCK_SIZE - self.block_size]
+            self.block.update(block_part)
+            self.block_size += len(block_part)
+            content = content[len(block_part) :]
+            if self.block_size == CONTENT_HASH_BLOCK_SIZE:
+                self.block_digests.update(self.block.digest())
+                self.block, self.block_size = hashlib.sha256(), 0
+
+    def hexdigest(self) -> str:
+        """Get Dropbox content hash of added file content"""
+        block_digests = self.block_digests.copy()
+        if self.block_size:
+            block_digests.update(self.block.digest())
+        return block_digests.hexdigest()
+
+
+@dataclass
+class IngestedMonefyBackup:
+    """
+    Last ingested Monefy backup of account.
+    Byte length and checksum of prefix last bytes are used to check
+    that new backup only appends transactions to ingested one
+    """
+
+    backup_key: str
+    length: int
+    prefix_tail_digest: str
+    prefix_tail_size: int
+    fieldnames: list[str]
+    transactions: MonefyTransactionStore
+
+    def can_be_prefix_of(self, monefy_backup: dict[str, Any]) -> bool:
+        """Check if new backup can start with ingested backup content"""
+        return (monefy_backup.get("size") or 0) > self.length
+
+    def matches_prefix_tail(self, prefix_tail: bytes) -> bool:
+        """Check if new backup bytes at the end of ingested prefix are unchanged"""
+        return hashlib.sha256(prefix_tail).hexdigest() == self.prefix_tail_digest
+
+
+class BackupPrefixTracker:
+    """Track length and last bytes of Monefy backup content read by chunks"""
+
+    def __init__(self, initial_length: int = 0, initial_tail: bytes = b"") -> None:
+        self.length = initial_length
+        self.tail = initial_tail
+
+    def update(self, content: bytes) -> None:
+        """Add backup content chunk"""
+        self.length += len(content)
+        self.tail = (self.tail + content)[-PREFIX_TAIL_SIZE:]
+
+    async def track(self, chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+        """Add backup content chunks while they are passed to consumer"""
+        async for chunk in chunks:
+            self.update(chunk)
+            yield chunk
+
+    def ingested_backup(
+        self,
+        backup_key: str,
+        fieldnames: list[str] | None,
+        transactions: MonefyTransactionStore,
+    ) -> IngestedMonefyBackup | None:
+        """Get ingestion state of backup that ends with complete csv record"""
+        if fieldnames is None or not self.tail.endswith(b"\n"):
+            return None
+        return IngestedMonefyBackup(
+            backup_key=backup_key,
+            length=self.length,
+            prefix_tail_digest=hashlib.sha256(self.tail).hexdigest(),
+            prefix_tail_size=len(self.tail),
+            fieldnames=fieldnames,
+            transactions=transactions,
+        )
+
+
+class IngestedBackupRegistry:
+    """Bounded registry of last ingested Monefy backups by Dropbox account"""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.ingested_backups: OrderedDict[str, IngestedMonefyBackup] = OrderedDict()
+
+    def get(self, account_id: str) -> IngestedMonefyBackup | None:
+        """Get last ingested account backup"""
+        if ingested_backup := self.ingested_backups.get(account_id):
+            self.ingested_backups.move_to_end(account_id)
+        return ingested_backup
+
+    def set(self, account_id: str, ingested_backup: IngestedMonefyBackup) -> None:
+        """Remember last ingested account backup"""
+        self.ingested_backups[account_id] = ingested_backup
+        self.ingested_backups.move_to_end(account_id)
+        while len(self.ingested_backups) > self.max_size:
+            self.ingested_backups.popitem(last=False)
+
+
+class MonefyBackupIngestion:
+    """
+    Incremental ingestion of Dropbox account Monefy backups.
+    Backups are read from local mirror or downloaded to it chunk by chunk,
+    backup that appends transactions to the last ingested one is fetched
+    by its new tail only. Last ingested backup is kept in memory
+    and persisted to transaction ledger
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(
+        self,
+        dropbox_client: "AsyncDropboxClient",
+        backup_mirror: MonefyBackupMirror | None = None,
+    ) -> None:
+        monefied_app = get_monefied_app()
+
+        self.dropbox_client = dropbox_client
+        self.backup_mirror = backup_mirror or monefied_app.ctx.monefy_backup_mirror
+        self.ingested_backups = monefied_app.ctx.monefy_ingested_backups
+        self.transaction_ledger = monefied_app.ctx.monefy_transaction_ledger
+
+    @property
+    def account_id(self) -> str | None:
+        """Dropbox account of ingested backups"""
+        return self.dropbox_client.account_id
+
+    async def ingest_monefy_backup(
+        self, monefy_backup: dict[str, Any]
+    ) -> MonefyTransactionStore:
+        """
+        Parse Monefy backup csv file chunk by chunk to columnar transaction store.
+        If backup appends transactions to the last ingested account backup,
+        only new tail of backup is downloaded and parsed
+        """
+        backup_key = monefy_backup_key(monefy_backup)
+        ingested_backup = await self.get_ingested_backup()
+
+        logger.info(f"reading: {monefy_backup['name']}")
+        if ingested_backup and ingested_backup.backup_key == backup_key:
+            return ingested_backup.transactions
+        if ingested_backup and ingested_backup.can_be_prefix_of(monefy_backup):
+            transactions = await self.ingest_monefy_backup_tail(
+                monefy_backup, ingested_backup
+            )
+            if transactions is not None:
+                return transactions
+
+        prefix_tracker = BackupPrefixTracker()
+        monefy_csv_parser = MonefyCsvStreamParser()
+        parsed_transactions = iter_monefy_transactions(
+            prefix_tracker.track(self.iter_monefy_backup_chunks(monefy_backup)),
+            monefy_csv_parser,
+        )
+        # csv dialect is detected before the first transaction is parsed
+        transactions = None
+        async for transaction in parsed_transactions:
+            if transactions is None:
+                transactions = MonefyTransactionStore(monefy_csv_parser.csv_dialect)
+            transactions.append(transaction)
+        if transactions is None:
+            transactions = MonefyTransactionStore(monefy_csv_parser.csv_dialect)
+        if new_ingested_backup := prefix_tracker.ingested_backup(
+            backup_key, monefy_csv_parser.fieldnames, transactions
+        ):
+            await self.set_ingested_backup(new_ingested_backup)
+        return transactions
+
+    async def ingest_monefy_backup_tail(
+        self, monefy_backup: dict[str, Any], ingested_backup: IngestedMonefyBackup
+    ) -> MonefyTransactionStore | None:
+        """
+        Download only bytes appended to last ingested backup with ranged request
+        and parse new transactions. Ranged download starts with last bytes
+        of ingested backup to check that they weren't changed,
+        assembled backup is verified by Dropbox content hash.
+        Return None if new backup doesn't start with ingested backup
+        """
+        if not (ingested_path := self.backup_mirror.get(ingested_backup.backup_key)):
+            return None
+        prefix_tail_start = ingested_backup.length - ingested_backup.prefix_tail_size
+        _, response = await self.dropbox_client.files_download_range(
+            self.dropbox_client.monefy_backup_files_folder + monefy_backup["name"],
+            prefix_tail_start,
+        )
+        prefix_tail = response.content[: ingested_backup.prefix_tail_size]
+        backup_tail = response.content[ingested_backup.prefix_tail_size :]
+        if response.status_code != HTTPStatus.PARTIAL_CONTENT or (
+            not ingested_backup.matches_prefix_tail(prefix_tail)
+        ):
+            logger.info(f"{monefy_backup['name']} doesn't extend ingested backup")
+            return None
+
+        try:
+            monefy_csv_parser = MonefyCsvStreamParser(
+                ingested_backup.transactions.csv_dialect, ingested_backup.fieldnames
+            )
+            transactions = ingested_backup.transactions.copy()
+            transactions.extend(
+                monefy_csv_parser.feed(backup_tail.decode("utf-8"), final=True)
+            )
+            await self.assemble_monefy_backup(ingested_path, backup_tail, monefy_backup)
+        except (OSError, ValueError) as ingestion_error:
+            logger.warning(f"full {monefy_backup['name']} fetch: {ingestion_error}")
+            return None
+
+        logger.info(
+            f"ingested {len(backup_tail)} new bytes of {monefy_backup['name']}, "
+            f"{len(transactions) - len(ingested_backup.transactions)} new transactions"
+        )
+        prefix_tracker = BackupPrefixTracker(prefix_tail_start, prefix_tail)
+        prefix_tracker.update(backup_tail)
+        if new_ingested_backup := prefix_tracker.ingested_backup(
+            monefy_backup_key(monefy_backup),
+            ingested_backup.fieldnames,
+            transactions,
+        ):
+            await self.set_ingested_backup(new_ingested_backup, ingested_backup)
+        return transactions
+
+    async def get_ingested_backup(self) -> IngestedMonefyBackup | None:
+        """Get last ingested account backup from memory or load it from ledger"""
+        if not self.account_id:
+            return None
+        if ingested_backup := self.ingested_backups.get(self.account_id):
+            return ingested_backup
+        if ingested_backup := await self.transaction_ledger.run(
+            self.transaction_ledger.load_ingested_backup, self.account_id
+        ):
+            self.ingested_backups.set(self.account_id, ingested_backup)
+        return ingested_backup
+
+    async def query_ingested_backup(
+        self, monefy_backup: dict[str, Any], transaction_query: "TransactionQuery"
+    ) -> MonefyTransactionStore | None:
+        """
+        Select transactions matching query filters from ledger
+        if backup is stored there, but isn't kept in memory.
+        Return None if transactions should be filtered in memory
+        """
+        if (
+            not self.account_id
+            or not transaction_query.filters_rows
+            or self.ingested_backups.get(self.account_id)
+        ):
+            return None
+        return await self.transaction_ledger.run(
+            self.transaction_ledger.select_transactions,
+            self.account_id,
+            monefy_backup_key(monefy_backup),
+            transaction_query,
+        )
+
+    async def get_ingested_backup_key(
+        self, transactions: MonefyTransactionStore | None = None
+    ) -> str | None:
+        """Get key of last ingested account backup kept in memory or stored in ledger.
+        If transactions are provided, they must be transactions of backup in memory"""
+        if not self.account_id:
+            return None
+        ingested_backup = self.ingested_backups.get(self.account_id)
+        if transactions is None and not ingested_backup:
+            return await self.transaction_ledger.run(
+                self.transaction_ledger.get_backup_key, self.account_id
+            )
+        if not ingested_backup or (
+            transactions is not None
+            and ingested_backup.transactions is not transactions
+        ):
+            return None
+        return ingested_backup.backup_key
+
+    async def get_monefy_rollups(
+        self, transactions: MonefyTransactionStore, rollup_table: str
+    ) -> list["RollupRow"] | None:
+        """Get ledger rollups if provided transactions are last ingested account backup"""
+        if not self.account_id:
+            return None
+        ingested_backup = self.ingested_backups.get(self.account_id)
+        if not ingested_backup or ingested_backup.transactions is not transactions:
+            return None
+        return await self.transaction_ledger.run(
+            self.transaction_ledger.get_rollups,
+            self.account_id,
+            ingested_backup.backup_key,
+            rollup_table,
+        )
+
+    async def set_ingested_backup(
+        self,
+        ingested_backup: IngestedMonefyBackup,
+        previous_backup: IngestedMonefyBackup | None = None,
+    ) -> None:
+        """Remember last ingested account backup and persist it to ledger"""
+        if not self.account_id:
+            return
+        self.ingested_backups.set(self.account_id, ingested_backup)
+        await self.transaction_ledger.run(
+            self.transaction_ledger.save_ingested_backup,
+            self.account_id,
+            ingested_backup,
+            previous_backup,
+        )
+
+    async def assemble_monefy_backup(
+        self, ingested_path: str, backup_tail: bytes, monefy_backup: dict[str, Any]
+    ) -> None:
+        """
+        Write ingested backup with appended tail to local mirror
+        if assembled backup content hash is the same as Dropbox one
+        """
+        with self.backup_mirror.writer(monefy_backup_key(monefy_backup)) as monefy_file:
+            content_hasher = DropboxContentHasher()
+            async with aiofiles.open(ingested_path, "rb") as ingested_file:
+                while chunk := await ingested_file.read(self.chunk_size):
+                    content_hasher.update(chunk)
+                    monefy_file.write(chunk)
+            content_hasher.update(backup_tail)
+            monefy_file.write(backup_tail)
+            if content_hasher.hexdigest() != monefy_backup.get("content_hash"):
+                raise ValueError("assembled backup content hash mismatch")
+
+    async def iter_monefy_backup_chunks(
+        self, monefy_backup: dict[str, Any]
+    ) -> AsyncIterator[bytes]:
+        """
+        Read Monefy backup csv file by chunks from local mirror.
+        Not mirrored backup is downloaded from Dropbox
+        and written to mirror chunk by chunk
+        """
+        backup_key = monefy_backup_key(monefy_backup)
+        if monefy_backup_path := self.backup_mirror.get(backup_key):
+            async with aiofiles.open(monefy_backup_path, "rb") as monefy_file:
+                while chunk := await monefy_file.read(self.chunk_size):
+                    yield chunk
+            return
+
+        logger.info(f"writing {monefy_backup['name']}")
+        with self.backup_mirror.writer(backup_key) as monefy_file:
+            async with self.dropbox_client.files_download_stream(
+                self.dropbox_client.monefy_backup_files_folder + monefy_backup["name"]
+            ) as response:
+                async for chunk in response.aiter_bytes(self.chunk_size):
+                    monefy_file.write(chunk)
+                    yield chunk
+
+    async def download_monefy_info(self, monefy_backup: dict[str, Any]) -> str:
+        """
+        Save Monefy backup csv file to local mirror
+        if backup with the same content hash isn't mirrored yet
+        """
+        async for _ in self.iter_monefy_backup_chunks(monefy_backup):
+            pass
+        return self.backup_mirror.backup_path(monefy_backup_key(monefy_backup))
@@ -0,0 +1,78 @@
+"""Local mirror of Monefy backup files downloaded from Dropbox storage"""
+import os
+import uuid
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator
+
+from sanic.log import logger
+
+
+class MonefyBackupMirror:
+    """
+    On-disk mirror of Monefy backup csv files keyed by Dropbox content hash.
+    Unchanged backups are served from local disk instead of Dropbox,
+    least recently used backups are evicted when mirror exceeds its size limit
+    """
+
+    def __init__(self, directory_path: str, max_size: int) -> None:
+        self.directory_path = directory_path
+        self.max_size = max_size
+
+    def backup_path(self, backup_key: str) -> str:
+        """Get local path of mirrored backup file"""
+        return os.path.join(self.directory_path, f"{backup_key}.csv")
+
+    def get(self, backup_key: str) -> str | None:
+        """Get mirrored backup file path if backup was already downloaded"""
+        backup_path = self.backup_path(backup_key)
+        try:
+            os.utime(backup_path)
+        except FileNotFoundError:
+            return None
+        logger.info(f"monefy backup {backup_key} found in local mirror")
+        return backup_path
+
+    @contextmanager
+    def writer(self, backup_key: str) -> Iterator[BinaryIO]:
+        """
+        Open temporary file for backup content written by chunks.
+        Backup is atomically added to mirror only if it was written completely
+        """
+        os.makedirs(self.directory_path, exist_ok=True)
+        backup_path = self.backup_path(backup_key)
+        temporary_path = f"{backup_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temporary_path, "wb") as backup_file:
+                yield backup_file
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+        os.replace(temporary_path, backup_path)
+        logger.info(f"monefy backup {backup_key} stored in local mirror")
+        self.evict(keep=backup_path)
+
+    def store(self, backup_key: str, content: bytes) -> str:
+        """Atomically write backup file content to mirror and evict old backups"""
+        with self.writer(backup_key) as backup_file:
+            backup_file.write(content)
+        return self.backup_path(backup_key)
+
+    def evict(self, keep: str | None = None) -> None:
+        """Remove least recently used backups until mirror fits its size limit"""
+        backups = []
+        with os.scandir(self.directory_path) as mirror_entries:
+            for entry in mirror_entries:
+                if entry.is_file() and entry.name.endswith(".csv"):
+                    entry_stat = entry.stat()
+                    backups.append(
+                        (entry_stat.st_mtime, entry_stat.st_size, entry.path)
+                    )
+        mirror_size = sum(size for _, size, _ in backups)
+        for _, size, backup_path in sorted(backups):
+            if mirror_size <= self.max_size:
+                break
+            if backup_path == keep:
+                continue
+            logger.info(f"evict {os.path.basename(backup_path)} from local mirror")
+            os.remove(backup_path)
+            mirror_size -= size
@@ -0,0 +1,70 @@
+"""Typed columnar export of Monefy transactions to Arrow IPC and Parquet files.
+Export formats are available only if optional pyarrow package is installed"""
+from datetime import date
+from typing import Any
+
+from src.domain.transaction_store import MonefyTransactionStore
+
+try:
+    import pyarrow
+    from pyarrow import ipc, parquet
+
+    COLUMNAR_FORMATS: tuple[str, ...] = ("arrow", "parquet")
+except ImportError:  # pragma: no cover - depends on installed packages
+    COLUMNAR_FORMATS = ()
+UNIX_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def transaction_column(transactions: MonefyTransactionStore, fieldname: str) -> Any:
+    """
+    Get typed Arrow array of transaction store column: dates as date32,
+    amounts as decimals with store amount scale and text columns
+    as dictionary arrays that reuse store dictionary codes
+    """
+    if fieldname == "date":
+        return pyarrow.array(
+            [date_ordinal - UNIX_EPOCH_ORDINAL for date_ordinal in transactions.dates],
+            pyarrow.date32(),
+        )
+    if fieldname in ("amount", "converted amount"):
+        amounts = (
+            transactions.amounts
+            if fieldname == "amount"
+            else transactions.converted_amounts
+        )
+        return pyarrow.array(
+            [transactions.to_decimal(amount) for amount in amounts],
+            pyarrow.decimal128(38, transactions.amount_scale),
+        )
+    if dictionary_column := transactions.text_columns.get(fieldname):
+        return pyarrow.DictionaryArray.from_arrays(
+            pyarrow.array(dictionary_column.codes, pyarrow.int32()),
+            pyarrow.array(dictionary_column.values, pyarrow.string()),
+        )
+    return pyarrow.array(transactions.descriptions, pyarrow.string())
+
+
+def columnar_table(json_object: Any) -> Any:
+    """Get Arrow table of transaction store columns projection,
+    summarized data or grouped data rows"""
+    if isinstance(json_object, MonefyTransactionStore):
+        return pyarrow.table(
+            {
+                fieldname: transaction_column(json_object, fieldname)
+                for fieldname in json_object.fieldnames
+            }
+        )
+    return pyarrow.Table.from_pylist(
+        [json_object] if isinstance(json_object, dict) else json_object
+    )
+
+
+def write_columnar_file(file_path: str, json_object: Any, columnar_format: str) -> None:
+    """Write data as uncompressed Arrow IPC file that can be memory mapped
+    or as zstd compressed Parquet file"""
+    table = columnar_table(json_object)
+    if columnar_format == "parquet":
+        parquet.write_table(table, file_path, compression="zstd")
+        return
+    with ipc.new_file(file_path, table.schema) as arrow_writer:
+        arrow_writer.write_table(table)
@@ -0,0 +1,122 @@
+"""Detection of Monefy backup csv dialect and dialect specific value parsers"""
+import csv
+from dataclasses import dataclass, field
+from datetime import date
+
+DIALECT_SAMPLE_SIZE = 4 * 1024
+MONEFY_DELIMITERS = (",", ";")
+MONEFY_DATE_FORMATS = ("%d/%m/%Y", "%m/%d/%Y", "%Y-%m-%d", "%d.%m.%Y")
+MONEFY_DATE_FIELDS = {
+    "%d/%m/%Y": ("/", (2, 1, 0)),
+    "%m/%d/%Y": ("/", (2, 0, 1)),
+    "%Y-%m-%d": ("-", (0, 1, 2)),
+    "%d.%m.%Y": (".", (2, 1, 0)),
+}
+AMOUNT_SPACES = " \u00a0\u202f'"
+
+
+def parse_monefy_date(transaction_date: str, date_format: str) -> int:
+    """Parse Monefy date with one of supported formats to ordinal
+    by splitting date fields instead of generic strptime parsing"""
+    date_separator, (year_field, month_field, day_field) = MONEFY_DATE_FIELDS[
+        date_format
+    ]
+    date_fields = transaction_date.strip().split(date_separator)
+    if len(date_fields) != 3 or len(date_fields[year_field]) != 4:
+        raise ValueError(f"{transaction_date} doesn't match {date_format}")
+    return date(
+        int(date_fields[year_field]),
+        int(date_fields[month_field]),
+        int(date_fields[day_field]),
+    ).toordinal()
+
+
+@dataclass(frozen=True)
+class MonefyCsvDialect:
+    """
+    Monefy backup csv dialect that depends on phone locale:
+    csv delimiter, amount decimal separator and date format
+    """
+
+    delimiter: str = ","
+    decimal_separator: str = "."
+    date_format: str = MONEFY_DATE_FORMATS[0]
+    amount_translation: dict[int, str | None] = field(
+        init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self) -> None:
+        thousands_separator = "," if self.decimal_separator == "." else "."
+        amount_translation = str.maketrans(
+            self.decimal_separator, ".", AMOUNT_SPACES + thousands_separator
+        )
+        object.__setattr__(self, "amount_translation", amount_translation)
+
+    def parse_amount(self, amount: str) -> tuple[int, int]:
+        """Parse amount to integer units and number of fraction digits"""
+        whole, _, fraction = amount.translate(self.amount_translation).partition(".")
+        return int(whole + fraction), len(fraction)
+
+    def parse_date(self, transaction_date: str) -> int:
+        """Parse transaction date of dialect date format to ordinal"""
+        return parse_monefy_date(transaction_date, self.date_format)
+
+
+def detect_decimal_separator(amounts: list[str], delimiter: str) -> str:
+    """
+    Detect amounts decimal separator. Last separator of amount with both
+    separators is decimal one, single separator followed by not exactly
+    three digits can't be thousands separator
+    """
+    votes = {".": 0, ",": 0}
+    for amount in amounts:
+        separator_position = max(amount.rfind("."), amount.rfind(","))
+        if separator_position < 0:
+            continue
+        separator = amount[separator_position]
+        fraction = amount[separator_position + 1 :].strip()
+        if ("." in amount and "," in amount) or len(fraction) != 3:
+            votes[separator] += 1
+    if votes[","] > votes["."]:
+        return ","
+    if votes["."] > votes[","]:
+        return "."
+    return "," if delimiter == ";" else "."
+
+
+def detect_date_format(dates: list[str]) -> str:
+    """Detect first Monefy date format that parses all sample dates"""
+    for date_format in MONEFY_DATE_FORMATS:
+        try:
+            for transaction_date in dates:
+                parse_monefy_date(transaction_date, date_format)
+        except ValueError:
+            continue
+        return date_format
+    return MONEFY_DATE_FORMATS[0]
+
+
+def detect_monefy_csv_dialect(sample: str) -> MonefyCsvDialect:
+    """Detect Monefy csv dialect from first kilobytes of backup text"""
+    lines = sample.lstrip("\ufeff").splitlines()
+    if not lines:
+        return MonefyCsvDialect()
+    delimiter = max(MONEFY_DELIMITERS, key=lines[0].count)
+    # last sample line can be cut in the middle
+    records = list(csv.reader(lines[:-1] or lines, delimiter=delimiter))
+    header, rows = records[0], [row for row in records[1:] if row]
+    amount_columns = [
+        column
+        for column, fieldname in enumerate(header)
+        if fieldname in ("amount", "converted amount")
+    ]
+    date_column = header.index("date") if "date" in header else 0
+    amounts = [
+        row[column] for row in rows for column in amount_columns if column < len(row)
+    ]
+    dates = [row[date_column] for row in rows if date_column < len(row)]
+    return MonefyCsvDialect(
+        delimiter=delimiter,
+        decimal_separator=detect_decimal_separator(amounts, delimiter),
+        date_format=detect_date_format(dates),
+    )
@@ -0,0 +1,99 @@
+"""Streaming parser for Monefy backup csv files"""
+import codecs
+import csv
+from typing import AsyncIterable, AsyncIterator, Iterator
+
+from src.domain.csv_dialect import (DIALECT_SAMPLE_SIZE, MonefyCsvDialect,
+                                    detect_monefy_csv_dialect)
+
+
+class MonefyCsvStreamParser:
+    """
+    Incremental Monefy backup csv parser.
+    Decoded text can be fed by chunks of any size,
+    parser keeps only unfinished csv record in memory
+    and yields transactions as soon as their records are complete.
+    If csv dialect isn't provided, it is detected from first kilobytes of text
+    """
+
+    def __init__(
+        self,
+        csv_dialect: MonefyCsvDialect | None = None,
+        fieldnames: list[str] | None = None,
+    ) -> None:
+        self.csv_dialect = csv_dialect
+        self.fieldnames = fieldnames
+        self.pending_text = ""
+        self.pending_records: list[str] = []
+        self.pending_quotes = 0
+
+    @staticmethod
+    def fix_header(fieldnames: list[str]) -> list[str]:
+        """Rename duplicated Monefy currency column to converted currency"""
+        if fieldnames.count("currency") > 1:
+            converted_currency = fieldnames.index(
+                "currency", fieldnames.index("currency") + 1
+            )
+            fieldnames[converted_currency] = "converted currency"
+        return fieldnames
+
+    def split_records(self, text: str, final: bool) -> list[str]:
+        """Split text to complete csv records.
+        Lines with newline inside quoted field are joined to one record"""
+        self.pending_text += text
+        lines_end = (
+            len(self.pending_text) if final else self.pending_text.rfind("\n") + 1
+        )
+        lines = self.pending_text[:lines_end].split("\n")
+        self.pending_text = self.pending_text[lines_end:]
+
+        records = []
+        for line_number, line in enumerate(lines, start=1):
+            if line_number < len(lines):
+                line += "\n"
+            elif not line:
+                break
+            self.pending_records.append(line)
+            self.pending_quotes += line.count('"')
+            if self.pending_quotes % 2 == 0:
+                records.append("".join(self.pending_records))
+                self.pending_records, self.pending_quotes = [], 0
+        if final and self.pending_records:
+            records.append("".join(self.pending_records))
+            self.pending_records, self.pending_quotes = [], 0
+        return records
+
+    def feed(self, text: str, final: bool = False) -> Iterator[dict[str, str]]:
+        """Feed decoded csv text chunk and yield parsed transactions"""
+        if self.csv_dialect is None:
+            self.pending_text += text
+            if len(self.pending_text) < DIALECT_SAMPLE_SIZE and not final:
+                return
+            self.csv_dialect = detect_monefy_csv_dialect(
+                self.pending_text[:DIALECT_SAMPLE_SIZE]
+            )
+            text, self.pending_text = self.pending_text, ""
+
+        records = self.split_records(text, final)
+        delimiter = self.csv_dialect.delimiter
+        if self.fieldnames is None and records:
+            header = next(csv.reader(records[:1], delimiter=delimiter), [])
+            self.fieldnames = self.fix_header(header)
+            records = records[1:]
+        if records:
+            yield from csv.DictReader(
+                records, fieldnames=self.fieldnames, delimiter=delimiter
+            )
+
+
+async def iter_monefy_transactions(
+    chunks: AsyncIterable[bytes], parser: MonefyCsvStreamParser | None = None
+) -> AsyncIterator[dict[str, str]]:
+    """Decode Monefy backup csv file chunks and yield parsed transactions"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    parser = parser or MonefyCsvStreamParser()
+    async for chunk in chunks:
+        for transaction in parser.feed(decoder.decode(chunk)):
+            yield transaction
+    for transaction in parser.feed(decoder.decode(b"", final=True), final=True):
+        yield transaction
@@ -0,0 +1,98 @@
+"""Normalization of multi-currency Monefy transactions to base currency"""
+from collections import Counter
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Iterable
+
+from src.domain.transaction_ledger import RollupRow
+from src.domain.transaction_store import MonefyTransactionStore
+
+
+@dataclass
+class NormalizedTotals:
+    """
+    Income and expense in base currency from converted amounts
+    with category totals in base currency and subtotals in original currencies.
+    Amounts are integer minor units of transaction store
+    """
+
+    base_currency: str
+    income: int = 0
+    expense: int = 0
+    category_totals: dict[str, int] = field(default_factory=dict)
+    currency_totals: dict[str, int] = field(default_factory=dict)
+
+    def to_summary(
+        self, transactions: MonefyTransactionStore
+    ) -> dict[str, Decimal | str]:
+        """Get summarized data with Decimal amounts"""
+        summarized_data: dict[str, Decimal | str] = {
+            "income": transactions.to_decimal(self.income),
+            "expense": transactions.to_decimal(self.expense),
+            "balance": transactions.to_decimal(self.income + self.expense),
+            "currency": self.base_currency,
+        }
+        for category, category_total in self.category_totals.items():
+            summarized_data[category] = transactions.to_decimal(category_total)
+        for currency, currency_total in self.currency_totals.items():
+            summarized_data[f"{currency} amount"] = transactions.to_decimal(
+                currency_total
+            )
+        return summarized_data
+
+
+def base_currency(transactions: MonefyTransactionStore) -> str:
+    """Get the most used converted currency of transactions,
+    transactions without rows have no currency"""
+    converted_currencies = transactions.converted_currencies
+    if not converted_currencies.codes:
+        return ""
+    if len(converted_currencies.values) == 1:
+        return converted_currencies.values[0]
+    currency_code, _ = Counter(converted_currencies.codes).most_common(1)[0]
+    return converted_currencies.values[currency_code]
+
+
+def normalize_transactions(transactions: MonefyTransactionStore) -> NormalizedTotals:
+    """
+    Sum converted amounts by category and original amounts by currency
+    in one pass over transaction store columns
+    """
+    income, expense = 0, 0
+    category_totals = [0] * len(transactions.categories.values)
+    currency_totals = [0] * len(transactions.currencies.values)
+    for converted_amount, amount, category_code, currency_code in zip(
+        transactions.converted_amounts,
+        transactions.amounts,
+        transactions.categories.codes,
+        transactions.currencies.codes,
+    ):
+        if converted_amount < 0:
+            expense += converted_amount
+        else:
+            income += converted_amount
+        category_totals[category_code] += converted_amount
+        currency_totals[currency_code] += amount
+
+    return NormalizedTotals(
+        base_currency(transactions),
+        income,
+        expense,
+        dict(zip(transactions.categories.values, category_totals)),
+        dict(zip(transactions.currencies.values, currency_totals)),
+    )
+
+
+def normalize_rollups(
+    rollups: Iterable[RollupRow], transactions: MonefyTransactionStore
+) -> NormalizedTotals:
+    """Sum category and currency rollups of transactions"""
+    normalized_totals = NormalizedTotals(base_currency(transactions))
+    category_totals = normalized_totals.category_totals
+    currency_totals = normalized_totals.currency_totals
+    for _, category, currency, income, expense, amount, _ in rollups:
+        normalized_totals.income += income
+        normalized_totals.expense += expense
+        category_totals[category] = category_totals.get(category, 0) + income + expense
+        currency_totals[currency] = currency_totals.get(currency, 0) + amount
+    return normalized_totals
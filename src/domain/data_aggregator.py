@@ -1,111 +1,304 @@
 """Data aggregation module for summarizing or return detailed transaction of Monefy Data"""
 import csv
 import datetime
-import json
-import os
+import io
 from decimal import Decimal
+from itertools import islice
+from typing import Any, Iterable, Iterator
 
 from sanic.log import logger
 
 from src.common.http_codes import NotAcceptable
-from src.domain.dropbox_utils import DropboxClient
-from src.common.utils import DecimalEncoder
+from src.common.utils import format_decimals, get_monefied_app, json_dumps
+from src.domain.aggregation_cache import (AggregationCacheKey,
+                                          AggregationResultCache)
+from src.domain.backup_ingestion import monefy_backup_key
+from src.domain.columnar_export import COLUMNAR_FORMATS, write_columnar_file
+from src.domain.currency_normalization import (normalize_rollups,
+                                               normalize_transactions)
+from src.domain.dropbox_utils import AsyncDropboxClient
+from src.domain.group_by import (TransactionGroupBy, aggregate_rollups,
+                                 parse_group_by, rollup_table)
+from src.domain.transaction_query import TransactionQuery
+from src.domain.transaction_store import MonefyTransactionStore
+
+AggregatedData = (
+    MonefyTransactionStore | dict[str, Decimal | str] | list[dict[str, Any]]
+)
 
 
 class MonefyDataAggregator:
     """Monefy Data aggregation class that responsible for creating summarized
     or detailed transaction info for provided income and spending's"""
 
-    csv_directory_path = os.path.join(os.getcwd(), "monefy_csv_files")
-    json_directory_path = os.path.join(os.getcwd(), "monefy_json_files")
-    accepted_file_formats = ("json", "csv")
+    accepted_file_formats = ("json", "csv", *COLUMNAR_FORMATS)
+    streamed_file_formats = ("json", "csv")
+    chunk_size = 64 * 1024
+    json_chunk_rows = 1024
 
     def __init__(
         self,
-        user_dropbox_client: DropboxClient,
+        user_dropbox_client: AsyncDropboxClient,
         result_file_format: str,
         summarize_balance: bool,
+        group_by: str | None = None,
+        transaction_query: TransactionQuery | None = None,
+        *,
+        pretty: bool = False,
+        aggregation_cache: AggregationResultCache | None = None,
     ):
         self.user_dropbox_client = user_dropbox_client
         self.result_file_format = result_file_format
         self.summarize_balance = summarize_balance
+        self.group_by = group_by
+        self.transaction_query = transaction_query or TransactionQuery()
+        self.pretty = pretty
+        self.aggregation_cache = (
+            aggregation_cache or get_monefied_app().ctx.monefy_aggregation_cache
+        )
 
-    def _write_json_file(
-        self, file_name: str, json_object: list[dict[str, str]] | dict[str, int]
-    ) -> str:
-        """Method for writing json files. Can accept file name and json_data as parameters"""
-        os.makedirs(self.json_directory_path, exist_ok=True)
-        json_file_path = os.path.join(self.json_directory_path, f"{file_name}.json")
-        with open(json_file_path, mode="w", encoding="utf-8-sig") as json_file:
-            json_file.write(json.dumps(json_object, indent=4, cls=DecimalEncoder))
+    def _write_json_file(self, file_path: str, json_object: AggregatedData) -> None:
+        """Method for writing json files. Can accept file path and json_data as parameters"""
+        with open(file_path, mode="w", encoding="utf-8-sig") as json_file:
+            json_file.writelines(self.iter_json_chunks(json_object))
+
+    def _write_csv_file(self, file_path: str, json_object: AggregatedData) -> None:
+        """Method for writing csv files from transaction store or summarized data.
+        Accept file path and transactions or summary as parameters"""
+        with open(file_path, "w", newline="", encoding="utf-8-sig") as monefy_file:
+            monefy_file.writelines(self.iter_csv_chunks(json_object))
 
-        return json_file_path
+    def _write_columnar_file(self, file_path: str, json_object: AggregatedData) -> None:
+        """Method for writing typed columnar Arrow IPC or Parquet files
+        from transaction store or summarized data"""
+        write_columnar_file(file_path, json_object, self.result_file_format)
+
+    def iter_json_chunks(self, json_object: AggregatedData) -> Iterator[str]:
+        """Method that encodes compact or pretty json by chunks.
+        Transactions are encoded by batches of records without materializing
+        all records, their values are already formatted strings"""
+        if not isinstance(json_object, MonefyTransactionStore):
+            yield json_dumps(format_decimals(json_object), self.pretty)
+            return
+        rows = json_object.iter_rows()
+        separator = ""
+        yield "["
+        while rows_batch := list(islice(rows, self.json_chunk_rows)):
+            json_batch = json_dumps(
+                [dict(zip(json_object.fieldnames, row)) for row in rows_batch],
+                self.pretty,
+            )
+            # batch items without list brackets, pretty json list ends with "\n]"
+            yield separator + json_batch[1 : -2 if self.pretty else -1]
+            separator = ","
+        yield "\n]" if separator and self.pretty else "]"
+
+    def iter_csv_chunks(self, json_object: AggregatedData) -> Iterator[str]:
+        """Method that encodes csv rows of transactions or summarized data by chunks"""
+        csv_buffer = io.StringIO()
+        csv_writer = csv.writer(csv_buffer)
+        rows: Iterable[Iterable[Any]]
+        if isinstance(json_object, MonefyTransactionStore):
+            fieldnames = json_object.fieldnames if json_object else ()
+            rows = json_object.iter_rows()
+        else:
+            records = [json_object] if isinstance(json_object, dict) else json_object
+            fieldnames = tuple(records[0]) if records else ()
+            rows = (
+                [record.get(fieldname, "") for fieldname in fieldnames]
+                for record in records
+            )
+        if fieldnames:
+            csv_writer.writerow(fieldnames)
+        for row in rows:
+            csv_writer.writerow(row)
+            if csv_buffer.tell() >= self.chunk_size:
+                yield csv_buffer.getvalue()
+                csv_buffer.seek(0)
+                csv_buffer.truncate()
+        if csv_buffer.tell():
+            yield csv_buffer.getvalue()
+
+    @property
+    def result_file_name(self) -> str:
+        """Get result download file name without extension"""
+        file_name = f"monefy-{datetime.datetime.now().strftime('%Y-%m-%d_%H:%M:%S')}"
+        if self.group_by:
+            return f"grouped_{file_name}"
+        if self.summarize_balance:
+            return f"summarized_{file_name}"
+        return file_name
 
-    def _write_csv_file(
-        self, file_name: str, json_object: list[dict[str, str]] | dict[str, int]
+    def _write_file(
+        self, json_data: AggregatedData, cache_key: AggregationCacheKey | None = None
     ) -> str:
-        """Method for writing csv files from json.
-        Accept file name and json like object as parameters"""
-        csv_file_path = os.path.join(self.csv_directory_path, f"{file_name}.csv")
-        with open(csv_file_path, "w", newline="", encoding="utf-8-sig") as monefy_file:
-            if isinstance(json_object, dict):
-                csv_writer = csv.DictWriter(monefy_file, json_object.keys())
-                csv_writer.writeheader()
-                csv_writer.writerow(json_object)
-            elif isinstance(json_object, list):
-                csv_writer = csv.DictWriter(monefy_file, json_object[0].keys())
-                csv_writer.writeheader()
-                csv_writer.writerows(json_object)
-        return csv_file_path
-
-    def _write_file(self, json_data: list[dict[str, str]]) -> str:
         """
-        Method for writing files from json with provided format.
-        Accept file name, json like object and file format as parameters"""
+        Method for writing files from json with provided format to aggregation cache.
+        Accept json like object and aggregation cache key as parameters"""
         logger.info(f"writing {self.result_file_format} file")
-        file_name = f"monefy-{datetime.datetime.now().strftime('%Y-%m-%d_%H:%M:%S')}"
-        if self.result_file_format == "csv" and self.summarize_balance:
-            summarized_data = self.summarize_data(json_data)
-            return self._write_csv_file(f"summarized_{file_name}", summarized_data)
-        if self.result_file_format == "json" and self.summarize_balance:
-            summarized_data = self.summarize_data(json_data)
-            return self._write_json_file(f"summarized_{file_name}", summarized_data)
         if self.result_file_format == "csv":
-            return self._write_csv_file(file_name, json_data)
-        if self.result_file_format == "json":
-            return self._write_json_file(file_name, json_data)
-        logger.warning(f"{self.result_file_format} format not supported")
-        raise NotAcceptable(f"{self.result_file_format} not supported")
+            write_result = self._write_csv_file
+        elif self.result_file_format == "json":
+            write_result = self._write_json_file
+        elif self.result_file_format in COLUMNAR_FORMATS:
+            write_result = self._write_columnar_file
+        else:
+            logger.warning(f"{self.result_file_format} format not supported")
+            raise NotAcceptable(
+                f"Provided format ({self.result_file_format}) not supported"
+            )
+        return self.aggregation_cache.store(
+            cache_key,
+            self.result_file_format,
+            lambda file_path: write_result(file_path, json_data),
+        )
 
-    def get_result_file_data(self) -> str:
+    async def get_result_file_data(
+        self, latest_monefy_backup: dict[str, Any] | None = None
+    ) -> str:
         """Method for returning result file data that depends on provided response headers.
-        Result file can be summarized or detailed with each Monefy transaction"""
+        Result file can be summarized or detailed with each Monefy transaction.
+        Result of the same backup revision and arguments is served from cache.
+        Latest backup metadata can be provided if it was already listed"""
         logger.info(
             f"getting monefy result file in {self.result_file_format}"
             f"{'.' if not self.summarize_balance else ' summarized.'}"
         )
-        result_file_data = self._write_file(self.user_dropbox_client.get_monefy_info())
-        return result_file_data
+        self.check_result_file_format()
+        backup_ingestion = self.user_dropbox_client.backup_ingestion
+        if cache_key := self.get_cache_key(
+            monefy_backup_key(latest_monefy_backup)
+            if latest_monefy_backup
+            else await backup_ingestion.get_ingested_backup_key()
+        ):
+            if result_file_path := self.aggregation_cache.get(cache_key):
+                return result_file_path
+
+        if (transactions := await self.query_ledger(latest_monefy_backup)) is not None:
+            return self._write_file(
+                await self.aggregate_transactions(transactions), cache_key
+            )
+        monefy_info = await self.user_dropbox_client.get_monefy_info(
+            latest_monefy_backup
+        )
+        return self._write_file(
+            await self.aggregate_transactions(
+                self.transaction_query.apply(monefy_info)
+            ),
+            self.get_cache_key(
+                await backup_ingestion.get_ingested_backup_key(monefy_info)
+            ),
+        )
+
+    async def get_result_chunks(
+        self, latest_monefy_backup: dict[str, Any] | None = None
+    ) -> Iterator[str]:
+        """Method for returning result file content encoded by chunks
+        that can be streamed to response without writing result file"""
+        logger.info(
+            f"streaming monefy result in {self.result_file_format}"
+            f"{'.' if not self.summarize_balance else ' summarized.'}"
+        )
+        self.check_result_file_format()
+        if self.result_file_format not in self.streamed_file_formats:
+            raise NotAcceptable(
+                f"Provided format ({self.result_file_format}) can't be streamed"
+            )
+        transactions = await self.query_ledger(latest_monefy_backup)
+        if transactions is None:
+            transactions = self.transaction_query.apply(
+                await self.user_dropbox_client.get_monefy_info(latest_monefy_backup)
+            )
+        aggregated_data = await self.aggregate_transactions(transactions)
+        if self.result_file_format == "csv":
+            return self.iter_csv_chunks(aggregated_data)
+        return self.iter_json_chunks(aggregated_data)
+
+    async def query_ledger(
+        self, latest_monefy_backup: dict[str, Any] | None
+    ) -> MonefyTransactionStore | None:
+        """Method that selects filtered transactions of latest backup from ledger
+        without loading all account transactions, if backup is stored there"""
+        if not latest_monefy_backup:
+            return None
+        backup_ingestion = self.user_dropbox_client.backup_ingestion
+        transactions = await backup_ingestion.query_ingested_backup(
+            latest_monefy_backup, self.transaction_query
+        )
+        if transactions is not None:
+            logger.info("selecting filtered monefy data from ledger")
+        return transactions
+
+    def check_result_file_format(self) -> None:
+        """Method that checks if result file format is supported"""
+        if self.result_file_format not in self.accepted_file_formats:
+            logger.warning(f"{self.result_file_format} format not supported")
+            raise NotAcceptable(
+                f"Provided format ({self.result_file_format}) not supported"
+            )
+
+    def get_cache_key(self, backup_key: str | None) -> AggregationCacheKey | None:
+        """Method that returns aggregation cache key of ingested backup revision"""
+        if not backup_key or not self.user_dropbox_client.account_id:
+            return None
+        return self.get_result_key(backup_key)
+
+    def get_result_key(self, backup_key: str) -> AggregationCacheKey:
+        """Method that returns key of aggregation result: account, backup revision
+        and aggregation arguments"""
+        return (
+            self.user_dropbox_client.account_id or "",
+            backup_key,
+            self.result_file_format,
+            bool(self.summarize_balance),
+            self.pretty,
+            self.group_by or "",
+            repr(self.transaction_query),
+        )
+
+    async def aggregate_transactions(
+        self, transactions: MonefyTransactionStore
+    ) -> AggregatedData:
+        """Method that groups, summarize or returns detailed transactions"""
+        if self.group_by:
+            dimensions = parse_group_by(self.group_by)
+            logger.info(f"grouping monefy data by {', '.join(dimensions)}")
+            return await self.group_transactions(transactions, dimensions)
+        if self.summarize_balance:
+            return await self.summarize_transactions(transactions)
+        return transactions
+
+    async def group_transactions(
+        self, transactions: MonefyTransactionStore, dimensions: tuple[str, ...]
+    ) -> list[dict[str, Any]]:
+        """Method that groups transactions by dimensions.
+        Category and time buckets are grouped from ledger rollups if they are stored"""
+        backup_ingestion = self.user_dropbox_client.backup_ingestion
+        if (table := rollup_table(dimensions)) and (
+            rollups := await backup_ingestion.get_monefy_rollups(transactions, table)
+        ) is not None:
+            logger.info(f"grouping monefy data from {table}")
+            return aggregate_rollups(rollups, dimensions, transactions)
+        return TransactionGroupBy(transactions, dimensions).aggregate()
+
+    async def summarize_transactions(
+        self, transactions: MonefyTransactionStore
+    ) -> dict[str, Decimal | str]:
+        """Method that summarize transactions from monthly ledger rollups if they are stored"""
+        backup_ingestion = self.user_dropbox_client.backup_ingestion
+        rollups = await backup_ingestion.get_monefy_rollups(
+            transactions, "monthly_rollups"
+        )
+        if rollups is None:
+            return self.summarize_data(transactions)
+        logger.info("summarizing monefy data from monthly rollups")
+        return normalize_rollups(rollups, transactions).to_summary(transactions)
 
     @staticmethod
-    def summarize_data(transactions_list: list[dict[str, str]]) -> dict[str, int]:
-        """Method that summarize detailed income and spending's from provided Monefy data"""
+    def summarize_data(
+        transactions: MonefyTransactionStore,
+    ) -> dict[str, Decimal | str]:
+        """Method that summarize detailed income and spending's from provided Monefy data.
+        Converted amounts are summed in base currency with subtotals by currency"""
         logger.info("summarizing monefy data")
-        summarized_data = {
-            "income": 0,
-            "expense": 0,
-            "balance": 0
-        }
-        for transaction in transactions_list:
-
-            if Decimal(transaction["amount"]) < 0:
-                summarized_data["expense"] += Decimal(transaction["amount"])
-            elif Decimal(transaction["amount"]) > 0:
-                summarized_data["income"] += Decimal(transaction["amount"])
-
-            if transaction["category"] not in summarized_data:
-                summarized_data[transaction["category"]] = 0
-            summarized_data[transaction["category"]] += Decimal(transaction["amount"])
-
-            summarized_data["balance"] = summarized_data["income"] + summarized_data["expense"]
-        return summarized_data
+        return normalize_transactions(transactions).to_summary(transactions)
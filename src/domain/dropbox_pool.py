@@ -0,0 +1,47 @@
+"""Pool of reusable async Dropbox clients for Monefy Web application"""
+import time
+from collections import OrderedDict
+
+from sanic.log import logger
+
+from src.domain.dropbox_utils import AsyncDropboxClient
+
+
+class DropboxClientPool:
+    """
+    Bounded pool of async Dropbox clients keyed by Dropbox account.
+    Pooled clients share application HTTP client with keep-alive connections,
+    so repeated requests of the same user don't decrypt access token again.
+    Least recently used clients are evicted when pool is full,
+    clients older than time to live are recreated
+    """
+
+    def __init__(self, max_size: int, time_to_live: float) -> None:
+        self.max_size = max_size
+        self.time_to_live = time_to_live
+        self.clients: OrderedDict[
+            str, tuple[str, float, AsyncDropboxClient]
+        ] = OrderedDict()
+
+    def get_client(self, account_id: str, token: str) -> AsyncDropboxClient:
+        """Get pooled account Dropbox client or create new one for encrypted token"""
+        if pooled_client := self.clients.get(account_id):
+            pooled_token, created_at, dropbox_client = pooled_client
+            if (
+                pooled_token == token
+                and time.monotonic() - created_at < self.time_to_live
+            ):
+                self.clients.move_to_end(account_id)
+                return dropbox_client
+
+        logger.info(f"create dropbox client for {account_id}")
+        dropbox_client = AsyncDropboxClient(token, account_id)
+        self.clients[account_id] = (token, time.monotonic(), dropbox_client)
+        self.clients.move_to_end(account_id)
+        while len(self.clients) > self.max_size:
+            self.clients.popitem(last=False)
+        return dropbox_client
+
+    def discard_client(self, account_id: str) -> None:
+        """Remove account Dropbox client from pool"""
+        self.clients.pop(account_id, None)
@@ -1,21 +1,38 @@
 """Dropbox utils module for Monefy Web application"""
-import csv
+import json
 import os
-import re
 import uuid
+from contextlib import asynccontextmanager
 from dataclasses import dataclass
-from datetime import datetime
-from io import StringIO
+from typing import Any, AsyncIterator
 
-from dropbox import Dropbox, DropboxOAuth2Flow
+import aiofiles
+import httpx
+from dropbox import DropboxOAuth2Flow
 from dropbox.oauth import (BadRequestException, BadStateException,
                            CsrfException, NotApprovedException,
                            ProviderException)
-from dropbox.users import FullAccount
+from dropbox.stone_serializers import json_compat_obj_decode
+from dropbox.users import FullAccount, FullAccount_validator
 from sanic.exceptions import NotFound
 from sanic.log import logger
 
 from src.common.utils import get_monefied_app
+from src.domain.backup_index import MonefyBackupIndex
+from src.domain.backup_ingestion import MonefyBackupIngestion
+from src.domain.backup_mirror import MonefyBackupMirror
+from src.domain.transaction_store import MonefyTransactionStore
+
+MONEFY_BACKUP_FILES_FOLDER = os.environ.get("DROPBOX_PATH", "")
+CSV_DIRECTORY_PATH = os.path.join(os.getcwd(), "monefy_csv_files")
+JSON_DIRECTORY_PATH = os.path.join(os.getcwd(), "monefy_json_files")
+
+
+def decrypt_access_token(token: str) -> str:
+    """Decrypt existed user Dropbox access token from database"""
+    monefied_app = get_monefied_app()
+
+    return monefied_app.ctx.token_cryptography.decrypt(token).decode()
 
 
 @dataclass
@@ -71,121 +88,287 @@ class DropboxUser:
         self.user_team_member = self.dropbox_user_info.team_member_id
 
 
-class DropboxClient:
+class AsyncDropboxClient:
     """
-    Dropbox Client to interact with users information
-    and Monefy backup files in Storage
+    Asyncio Dropbox Client built on top of httpx
+    to interact with users information and Monefy backup files in Storage.
+    Requests are sent straight to Dropbox HTTP API,
+    so handlers don't block event loop while waiting for Dropbox
     """
 
-    monefy_backup_files_folder: str = os.environ.get("DROPBOX_PATH", "")
-    csv_directory_path = os.path.join(os.getcwd(), "monefy_csv_files")
-    json_directory_path = os.path.join(os.getcwd(), "monefy_json_files")
+    api_url = "https://api.dropboxapi.com/2"
+    content_url = "https://content.dropboxapi.com/2"
+    upload_chunk_size = 8 * 1024 * 1024
+    monefy_backup_files_folder: str = MONEFY_BACKUP_FILES_FOLDER
+    csv_directory_path = CSV_DIRECTORY_PATH
+    json_directory_path = JSON_DIRECTORY_PATH
+
+    def __init__(
+        self,
+        token: str,
+        account_id: str | None = None,
+        http_client: httpx.AsyncClient | None = None,
+        backup_mirror: MonefyBackupMirror | None = None,
+    ) -> None:
+        monefied_app = get_monefied_app()
+
+        self.access_token = decrypt_access_token(token)
+        self.account_id = account_id
+        self.backup_listing = monefied_app.ctx.monefy_backup_listing
+        self.http_client = http_client or monefied_app.ctx.dropbox_http_client
+        self.backup_ingestion = MonefyBackupIngestion(self, backup_mirror)
 
-    def __init__(self, token: str) -> None:
-        access_token = self.decrypt_access_token(token)
-        self.dropbox_client = Dropbox(oauth2_access_token=access_token)
+    @property
+    def authorization_headers(self) -> dict[str, str]:
+        """Authorization headers for Dropbox API requests"""
+        return {"Authorization": f"Bearer {self.access_token}"}
 
     @staticmethod
-    def decrypt_access_token(token: str) -> str:
-        """Decrypt existed user Dropbox access token from database"""
-        monefied_app = get_monefied_app()
+    def check_dropbox_response(route: str, response: httpx.Response) -> None:
+        """Log and raise Dropbox API error if request was not successful"""
+        if response.is_error:
+            logger.error(
+                f"dropbox {route} request failed with status "
+                f"{response.status_code}: {response.text}"
+            )
+            response.raise_for_status()
 
-        return monefied_app.ctx.token_cryptography.decrypt(token).decode()
+    async def rpc_request(
+        self, route: str, arguments: dict[str, Any] | None = None
+    ) -> dict[str, Any]:
+        """Send RPC request to Dropbox API endpoint and return JSON result"""
+        response = await self.http_client.post(
+            f"{self.api_url}/{route}",
+            headers=self.authorization_headers,
+            json=arguments,
+        )
+        self.check_dropbox_response(route, response)
+        return response.json()
 
-    def get_monefy_info(
+    def content_headers(self, arguments: dict[str, Any]) -> dict[str, str]:
+        """Headers for Dropbox API content upload and download requests"""
+        return {
+            **self.authorization_headers,
+            "Dropbox-API-Arg": json.dumps(arguments),
+        }
+
+    async def content_request(
         self,
-    ) -> list[dict[str, str]]:
+        route: str,
+        arguments: dict[str, Any],
+        content: bytes | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> httpx.Response:
+        """Send content upload or download request to Dropbox API endpoint"""
+        request_headers = {**self.content_headers(arguments), **(headers or {})}
+        if content is not None:
+            request_headers["Content-Type"] = "application/octet-stream"
+        response = await self.http_client.post(
+            f"{self.content_url}/{route}", headers=request_headers, content=content
+        )
+        self.check_dropbox_response(route, response)
+        return response
+
+    @asynccontextmanager
+    async def files_download_stream(self, path: str) -> AsyncIterator[httpx.Response]:
+        """Download file from Dropbox storage without reading response body"""
+        async with self.http_client.stream(
+            "POST",
+            f"{self.content_url}/files/download",
+            headers=self.content_headers({"path": path}),
+        ) as response:
+            if response.is_error:
+                await response.aread()
+            self.check_dropbox_response("files/download", response)
+            yield response
+
+    async def files_list_folder(self, path: str) -> dict[str, Any]:
+        """List Dropbox folder entries"""
+        return await self.rpc_request("files/list_folder", {"path": path})
+
+    async def files_list_folder_continue(self, cursor: str) -> dict[str, Any]:
+        """List Dropbox folder entries changed since provided listing cursor"""
+        return await self.rpc_request("files/list_folder/continue", {"cursor": cursor})
+
+    async def files_download(self, path: str) -> tuple[dict[str, Any], httpx.Response]:
+        """Download file from Dropbox storage, return file metadata and response"""
+        response = await self.content_request("files/download", {"path": path})
+        metadata = json.loads(response.headers.get("Dropbox-API-Result", "{}"))
+        return metadata, response
+
+    async def files_download_range(
+        self, path: str, range_start: int
+    ) -> tuple[dict[str, Any], httpx.Response]:
+        """Download file content starting from provided byte offset.
+        Response status is 206 if Dropbox returned only requested range"""
+        response = await self.content_request(
+            "files/download", {"path": path}, headers={"Range": f"bytes={range_start}-"}
+        )
+        metadata = json.loads(response.headers.get("Dropbox-API-Result", "{}"))
+        return metadata, response
+
+    async def files_upload(self, content: bytes, path: str) -> dict[str, Any]:
+        """Upload file content to Dropbox storage"""
+        response = await self.content_request(
+            "files/upload", {"path": path, "mode": "add"}, content
+        )
+        return response.json()
+
+    async def files_upload_session_start(self, content: bytes) -> str:
+        """Start upload session with first file chunk, return session id"""
+        response = await self.content_request(
+            "files/upload_session/start", {"close": False}, content
+        )
+        return response.json()["session_id"]
+
+    async def files_upload_session_append(
+        self, session_id: str, offset: int, content: bytes
+    ) -> None:
+        """Append file chunk to upload session"""
+        await self.content_request(
+            "files/upload_session/append_v2",
+            {"cursor": {"session_id": session_id, "offset": offset}, "close": False},
+            content,
+        )
+
+    async def files_upload_session_finish(
+        self, session_id: str, offset: int, content: bytes, path: str
+    ) -> dict[str, Any]:
+        """Upload last file chunk and commit upload session to Dropbox storage"""
+        response = await self.content_request(
+            "files/upload_session/finish",
+            {
+                "cursor": {"session_id": session_id, "offset": offset},
+                "commit": {"path": path, "mode": "add"},
+            },
+            content,
+        )
+        return response.json()
+
+    async def get_monefy_info(
+        self, latest_monefy_backup: dict[str, Any] | None = None
+    ) -> MonefyTransactionStore:
         """
         Get latest Monefy backup csv file from user Dropbox storage
-        and transform it to JSON object
+        or local mirror and parse it chunk by chunk to columnar transaction store.
+        If latest backup appends transactions to the last ingested account backup,
+        only new tail of backup is downloaded and parsed.
+        Latest backup metadata can be provided if it was already listed
         """
-        latest_monefy_backup_file = self.get_latest_monefy_csv_file()
+        if latest_monefy_backup is None:
+            latest_monefy_backup = await self.get_latest_monefy_backup()
+        return await self.backup_ingestion.ingest_monefy_backup(latest_monefy_backup)
+
+    async def sync_monefy_backup_index(self) -> MonefyBackupIndex:
+        """
+        Fetch Dropbox folder entries changed since last listing cursor
+        and apply them to account Monefy backup index.
+        Clients without account fetch full folder listing every time
+        """
+        if self.account_id is None:
+            backup_index = MonefyBackupIndex()
+        else:
+            backup_index = self.backup_listing.get_index(self.account_id)
 
-        logger.info(f"reading: {latest_monefy_backup_file}")
-        _, response = self.dropbox_client.files_download(
-            self.monefy_backup_files_folder + latest_monefy_backup_file
-        )
-        monefy_data_response = response.content.decode(encoding="utf-8-sig").replace(
-            "date,account,category,amount,currency,converted amount,currency,description",
-            "date,account,category,amount,currency,converted amount,converted currency,description",
-        )
-        monefy_data_io = StringIO(monefy_data_response)
-        csv_data = csv.DictReader(
-            monefy_data_io, delimiter=","
-        )  # delimiter char -  , ; and  decimal separator . ,
-        return self.csv_file_to_json_object(csv_data)
-
-    def download_monefy_info(self, file_name: str) -> str:
-        """Save latest csv file with monefy transactions to local EC2 storage"""
-        os.makedirs("monefy_csv_files", exist_ok=True)
         try:
-            with open(f"monefy_csv_files/{file_name}", "wb") as monefy_file:
-                _, response = self.dropbox_client.files_download(
-                    self.monefy_backup_files_folder + file_name
+            if backup_index.cursor:
+                folder_entries = await self.files_list_folder_continue(
+                    backup_index.cursor
+                )
+            else:
+                folder_entries = await self.files_list_folder(
+                    self.monefy_backup_files_folder
                 )
-                logger.info(f"writing {file_name}")
-                monefy_file.write(response.content)
-        except IOError as io_error:
-            logger.error(f"raised error: {io_error}")
+        except httpx.HTTPStatusError as listing_error:
+            if listing_error.response.status_code != 409 or self.account_id is None:
+                raise
+            logger.warning(f"dropbox listing cursor reset for {self.account_id}")
+            backup_index = self.backup_listing.reset_index(self.account_id)
+            folder_entries = await self.files_list_folder(
+                self.monefy_backup_files_folder
+            )
 
-        return file_name
+        added_backups, removed_timestamps = backup_index.apply_entries(
+            folder_entries["entries"]
+        )
+        while folder_entries.get("has_more"):
+            folder_entries = await self.files_list_folder_continue(
+                folder_entries["cursor"]
+            )
+            added, removed = backup_index.apply_entries(folder_entries["entries"])
+            added_backups.extend(added)
+            removed_timestamps.extend(removed)
+        backup_index.cursor = folder_entries["cursor"]
 
-    def get_latest_monefy_csv_file(self) -> str:
+        if self.account_id is not None:
+            self.backup_listing.save_changes(
+                self.account_id, backup_index, added_backups, removed_timestamps
+            )
+        return backup_index
+
+    async def get_latest_monefy_backup(self) -> dict[str, Any]:
         """
-        Get latest monefy backup csv file
-        from existing csv files in Dropbox storage
+        Get latest monefy backup csv file metadata
+        from account Monefy backup index
         """
-        file_names = [
-            entry.name
-            for entry in self.dropbox_client.files_list_folder(
-                self.monefy_backup_files_folder
-            ).entries
-            if re.match("monefy-(.+?).csv", entry.name)
-        ]
-        if not file_names:
+        backup_index = await self.sync_monefy_backup_index()
+        if not (latest_backup := backup_index.latest()):
             logger.warning("user don't have monefy backup files")
             raise NotFound(
                 f"Monefy csv backup file not found in Dropbox storage."
                 f" Please upload Your Monefy backup file to {self.monefy_backup_files_folder}"
             )
-        latest_monefy_datetime = max(
-            map(
-                lambda list_of_csv_files: datetime.strptime(
-                    re.search("monefy-(.+?).csv", list_of_csv_files).group(1),
-                    "%Y-%m-%d_%H-%M-%S",
-                ),
-                file_names,
-            ),
-            default=datetime.now(),
-        ).strftime("%Y-%m-%d_%H-%M-%S")
-        monefy_csv_file = f"monefy-{latest_monefy_datetime}.csv"
-        logger.info(f"get file from dropbox: {monefy_csv_file}")
-        return monefy_csv_file
-
-    def upload_summarized_file(self, file_name: str) -> None:
-        """Upload summarized monefy backup file information to Dropbox storage"""
+        _, latest_monefy_backup = latest_backup
+        logger.info(f"get file from dropbox: {latest_monefy_backup['name']}")
+        return latest_monefy_backup
+
+    async def get_latest_monefy_csv_file(self) -> str:
+        """
+        Get latest monefy backup csv file
+        from existing csv files in Dropbox storage
+        """
+        latest_monefy_backup = await self.get_latest_monefy_backup()
+        return latest_monefy_backup["name"]
+
+    async def upload_summarized_file(
+        self, file_name: str, upload_name: str | None = None
+    ) -> None:
+        """
+        Upload summarized monefy backup file information to Dropbox storage.
+        File is streamed from disk by fixed size chunks,
+        files larger than one chunk are uploaded with Dropbox upload session.
+        Uploaded file is named by upload name if it differs from local file name
+        """
         file_from = os.path.join(self.csv_directory_path, file_name)
         file_to = (
-            f"{self.monefy_backup_files_folder}summarized_{os.path.basename(file_name)}"
+            f"{self.monefy_backup_files_folder}"
+            f"summarized_{os.path.basename(upload_name or file_name)}"
         )
-        with open(file_from, "rb") as binary_file:
-            self.dropbox_client.files_upload(binary_file.read(), file_to)
+        async with aiofiles.open(file_from, "rb") as binary_file:
+            chunk = await binary_file.read(self.upload_chunk_size)
+            next_chunk = await binary_file.read(self.upload_chunk_size)
+            if not next_chunk:
+                await self.files_upload(chunk, file_to)
+                return
+
+            logger.info(f"upload {file_to} by upload session")
+            session_id = await self.files_upload_session_start(chunk)
+            offset = len(chunk)
+            chunk = next_chunk
+            while next_chunk := await binary_file.read(self.upload_chunk_size):
+                await self.files_upload_session_append(session_id, offset, chunk)
+                offset += len(chunk)
+                chunk = next_chunk
+            await self.files_upload_session_finish(session_id, offset, chunk, file_to)
 
-    def get_dropbox_user_info(self) -> DropboxUser:
+    async def get_dropbox_user_info(self) -> DropboxUser:
         """Get authorized Dropbox user information"""
-        dp_user_info = self.dropbox_client.users_get_current_account()
-        dp_user = DropboxUser(dp_user_info)
+        dp_user_info = await self.rpc_request("users/get_current_account")
+        dp_user = DropboxUser(
+            json_compat_obj_decode(FullAccount_validator, dp_user_info, strict=False)
+        )
         return dp_user
 
-    @staticmethod
-    def csv_file_to_json_object(csv_data: csv.DictReader) -> list[dict[str, str]]:
-        """Method for converting Monefy csv backup file to json like object"""
-        logger.info("creating monefy json object from csv file")
-        file_data = []
-        for transaction in csv_data:
-            file_data.append(transaction)
-        return file_data
-
 
 class DropboxAuthenticator:
     """
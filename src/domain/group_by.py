@@ -0,0 +1,151 @@
+"""Group by engine for Monefy transactions aggregation by several dimensions"""
+from datetime import date
+from itertools import repeat
+from typing import Any, Callable, Iterable
+
+from src.common.http_codes import NotAcceptable
+from src.domain.transaction_ledger import RollupRow
+from src.domain.transaction_store import MonefyTransactionStore
+
+TIME_BUCKETS: dict[str, Callable[[date], str]] = {
+    "day": lambda bucket_date: bucket_date.isoformat(),
+    "week": lambda bucket_date: (
+        f"{bucket_date.isocalendar().year}-W{bucket_date.isocalendar().week:02d}"
+    ),
+    "month": lambda bucket_date: f"{bucket_date.year}-{bucket_date.month:02d}",
+    "year": lambda bucket_date: str(bucket_date.year),
+}
+GROUP_BY_DIMENSIONS = ("category", "account", "currency", *TIME_BUCKETS)
+
+
+def parse_group_by(group_by: str) -> tuple[str, ...]:
+    """Parse comma separated group by dimensions of aggregation request"""
+    dimensions = tuple(
+        filter(None, (dimension.strip().lower() for dimension in group_by.split(",")))
+    )
+    if not dimensions or not set(dimensions) <= set(GROUP_BY_DIMENSIONS):
+        raise NotAcceptable(f"Provided group by ({group_by}) not supported")
+    return tuple(dict.fromkeys(dimensions))
+
+
+class TransactionGroupBy:
+    """
+    Single pass aggregation of transaction store by any combination
+    of category, account, currency and time bucket dimensions.
+    Rows are grouped by integer dictionary codes and date ordinals
+    with integer minor units sums of converted amounts in base currency,
+    labels and time buckets are resolved only for distinct groups after the pass
+    """
+
+    def __init__(
+        self, transactions: MonefyTransactionStore, dimensions: Iterable[str]
+    ) -> None:
+        self.transactions = transactions
+        self.dimensions = tuple(dimensions)
+        self.dictionary_columns = {
+            "category": transactions.categories,
+            "account": transactions.accounts,
+            "currency": transactions.currencies,
+        }
+        self.time_dimensions = [
+            dimension for dimension in self.dimensions if dimension in TIME_BUCKETS
+        ]
+
+    def group_codes(self) -> dict[tuple[int, ...], list[int]]:
+        """Sum income, expense and count transactions by raw dimension codes"""
+        code_columns: list[Iterable[int]] = [
+            self.dictionary_columns[dimension].codes
+            for dimension in self.dimensions
+            if dimension in self.dictionary_columns
+        ]
+        if self.time_dimensions:
+            code_columns.append(self.transactions.dates)
+        group_keys: Iterable[tuple[int, ...]] = (
+            zip(*code_columns) if code_columns else repeat(())
+        )
+
+        code_groups: dict[tuple[int, ...], list[int]] = {}
+        for group_key, amount in zip(group_keys, self.transactions.converted_amounts):
+            if (group_totals := code_groups.get(group_key)) is None:
+                group_totals = code_groups[group_key] = [0, 0, 0]
+            group_totals[amount < 0] += amount
+            group_totals[2] += 1
+        return code_groups
+
+    def group_labels(self, group_key: tuple[int, ...]) -> tuple[str, ...]:
+        """Resolve dictionary codes and date ordinal of group to dimension labels"""
+        dictionary_codes = iter(group_key)
+        group_date = date.fromordinal(group_key[-1]) if self.time_dimensions else None
+        labels = []
+        for dimension in self.dimensions:
+            if group_date and dimension in TIME_BUCKETS:
+                labels.append(TIME_BUCKETS[dimension](group_date))
+            else:
+                dictionary_column = self.dictionary_columns[dimension]
+                labels.append(dictionary_column.values[next(dictionary_codes)])
+        return tuple(labels)
+
+    def aggregate(self) -> list[dict[str, Any]]:
+        """Get income, expense, balance and transactions count of every group"""
+        label_groups: dict[tuple[str, ...], list[int]] = {}
+        for group_key, (income, expense, count) in self.group_codes().items():
+            group_totals = label_groups.setdefault(
+                self.group_labels(group_key), [0, 0, 0]
+            )
+            group_totals[0] += income
+            group_totals[1] += expense
+            group_totals[2] += count
+
+        return grouped_rows(self.dimensions, label_groups, self.transactions)
+
+
+def grouped_rows(
+    dimensions: tuple[str, ...],
+    label_groups: dict[tuple[str, ...], list[int]],
+    transactions: MonefyTransactionStore,
+) -> list[dict[str, Any]]:
+    """Get income, expense, balance and transactions count rows sorted by group labels"""
+    return [
+        {
+            **dict(zip(dimensions, labels)),
+            "income": transactions.to_decimal(income),
+            "expense": transactions.to_decimal(expense),
+            "balance": transactions.to_decimal(income + expense),
+            "transactions": count,
+        }
+        for labels, (income, expense, count) in sorted(label_groups.items())
+    ]
+
+
+def rollup_table(dimensions: tuple[str, ...]) -> str | None:
+    """Get rollup table that can be used for group by dimensions"""
+    if not set(dimensions) <= {"category", "currency", *TIME_BUCKETS}:
+        return None
+    if set(dimensions) <= {"category", "currency", "month", "year"}:
+        return "monthly_rollups"
+    return "daily_rollups"
+
+
+def aggregate_rollups(
+    rollups: Iterable[RollupRow],
+    dimensions: tuple[str, ...],
+    transactions: MonefyTransactionStore,
+) -> list[dict[str, Any]]:
+    """Group daily or monthly category and currency rollups by dimensions"""
+    label_groups: dict[tuple[str, ...], list[int]] = {}
+    for bucket, category, currency, income, expense, _, count in rollups:
+        bucket_labels = {"category": category, "currency": currency}
+        bucket_date = date.fromordinal(bucket)
+        group_totals = label_groups.setdefault(
+            tuple(
+                bucket_labels[dimension]
+                if dimension in bucket_labels
+                else TIME_BUCKETS[dimension](bucket_date)
+                for dimension in dimensions
+            ),
+            [0, 0, 0],
+        )
+        group_totals[0] += income
+        group_totals[1] += expense
+        group_totals[2] += count
+    return grouped_rows(dimensions, label_groups, transactions)
@@ -0,0 +1,202 @@
+"""Per day prefix sums of Monefy transactions for constant time date range totals"""
+import weakref
+from array import array
+from collections import OrderedDict
+from dataclasses import replace
+from datetime import date
+from itertools import accumulate
+from typing import Any, Iterable, Mapping, Sequence
+
+from src.common.http_codes import NotAcceptable
+from src.domain.currency_normalization import base_currency
+from src.domain.transaction_query import TransactionQuery
+from src.domain.transaction_store import MonefyTransactionStore
+
+ROLLING_WINDOWS = (7, 30, 90)
+# prefix sums of store transactions filtered by query, by query representation
+QueryPrefixSums = weakref.WeakKeyDictionary[
+    MonefyTransactionStore, OrderedDict[str, "DailyPrefixSums"]
+]
+
+
+def parse_analytics_query(args: Mapping[str, Sequence[str]]) -> TransactionQuery:
+    """Parse transaction filters of analytics, columns projection is not supported"""
+    transaction_query = TransactionQuery.from_args(args)
+    if transaction_query.columns:
+        raise NotAcceptable(
+            f"Provided columns ({','.join(transaction_query.columns)}) "
+            f"not supported for analytics"
+        )
+    return transaction_query
+
+
+def parse_windows(args: Mapping[str, Sequence[str]]) -> tuple[int, ...]:
+    """Parse repeated or comma separated rolling window days query parameter"""
+    window_values = [
+        value.strip()
+        for argument in args.get("window", [])
+        for value in argument.split(",")
+        if value.strip()
+    ]
+    if not window_values:
+        return ROLLING_WINDOWS
+    if not all(value.isdigit() and int(value) > 0 for value in window_values):
+        raise NotAcceptable(
+            f"Provided window ({','.join(window_values)}) not supported"
+        )
+    return tuple(dict.fromkeys(int(value) for value in window_values))
+
+
+class DailyPrefixSums:
+    """
+    Prefix sums of converted amounts in base currency by day:
+    income, expense and every category net amount from the first transaction day.
+    Total of any date range is a difference of two prefix sums
+    """
+
+    max_queries = 16
+    prefix_sums: "weakref.WeakKeyDictionary[MonefyTransactionStore, DailyPrefixSums]" = (
+        weakref.WeakKeyDictionary()
+    )
+    query_prefix_sums: QueryPrefixSums = weakref.WeakKeyDictionary()
+
+    def __init__(self, transactions: MonefyTransactionStore) -> None:
+        self.rows_count = len(transactions)
+        # rows count of unfiltered store that query prefix sums were built from
+        self.store_rows_count = self.rows_count
+        self.first_day = min(transactions.dates, default=0)
+        self.days = (
+            max(transactions.dates, default=self.first_day - 1) - self.first_day + 1
+        )
+
+        daily_income = [0] * self.days
+        daily_expense = [0] * self.days
+        daily_categories = [[0] * self.days for _ in transactions.categories.values]
+        for transaction_day, amount, category_code in zip(
+            transactions.dates,
+            transactions.converted_amounts,
+            transactions.categories.codes,
+        ):
+            day = transaction_day - self.first_day
+            if amount < 0:
+                daily_expense[day] += amount
+            else:
+                daily_income[day] += amount
+            daily_categories[category_code][day] += amount
+
+        self.income = self.accumulate(daily_income)
+        self.expense = self.accumulate(daily_expense)
+        self.categories = {
+            category: self.accumulate(daily_amounts)
+            for category, daily_amounts in zip(
+                transactions.categories.values, daily_categories
+            )
+        }
+
+    @classmethod
+    def for_store(cls, transactions: MonefyTransactionStore) -> "DailyPrefixSums":
+        """Get prefix sums built once per store, they are rebuilt when transactions
+        were appended"""
+        prefix_sums = cls.prefix_sums.get(transactions)
+        if prefix_sums is None or prefix_sums.rows_count != len(transactions):
+            prefix_sums = cls.prefix_sums[transactions] = cls(transactions)
+        return prefix_sums
+
+    @classmethod
+    def for_query(
+        cls, transactions: MonefyTransactionStore, transaction_query: TransactionQuery
+    ) -> "DailyPrefixSums":
+        """Get prefix sums of transactions that match query filters except date range,
+        they are built once per store and query and rebuilt when transactions
+        were appended. Date range is applied by analyze"""
+        rows_query = replace(transaction_query, date_from=None, date_to=None)
+        if rows_query.is_empty:
+            return cls.for_store(transactions)
+        store_prefix_sums = cls.query_prefix_sums.setdefault(
+            transactions, OrderedDict()
+        )
+        query_key = repr(rows_query)
+        prefix_sums = store_prefix_sums.get(query_key)
+        if prefix_sums is None or prefix_sums.store_rows_count != len(transactions):
+            prefix_sums = cls(rows_query.apply(transactions))
+            prefix_sums.store_rows_count = len(transactions)
+            store_prefix_sums[query_key] = prefix_sums
+        store_prefix_sums.move_to_end(query_key)
+        while len(store_prefix_sums) > cls.max_queries:
+            store_prefix_sums.popitem(last=False)
+        return prefix_sums
+
+    @staticmethod
+    def accumulate(daily_amounts: Iterable[int]) -> "array[int]":
+        """Get prefix sums array that starts with zero"""
+        return array("q", accumulate(daily_amounts, initial=0))
+
+    @property
+    def last_day(self) -> int:
+        """Get last transaction day ordinal"""
+        return self.first_day + self.days - 1
+
+    def range_total(self, prefix_sum: "array[int]", day_from: int, day_to: int) -> int:
+        """Get total of prefix summed amounts from day to day inclusive"""
+        start = min(max(day_from - self.first_day, 0), self.days)
+        end = min(max(day_to - self.first_day + 1, 0), self.days)
+        return prefix_sum[end] - prefix_sum[start] if end > start else 0
+
+    def balance_until(self, day: int) -> int:
+        """Get running balance at the end of day"""
+        return self.range_total(self.income, self.first_day, day) + self.range_total(
+            self.expense, self.first_day, day
+        )
+
+    def analyze(
+        self,
+        transactions: MonefyTransactionStore,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        categories: Sequence[str] = (),
+        windows: Sequence[int] = ROLLING_WINDOWS,
+    ) -> dict[str, Any]:
+        """
+        Get date range income, expense and category totals,
+        rolling windows totals that end with the last range day
+        and running balance of range days with transactions in base currency
+        """
+        day_from = date_from.toordinal() if date_from else self.first_day
+        day_to = date_to.toordinal() if date_to else self.last_day
+        income = self.range_total(self.income, day_from, day_to)
+        expense = self.range_total(self.expense, day_from, day_to)
+        return {
+            "currency": base_currency(transactions),
+            "from": date.fromordinal(day_from).isoformat() if self.days else None,
+            "to": date.fromordinal(day_to).isoformat() if self.days else None,
+            "income": transactions.to_decimal(income),
+            "expense": transactions.to_decimal(expense),
+            "balance": transactions.to_decimal(income + expense),
+            "categories": {
+                category: transactions.to_decimal(
+                    self.range_total(category_prefix_sum, day_from, day_to)
+                )
+                for category, category_prefix_sum in self.categories.items()
+                if not categories or category in categories
+            },
+            "rolling": {
+                str(window): {
+                    "income": transactions.to_decimal(
+                        self.range_total(self.income, day_to - window + 1, day_to)
+                    ),
+                    "expense": transactions.to_decimal(
+                        self.range_total(self.expense, day_to - window + 1, day_to)
+                    ),
+                }
+                for window in windows
+            },
+            "running_balance": [
+                {
+                    "date": date.fromordinal(day).isoformat(),
+                    "balance": transactions.to_decimal(self.balance_until(day)),
+                }
+                for day in range(
+                    max(day_from, self.first_day), min(day_to, self.last_day) + 1
+                )
+            ],
+        }
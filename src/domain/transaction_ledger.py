@@ -0,0 +1,308 @@
+"""Persistent ledger of ingested Monefy transactions"""
+import asyncio
+import json
+import math
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, TypeVar
+
+from src.domain.backup_ingestion import IngestedMonefyBackup
+from src.domain.csv_dialect import MonefyCsvDialect
+from src.domain.transaction_query import TransactionQuery
+from src.domain.transaction_store import MonefyTransactionStore
+
+# date ordinal is converted to julian day to calculate month first day ordinal
+ROLLUP_BUCKETS = {
+    "daily_rollups": "date",
+    "monthly_rollups": (
+        "CAST(julianday(date(date + 1721424.5, 'start of month')) - 1721424.5 "
+        "AS INTEGER)"
+    ),
+}
+RollupRow = tuple[int, str, str, int, int, int, int]
+# stored transaction columns in order of transaction store typed rows
+TRANSACTION_COLUMNS = (
+    "date, account, category, amount, currency, converted_amount, "
+    "converted_currency, description, amount_digits, converted_amount_digits"
+)
+LedgerResult = TypeVar("LedgerResult")
+
+
+class MonefyTransactionLedger:
+    """
+    Per account Monefy transactions persisted to application database.
+    Transactions of the last ingested backup are stored with dates as ordinals
+    and amounts as integer minor units, so they can be loaded to transaction store
+    without downloading and parsing backup again.
+    Backup that appends transactions to stored one only inserts new rows.
+    Ledger queries are run off the event loop one at a time by ledger thread
+    """
+
+    def __init__(self, sqlite_connection: sqlite3.Connection) -> None:
+        self.sqlite_connection = sqlite_connection
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix="monefy-ledger")
+
+    async def run(
+        self, ledger_method: Callable[..., LedgerResult], *args: Any
+    ) -> LedgerResult:
+        """Run ledger method in ledger thread without blocking event loop"""
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, partial(ledger_method, *args)
+        )
+
+    def load_ingested_backup(self, account_id: str) -> IngestedMonefyBackup | None:
+        """Load last ingested account backup with its transactions from database"""
+        ledger_row = self.sqlite_connection.execute(
+            """
+            SELECT backup_key, length, prefix_tail_digest, prefix_tail_size, fieldnames,
+            amount_scale, delimiter, decimal_separator, date_format
+            FROM monefy_ledgers WHERE account_id = ?
+            """,
+            (account_id,),
+        ).fetchone()
+        if not ledger_row:
+            return None
+
+        (
+            backup_key,
+            length,
+            prefix_tail_digest,
+            prefix_tail_size,
+            fieldnames,
+            amount_scale,
+            delimiter,
+            decimal_separator,
+            date_format,
+        ) = ledger_row
+        transaction_rows = self.sqlite_connection.execute(
+            f"""
+            SELECT {TRANSACTION_COLUMNS} FROM transactions
+            WHERE account_id = ? ORDER BY row_number
+            """,
+            (account_id,),
+        )
+        return IngestedMonefyBackup(
+            backup_key=backup_key,
+            length=length,
+            prefix_tail_digest=prefix_tail_digest,
+            prefix_tail_size=prefix_tail_size,
+            fieldnames=json.loads(fieldnames),
+            transactions=MonefyTransactionStore.from_typed_rows(
+                transaction_rows,
+                amount_scale,
+                MonefyCsvDialect(delimiter, decimal_separator, date_format),
+            ),
+        )
+
+    def select_transactions(
+        self, account_id: str, backup_key: str, transaction_query: TransactionQuery
+    ) -> MonefyTransactionStore | None:
+        """
+        Select stored transactions of ingested account backup that match query
+        filters, date range and categories are looked up by (account_id, date)
+        and (account_id, category) indexes.
+        Return None if ledger doesn't contain provided backup
+        """
+        ledger_row = self.sqlite_connection.execute(
+            """
+            SELECT backup_key, amount_scale, delimiter, decimal_separator, date_format
+            FROM monefy_ledgers WHERE account_id = ?
+            """,
+            (account_id,),
+        ).fetchone()
+        if not ledger_row or ledger_row[0] != backup_key:
+            return None
+
+        _, amount_scale, delimiter, decimal_separator, date_format = ledger_row
+        conditions = ["account_id = ?"]
+        parameters: list[Any] = [account_id]
+        for condition, value in (
+            ("date >= ?", transaction_query.date_from),
+            ("date <= ?", transaction_query.date_to),
+        ):
+            if value:
+                conditions.append(condition)
+                parameters.append(value.toordinal())
+        for column, values in (
+            ("category", transaction_query.categories),
+            ("account", transaction_query.accounts),
+        ):
+            if values:
+                conditions.append(f"{column} IN ({', '.join('?' * len(values))})")
+                parameters.extend(values)
+        for condition, amount in zip(
+            ("amount >= ?", "amount <= ?"),
+            transaction_query.amount_range(amount_scale),
+        ):
+            if not math.isinf(amount):
+                conditions.append(condition)
+                parameters.append(amount)
+        transaction_rows = self.sqlite_connection.execute(
+            f"""
+            SELECT {TRANSACTION_COLUMNS} FROM transactions
+            WHERE {' AND '.join(conditions)} ORDER BY row_number
+            """,
+            parameters,
+        )
+        transactions = MonefyTransactionStore.from_typed_rows(
+            transaction_rows,
+            amount_scale,
+            MonefyCsvDialect(delimiter, decimal_separator, date_format),
+        )
+        transactions.fieldnames = transaction_query.columns or transactions.fieldnames
+        return transactions
+
+    def save_ingested_backup(
+        self,
+        account_id: str,
+        ingested_backup: IngestedMonefyBackup,
+        previous_backup: IngestedMonefyBackup | None = None,
+    ) -> None:
+        """
+        Persist account ingested backup. If transactions extend previous backup
+        transactions, only appended rows are inserted, otherwise all rows are replaced
+        """
+        transactions = ingested_backup.transactions
+        stored_rows = self.count_stored_rows(
+            account_id, ingested_backup, previous_backup
+        )
+        if not stored_rows:
+            self.delete_account_rows(account_id)
+        elif previous_backup and (
+            scale_growth := transactions.amount_scale
+            - previous_backup.transactions.amount_scale
+        ):
+            self.rescale_account_amounts(account_id, 10**scale_growth)
+
+        self.sqlite_connection.executemany(
+            """
+            INSERT INTO transactions
+            (account_id, row_number, date, account, category, amount, currency,
+            converted_amount, converted_currency, description, amount_digits,
+            converted_amount_digits)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                (account_id, row_number, *transaction_row)
+                for row_number, transaction_row in enumerate(
+                    transactions.iter_typed_rows(stored_rows), start=stored_rows
+                )
+            ),
+        )
+        self.update_rollups(account_id, stored_rows)
+        self.sqlite_connection.execute(
+            """
+            INSERT OR REPLACE INTO monefy_ledgers
+            (account_id, backup_key, length, prefix_tail_digest, prefix_tail_size,
+            fieldnames, amount_scale, delimiter, decimal_separator, date_format)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                account_id,
+                ingested_backup.backup_key,
+                ingested_backup.length,
+                ingested_backup.prefix_tail_digest,
+                ingested_backup.prefix_tail_size,
+                json.dumps(ingested_backup.fieldnames),
+                transactions.amount_scale,
+                transactions.csv_dialect.delimiter,
+                transactions.csv_dialect.decimal_separator,
+                transactions.date_format,
+            ),
+        )
+        self.sqlite_connection.commit()
+
+    def count_stored_rows(
+        self,
+        account_id: str,
+        ingested_backup: IngestedMonefyBackup,
+        previous_backup: IngestedMonefyBackup | None,
+    ) -> int:
+        """Get number of stored account transactions that can be kept:
+        they must belong to previous backup and have the same date ordinals"""
+        if previous_backup is None or (
+            ingested_backup.transactions.date_format
+            != previous_backup.transactions.date_format
+        ):
+            return 0
+        if self.get_backup_key(account_id) != previous_backup.backup_key:
+            return 0
+        return len(previous_backup.transactions)
+
+    def get_backup_key(self, account_id: str) -> str | None:
+        """Get key of last ingested account backup stored in ledger"""
+        ledger_row = self.sqlite_connection.execute(
+            "SELECT backup_key FROM monefy_ledgers WHERE account_id = ?", (account_id,)
+        ).fetchone()
+        return ledger_row[0] if ledger_row else None
+
+    def delete_account_rows(self, account_id: str) -> None:
+        """Delete stored account transactions and their rollups"""
+        for table in ("transactions", *ROLLUP_BUCKETS):
+            self.sqlite_connection.execute(
+                f"DELETE FROM {table} WHERE account_id = ?", (account_id,)
+            )
+
+    def rescale_account_amounts(self, account_id: str, multiplier: int) -> None:
+        """Multiply stored account amounts when transaction store amount scale grows"""
+        self.sqlite_connection.execute(
+            """
+            UPDATE transactions SET amount = amount * ?,
+            converted_amount = converted_amount * ? WHERE account_id = ?
+            """,
+            (multiplier, multiplier, account_id),
+        )
+        for rollup_table in ROLLUP_BUCKETS:
+            self.sqlite_connection.execute(
+                f"""
+                UPDATE {rollup_table} SET income = income * ?, expense = expense * ?,
+                amount = amount * ? WHERE account_id = ?
+                """,
+                (multiplier, multiplier, multiplier, account_id),
+            )
+
+    def update_rollups(self, account_id: str, start_row: int) -> None:
+        """Add account transactions stored starting from provided row
+        to daily and monthly rollups by category and currency.
+        Income and expense are summed from converted amounts in base currency,
+        amount is summed in original currency"""
+        for rollup_table, rollup_bucket in ROLLUP_BUCKETS.items():
+            self.sqlite_connection.execute(
+                f"""
+                INSERT INTO {rollup_table}
+                (account_id, bucket, category, currency, income, expense, amount,
+                transactions)
+                SELECT account_id, {rollup_bucket}, category, currency,
+                SUM(CASE WHEN converted_amount > 0 THEN converted_amount ELSE 0 END),
+                SUM(CASE WHEN converted_amount < 0 THEN converted_amount ELSE 0 END),
+                SUM(amount), COUNT(*)
+                FROM transactions WHERE account_id = ? AND row_number >= ?
+                GROUP BY 2, category, currency
+                ON CONFLICT (account_id, bucket, category, currency) DO UPDATE SET
+                income = income + excluded.income,
+                expense = expense + excluded.expense,
+                amount = amount + excluded.amount,
+                transactions = transactions + excluded.transactions
+                """,
+                (account_id, start_row),
+            )
+
+    def get_rollups(
+        self, account_id: str, backup_key: str, rollup_table: str
+    ) -> list[RollupRow] | None:
+        """
+        Get account rollups of ingested backup: bucket first day ordinal, category,
+        currency, income and expense in base currency, amount in currency
+        as minor units and transactions count.
+        Return None if ledger doesn't contain provided backup
+        """
+        if self.get_backup_key(account_id) != backup_key:
+            return None
+        return self.sqlite_connection.execute(
+            f"""
+            SELECT bucket, category, currency, income, expense, amount, transactions
+            FROM {rollup_table} WHERE account_id = ? ORDER BY bucket, category, currency
+            """,
+            (account_id,),
+        ).fetchall()
@@ -0,0 +1,289 @@
+"""Filtered and projected queries over Monefy transaction store"""
+import bisect
+import copy
+import math
+import weakref
+from array import array
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Mapping, Sequence
+
+from src.common.http_codes import NotAcceptable
+from src.domain.transaction_store import (MONEFY_FIELDNAMES, DictionaryColumn,
+                                          MonefyTransactionStore,
+                                          TransactionRow)
+
+# amounts are compared as integer minor units
+MAX_AMOUNT_EXPONENT = 12
+
+
+class TransactionIndex:
+    """
+    Indexes of transaction store: row numbers sorted by date for date range
+    binary search and posting lists of row numbers by category and account codes
+    """
+
+    indexes: "weakref.WeakKeyDictionary[MonefyTransactionStore, TransactionIndex]" = (
+        weakref.WeakKeyDictionary()
+    )
+
+    def __init__(self, transactions: MonefyTransactionStore) -> None:
+        self.rows_count = len(transactions)
+        self.date_rows = array(
+            "I", sorted(range(len(transactions)), key=transactions.dates.__getitem__)
+        )
+        self.sorted_dates = array(
+            "l", (transactions.dates[row] for row in self.date_rows)
+        )
+        self.category_postings = self.posting_lists(transactions.categories)
+        self.account_postings = self.posting_lists(transactions.accounts)
+
+    @classmethod
+    def for_store(cls, transactions: MonefyTransactionStore) -> "TransactionIndex":
+        """Get cached store index, index is rebuilt when transactions were appended"""
+        transaction_index = cls.indexes.get(transactions)
+        if transaction_index is None or transaction_index.rows_count != len(
+            transactions
+        ):
+            transaction_index = cls.indexes[transactions] = cls(transactions)
+        return transaction_index
+
+    @staticmethod
+    def posting_lists(column: DictionaryColumn) -> "list[array[int]]":
+        """Get ascending row numbers of every dictionary column value"""
+        postings = [array("I") for _ in column.values]
+        for row, value_code in enumerate(column.codes):
+            postings[value_code].append(row)
+        return postings
+
+    def date_range_rows(
+        self, date_from: int | None, date_to: int | None
+    ) -> "array[int]":
+        """Get row numbers of transactions in date range sorted by date"""
+        range_start = (
+            bisect.bisect_left(self.sorted_dates, date_from) if date_from else 0
+        )
+        range_end = (
+            bisect.bisect_right(self.sorted_dates, date_to)
+            if date_to
+            else len(self.sorted_dates)
+        )
+        return self.date_rows[range_start:range_end]
+
+
+@dataclass
+class TransactionQuery:
+    """Transactions filter by date range, categories, accounts and amount range
+    with columns projection"""
+
+    date_from: date | None = None
+    date_to: date | None = None
+    categories: list[str] = field(default_factory=list)
+    accounts: list[str] = field(default_factory=list)
+    min_amount: Decimal | None = None
+    max_amount: Decimal | None = None
+    columns: tuple[str, ...] | None = None
+
+    @classmethod
+    def from_args(cls, args: Mapping[str, Sequence[str]]) -> "TransactionQuery":
+        """Parse transaction query from request query parameters.
+        Dates are ISO formatted, list parameters can be repeated or comma separated"""
+        try:
+            transaction_query = cls(
+                date_from=cls.parse_date(args, "from"),
+                date_to=cls.parse_date(args, "to"),
+                categories=cls.parse_list(args, "category"),
+                accounts=cls.parse_list(args, "account"),
+                min_amount=cls.parse_amount(args, "min_amount"),
+                max_amount=cls.parse_amount(args, "max_amount"),
+                columns=tuple(cls.parse_list(args, "columns")) or None,
+            )
+        except (ValueError, InvalidOperation) as query_error:
+            raise NotAcceptable(
+                f"Provided query parameters not supported: {query_error}"
+            ) from query_error
+        if transaction_query.columns and not set(transaction_query.columns) <= set(
+            MONEFY_FIELDNAMES
+        ):
+            raise NotAcceptable(
+                f"Provided columns ({','.join(transaction_query.columns)}) "
+                f"not supported"
+            )
+        return transaction_query
+
+    @staticmethod
+    def parse_list(args: Mapping[str, Sequence[str]], name: str) -> list[str]:
+        """Parse repeated or comma separated query parameter values"""
+        return [
+            value.strip()
+            for argument in args.get(name, [])
+            for value in argument.split(",")
+            if value.strip()
+        ]
+
+    @staticmethod
+    def parse_date(args: Mapping[str, Sequence[str]], name: str) -> date | None:
+        """Parse ISO formatted date query parameter"""
+        if not (values := args.get(name)):
+            return None
+        return date.fromisoformat(values[0])
+
+    @staticmethod
+    def parse_amount(args: Mapping[str, Sequence[str]], name: str) -> Decimal | None:
+        """Parse finite decimal amount query parameter
+        with limited number of integer and fraction digits"""
+        if not (values := args.get(name)):
+            return None
+        amount = Decimal(values[0])
+        if not amount.is_finite() or abs(amount.adjusted()) > MAX_AMOUNT_EXPONENT:
+            raise NotAcceptable(f"Provided {name} ({values[0]}) not supported")
+        return amount
+
+    @property
+    def is_empty(self) -> bool:
+        """Check if query doesn't filter or project transactions"""
+        return self == TransactionQuery()
+
+    def candidate_rows(
+        self, transactions: MonefyTransactionStore, transaction_index: TransactionIndex
+    ) -> list[Sequence[int]]:
+        """Get row numbers matching indexed filters, one sequence per filter"""
+        candidates: list[Sequence[int]] = []
+        if self.date_from or self.date_to:
+            candidates.append(
+                transaction_index.date_range_rows(
+                    self.date_from.toordinal() if self.date_from else None,
+                    self.date_to.toordinal() if self.date_to else None,
+                )
+            )
+        for values, column, postings in (
+            (
+                self.categories,
+                transactions.categories,
+                transaction_index.category_postings,
+            ),
+            (self.accounts, transactions.accounts, transaction_index.account_postings),
+        ):
+            if values:
+                value_codes = [
+                    column.value_codes[value]
+                    for value in values
+                    if value in column.value_codes
+                ]
+                candidates.append(
+                    sorted(row for code in value_codes for row in postings[code])
+                )
+        return candidates
+
+    def select_rows(self, transactions: MonefyTransactionStore) -> list[int]:
+        """
+        Get ascending row numbers of matching transactions.
+        The smallest indexed candidate list drives the query,
+        other filters are checked only for its rows
+        """
+        candidates = self.candidate_rows(
+            transactions, TransactionIndex.for_store(transactions)
+        )
+        rows: Sequence[int] = (
+            min(candidates, key=len) if candidates else range(len(transactions))
+        )
+        date_from = self.date_from.toordinal() if self.date_from else -math.inf
+        date_to = self.date_to.toordinal() if self.date_to else math.inf
+        category_codes = self.value_codes(transactions.categories, self.categories)
+        account_codes = self.value_codes(transactions.accounts, self.accounts)
+        min_amount, max_amount = self.amount_range(transactions.amount_scale)
+
+        return sorted(
+            row
+            for row in rows
+            if date_from <= transactions.dates[row] <= date_to
+            and min_amount <= transactions.amounts[row] <= max_amount
+            and (
+                category_codes is None
+                or transactions.categories.codes[row] in category_codes
+            )
+            and (
+                account_codes is None
+                or transactions.accounts.codes[row] in account_codes
+            )
+        )
+
+    def amount_range(self, amount_scale: int) -> tuple[float, float]:
+        """Get amount range as integer minor units of provided amount scale"""
+        return (
+            math.ceil(self.min_amount.scaleb(amount_scale))
+            if self.min_amount is not None
+            else -math.inf,
+            math.floor(self.max_amount.scaleb(amount_scale))
+            if self.max_amount is not None
+            else math.inf,
+        )
+
+    @property
+    def filters_rows(self) -> bool:
+        """Check if query selects only some of transactions"""
+        return self != TransactionQuery(columns=self.columns)
+
+    @staticmethod
+    def value_codes(column: DictionaryColumn, values: list[str]) -> set[int] | None:
+        """Get dictionary codes of filtered column values"""
+        if not values:
+            return None
+        return {
+            column.value_codes[value] for value in values if value in column.value_codes
+        }
+
+    def apply(self, transactions: MonefyTransactionStore) -> MonefyTransactionStore:
+        """Get store with matching transactions and projected columns"""
+        if self.is_empty:
+            return transactions
+        if self.columns and not self.filters_rows:
+            projected_transactions = copy.copy(transactions)
+            projected_transactions.fieldnames = self.columns
+            return projected_transactions
+        return transactions.take(self.select_rows(transactions), self.columns)
+
+
+@dataclass
+class TransactionPage:
+    """Page of transactions that starts from cursor row of filtered store"""
+
+    cursor: int = 0
+    page_size: int = 100
+
+    @classmethod
+    def from_args(
+        cls, args: Mapping[str, Sequence[str]], page_size: int, max_page_size: int
+    ) -> "TransactionPage":
+        """Parse cursor and page_size query parameters,
+        page size is limited by maximum page size"""
+        page_values = {
+            name: values[0].strip()
+            for name in ("cursor", "page_size")
+            if (values := args.get(name))
+        }
+        if not all(value.isdigit() for value in page_values.values()) or (
+            page_values.get("page_size", "1").strip("0") == ""
+        ):
+            raise NotAcceptable(
+                f"Provided pagination parameters "
+                f"({','.join(page_values.values())}) not supported"
+            )
+        return cls(
+            cursor=int(page_values.get("cursor", 0)),
+            page_size=min(int(page_values.get("page_size", page_size)), max_page_size),
+        )
+
+    def rows(self, transactions: MonefyTransactionStore) -> list[TransactionRow]:
+        """Get lazy row views of page transactions"""
+        return transactions[self.cursor : self.cursor + self.page_size]
+
+    def next_cursor(self, transactions: MonefyTransactionStore) -> int | None:
+        """Get cursor of the next page if there are transactions after page"""
+        next_cursor = self.cursor + self.page_size
+        return next_cursor if next_cursor < len(transactions) else None
+
+    def previous_cursor(self) -> int | None:
+        """Get cursor of the previous page if page isn't the first one"""
+        return max(self.cursor - self.page_size, 0) if self.cursor else None
@@ -0,0 +1,387 @@
+"""Columnar in-memory store of Monefy transactions"""
+from array import array
+from dataclasses import replace
+from datetime import date
+from decimal import Decimal
+from typing import Any, Iterable, Iterator, Mapping, Sequence, overload
+
+from src.domain.csv_dialect import (MONEFY_DATE_FORMATS, MonefyCsvDialect,
+                                    parse_monefy_date)
+
+MONEFY_FIELDNAMES = (
+    "date",
+    "account",
+    "category",
+    "amount",
+    "currency",
+    "converted amount",
+    "converted currency",
+    "description",
+)
+
+
+class DictionaryColumn:
+    """Column of repeated strings stored as integer codes of distinct values"""
+
+    def __init__(self) -> None:
+        self.values: list[str] = []
+        self.value_codes: dict[str, int] = {}
+        self.codes = array("I")
+
+    def encode(self, value: str) -> int:
+        """Get code of column value, new values get next code"""
+        if (value_code := self.value_codes.get(value)) is None:
+            value_code = self.value_codes[value] = len(self.values)
+            self.values.append(value)
+        return value_code
+
+    def append(self, value: str) -> None:
+        """Append value to column"""
+        self.codes.append(self.encode(value))
+
+    def __getitem__(self, index: int) -> str:
+        return self.values[self.codes[index]]
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def take(self, rows: Iterable[int]) -> "DictionaryColumn":
+        """Get column with values of provided rows, column is encoded again,
+        so its distinct values are only values of provided rows"""
+        column_rows = DictionaryColumn()
+        for row in rows:
+            column_rows.append(self[row])
+        return column_rows
+
+    def copy(self) -> "DictionaryColumn":
+        """Copy column, distinct values are shared until new value is appended"""
+        column_copy = DictionaryColumn()
+        column_copy.values = list(self.values)
+        column_copy.value_codes = dict(self.value_codes)
+        column_copy.codes = array("I", self.codes)
+        return column_copy
+
+
+class TransactionRow(Mapping[str, str]):
+    """Lazy read-only view of one transaction from transaction store"""
+
+    __slots__ = ("store", "index")
+
+    def __init__(self, store: "MonefyTransactionStore", index: int) -> None:
+        self.store = store
+        self.index = index
+
+    def __getitem__(self, fieldname: str) -> str:
+        return self.store.get_value(self.index, fieldname)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.store.fieldnames)
+
+    def __len__(self) -> int:
+        return len(self.store.fieldnames)
+
+    def __repr__(self) -> str:
+        return f"TransactionRow({dict(self)})"
+
+
+class MonefyTransactionStore:
+    """
+    Columnar store of Monefy transactions.
+    Amounts are kept as integer minor units (amount * 10 ** amount_scale)
+    with number of fraction digits of every amount for formatting,
+    dates as ordinals, accounts, categories and currencies are dictionary encoded.
+    Amounts and dates are parsed with detected Monefy csv dialect.
+    Rows are exposed as lazy mapping views for templates and file writers
+    """
+
+    def __init__(self, csv_dialect: MonefyCsvDialect | None = None) -> None:
+        self.csv_dialect = csv_dialect or MonefyCsvDialect()
+        self.amount_scale = 0
+        self.dates = array("l")
+        self.accounts = DictionaryColumn()
+        self.categories = DictionaryColumn()
+        self.amounts = array("q")
+        self.currencies = DictionaryColumn()
+        self.converted_amounts = array("q")
+        self.converted_currencies = DictionaryColumn()
+        self.descriptions: list[str] = []
+        self.amount_digits = array("B")
+        self.converted_amount_digits = array("B")
+        self.date_ordinals: dict[str, int] = {}
+        self.fieldnames: tuple[str, ...] = MONEFY_FIELDNAMES
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @property
+    def date_format(self) -> str:
+        """Date format of Monefy backup csv dialect"""
+        return self.csv_dialect.date_format
+
+    @overload
+    def __getitem__(self, index: int) -> TransactionRow:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[TransactionRow]:
+        ...
+
+    def __getitem__(self, index: int | slice) -> TransactionRow | list[TransactionRow]:
+        if isinstance(index, slice):
+            return [TransactionRow(self, row) for row in range(len(self))[index]]
+        if not -len(self) <= index < len(self):
+            raise IndexError("transaction index out of range")
+        return TransactionRow(self, index % len(self))
+
+    def __iter__(self) -> Iterator[TransactionRow]:
+        for index in range(len(self)):
+            yield TransactionRow(self, index)
+
+    def append(self, transaction: Mapping[str, str | None]) -> None:
+        """Append parsed Monefy csv transaction to store"""
+        date_ordinal = self.parse_date(transaction["date"] or "")
+        amount, amount_digits = self.parse_amount(transaction["amount"] or "0")
+        converted_amount, converted_amount_digits = self.parse_amount(
+            transaction.get("converted amount") or "0"
+        )
+        self.dates.append(date_ordinal)
+        self.accounts.append(transaction["account"] or "")
+        self.categories.append(transaction["category"] or "")
+        self.amounts.append(amount)
+        self.currencies.append(transaction["currency"] or "")
+        self.converted_amounts.append(converted_amount)
+        self.converted_currencies.append(transaction.get("converted currency") or "")
+        self.descriptions.append(transaction.get("description") or "")
+        self.amount_digits.append(amount_digits)
+        self.converted_amount_digits.append(converted_amount_digits)
+
+    def extend(self, transactions: Iterable[Mapping[str, str | None]]) -> None:
+        """Append parsed Monefy csv transactions to store"""
+        for transaction in transactions:
+            self.append(transaction)
+
+    def copy(self) -> "MonefyTransactionStore":
+        """Copy store columns"""
+        store_copy = MonefyTransactionStore(self.csv_dialect)
+        store_copy.amount_scale = self.amount_scale
+        store_copy.dates = array("l", self.dates)
+        store_copy.accounts = self.accounts.copy()
+        store_copy.categories = self.categories.copy()
+        store_copy.amounts = array("q", self.amounts)
+        store_copy.currencies = self.currencies.copy()
+        store_copy.converted_amounts = array("q", self.converted_amounts)
+        store_copy.converted_currencies = self.converted_currencies.copy()
+        store_copy.descriptions = list(self.descriptions)
+        store_copy.amount_digits = array("B", self.amount_digits)
+        store_copy.converted_amount_digits = array("B", self.converted_amount_digits)
+        store_copy.date_ordinals = dict(self.date_ordinals)
+        store_copy.fieldnames = self.fieldnames
+        return store_copy
+
+    def take(
+        self, rows: Sequence[int], fieldnames: tuple[str, ...] | None = None
+    ) -> "MonefyTransactionStore":
+        """Get store with provided rows and columns projection,
+        dictionary encoded columns have only values of provided rows"""
+        store_rows = MonefyTransactionStore(self.csv_dialect)
+        store_rows.amount_scale = self.amount_scale
+        store_rows.dates = array("l", (self.dates[row] for row in rows))
+        store_rows.accounts = self.accounts.take(rows)
+        store_rows.categories = self.categories.take(rows)
+        store_rows.amounts = array("q", (self.amounts[row] for row in rows))
+        store_rows.currencies = self.currencies.take(rows)
+        store_rows.converted_amounts = array(
+            "q", (self.converted_amounts[row] for row in rows)
+        )
+        store_rows.converted_currencies = self.converted_currencies.take(rows)
+        store_rows.descriptions = [self.descriptions[row] for row in rows]
+        store_rows.amount_digits = array("B", (self.amount_digits[row] for row in rows))
+        store_rows.converted_amount_digits = array(
+            "B", (self.converted_amount_digits[row] for row in rows)
+        )
+        store_rows.date_ordinals = self.date_ordinals
+        store_rows.fieldnames = fieldnames or self.fieldnames
+        return store_rows
+
+    def parse_amount(self, amount: str) -> tuple[int, int]:
+        """Parse amount to integer minor units and number of its fraction digits,
+        rescale store if amount is more precise"""
+        amount_units, amount_digits = self.csv_dialect.parse_amount(amount)
+        if amount_digits > self.amount_scale:
+            self.rescale_amounts(amount_digits)
+        return amount_units * 10 ** (self.amount_scale - amount_digits), amount_digits
+
+    def rescale_amounts(self, amount_scale: int) -> None:
+        """Increase number of fraction digits of stored amounts"""
+        multiplier = 10 ** (amount_scale - self.amount_scale)
+        self.amounts = array("q", (amount * multiplier for amount in self.amounts))
+        self.converted_amounts = array(
+            "q", (amount * multiplier for amount in self.converted_amounts)
+        )
+        self.amount_scale = amount_scale
+
+    def parse_date(self, transaction_date: str) -> int:
+        """Parse transaction date to ordinal, distinct dates are parsed once"""
+        if (date_ordinal := self.date_ordinals.get(transaction_date)) is not None:
+            return date_ordinal
+        try:
+            date_ordinal = self.csv_dialect.parse_date(transaction_date)
+        except ValueError:
+            self.switch_date_format(transaction_date)
+            date_ordinal = self.csv_dialect.parse_date(transaction_date)
+        self.date_ordinals[transaction_date] = date_ordinal
+        return date_ordinal
+
+    def switch_date_format(self, transaction_date: str) -> None:
+        """Find date format that parses provided date and all dates parsed before"""
+        for date_format in MONEFY_DATE_FORMATS:
+            try:
+                date_ordinals = {
+                    parsed_date: parse_monefy_date(parsed_date, date_format)
+                    for parsed_date in (*self.date_ordinals, transaction_date)
+                }
+            except ValueError:
+                continue
+            ordinals_mapping = {
+                self.date_ordinals[parsed_date]: date_ordinal
+                for parsed_date, date_ordinal in date_ordinals.items()
+                if parsed_date in self.date_ordinals
+            }
+            self.dates = array(
+                "l", (ordinals_mapping[ordinal] for ordinal in self.dates)
+            )
+            self.date_ordinals = date_ordinals
+            self.csv_dialect = replace(self.csv_dialect, date_format=date_format)
+            return
+        raise ValueError(f"unsupported Monefy transaction date: {transaction_date}")
+
+    def format_amount(self, amount: int, amount_digits: int) -> str:
+        """Format integer minor units amount to string
+        with the same number of fraction digits as parsed amount"""
+        return str(
+            Decimal(amount // 10 ** (self.amount_scale - amount_digits)).scaleb(
+                -amount_digits
+            )
+        )
+
+    def to_decimal(self, amount: int) -> Decimal:
+        """Convert integer minor units amount to Decimal"""
+        return Decimal(amount).scaleb(-self.amount_scale)
+
+    def format_date(self, date_ordinal: int) -> str:
+        """Format date ordinal to Monefy date string"""
+        return date.fromordinal(date_ordinal).strftime(self.date_format)
+
+    def get_value(self, index: int, fieldname: str) -> str:
+        """Get formatted transaction value by column name"""
+        if fieldname == "date":
+            return self.format_date(self.dates[index])
+        if fieldname == "amount":
+            return self.format_amount(self.amounts[index], self.amount_digits[index])
+        if fieldname == "converted amount":
+            return self.format_amount(
+                self.converted_amounts[index], self.converted_amount_digits[index]
+            )
+        if fieldname == "description":
+            return self.descriptions[index]
+        return self.text_columns[fieldname][index]
+
+    @property
+    def text_columns(self) -> dict[str, DictionaryColumn]:
+        """Dictionary encoded columns by Monefy csv column name"""
+        return {
+            "account": self.accounts,
+            "category": self.categories,
+            "currency": self.currencies,
+            "converted currency": self.converted_currencies,
+        }
+
+    def iter_rows(self) -> Iterator[tuple[str, ...]]:
+        """Iterate formatted transaction values of store columns projection"""
+        if self.fieldnames != MONEFY_FIELDNAMES:
+            projection = [MONEFY_FIELDNAMES.index(column) for column in self.fieldnames]
+            for row in self.iter_all_columns():
+                yield tuple(row[column] for column in projection)
+        else:
+            yield from self.iter_all_columns()
+
+    def iter_all_columns(self) -> Iterator[tuple[str, ...]]:
+        """Iterate formatted transaction values in Monefy csv columns order"""
+        formatted_dates: dict[int, str] = {}
+        for index in range(len(self)):
+            date_ordinal = self.dates[index]
+            if (formatted_date := formatted_dates.get(date_ordinal)) is None:
+                formatted_date = formatted_dates[date_ordinal] = self.format_date(
+                    date_ordinal
+                )
+            yield (
+                formatted_date,
+                self.accounts[index],
+                self.categories[index],
+                self.format_amount(self.amounts[index], self.amount_digits[index]),
+                self.currencies[index],
+                self.format_amount(
+                    self.converted_amounts[index], self.converted_amount_digits[index]
+                ),
+                self.converted_currencies[index],
+                self.descriptions[index],
+            )
+
+    def iter_typed_rows(self, start: int = 0) -> Iterator[tuple[Any, ...]]:
+        """Iterate stored transaction values starting from provided row,
+        dates are ordinals and amounts are integer minor units"""
+        for index in range(start, len(self)):
+            yield (
+                self.dates[index],
+                self.accounts[index],
+                self.categories[index],
+                self.amounts[index],
+                self.currencies[index],
+                self.converted_amounts[index],
+                self.converted_currencies[index],
+                self.descriptions[index],
+                self.amount_digits[index],
+                self.converted_amount_digits[index],
+            )
+
+    @classmethod
+    def from_typed_rows(
+        cls,
+        typed_rows: Iterable[tuple[Any, ...]],
+        amount_scale: int,
+        csv_dialect: MonefyCsvDialect,
+    ) -> "MonefyTransactionStore":
+        """Create store from transaction values produced by iter_typed_rows"""
+        transactions = cls(csv_dialect)
+        transactions.amount_scale = amount_scale
+        for (
+            date_ordinal,
+            account,
+            category,
+            amount,
+            currency,
+            converted_amount,
+            converted_currency,
+            description,
+            amount_digits,
+            converted_amount_digits,
+        ) in typed_rows:
+            transactions.dates.append(date_ordinal)
+            transactions.accounts.append(account)
+            transactions.categories.append(category)
+            transactions.amounts.append(amount)
+            transactions.currencies.append(currency)
+            transactions.converted_amounts.append(converted_amount)
+            transactions.converted_currencies.append(converted_currency)
+            transactions.descriptions.append(description)
+            transactions.amount_digits.append(amount_digits)
+            transactions.converted_amount_digits.append(converted_amount_digits)
+        transactions.date_ordinals = {
+            transactions.format_date(date_ordinal): date_ordinal
+            for date_ordinal in set(transactions.dates)
+        }
+        return transactions
+
+    def to_records(self) -> list[dict[str, str]]:
+        """Materialize transactions as list of dicts"""
+        return [dict(zip(self.fieldnames, row)) for row in self.iter_rows()]
@@ -0,0 +1,97 @@
+"""Dropbox user profiles cached with time to live and backed by users table"""
+import math
+import sqlite3
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from src.domain.dropbox_utils import AsyncDropboxClient
+
+
+@dataclass
+class UserProfile:
+    """Dropbox user name and avatar shown on homepage"""
+
+    name: str
+    avatar: str | None
+    loaded_at: float = -math.inf
+
+
+class UserProfileCache:
+    """
+    Bounded cache of Dropbox user profiles loaded from users table.
+    Profiles older than time to live are still served while they are refreshed
+    from Dropbox in background, so homepage doesn't wait for Dropbox.
+    Profiles loaded from users table are refreshed on first use
+    """
+
+    def __init__(
+        self, sqlite_connection: sqlite3.Connection, max_size: int, time_to_live: float
+    ) -> None:
+        self.sqlite_connection = sqlite_connection
+        self.max_size = max_size
+        self.time_to_live = time_to_live
+        self.profiles: OrderedDict[str, UserProfile] = OrderedDict()
+        self.refreshing_accounts: set[str] = set()
+
+    def get(self, account_id: str) -> UserProfile | None:
+        """Get account profile from memory or load it from users table"""
+        if profile := self.profiles.get(account_id):
+            self.profiles.move_to_end(account_id)
+            return profile
+        profile_row = self.sqlite_connection.execute(
+            "SELECT username, photo FROM users WHERE account_id = ?", (account_id,)
+        ).fetchone()
+        if not profile_row or profile_row[0] is None:
+            return None
+        name, avatar = profile_row
+        # users created before profiles were cached may keep missing photo as 'None'
+        profile = UserProfile(name, None if avatar in (None, "None") else avatar)
+        self.remember(account_id, profile)
+        return profile
+
+    def remember(self, account_id: str, profile: UserProfile) -> None:
+        """Add account profile to cache and evict least recently used profiles"""
+        self.profiles[account_id] = profile
+        self.profiles.move_to_end(account_id)
+        while len(self.profiles) > self.max_size:
+            self.profiles.popitem(last=False)
+
+    def is_stale(self, profile: UserProfile) -> bool:
+        """Check if profile is older than time to live"""
+        return time.monotonic() - profile.loaded_at >= self.time_to_live
+
+    def set(self, account_id: str, name: str, avatar: str | None) -> bool:
+        """Save fetched account profile to cache and users table if it changed,
+        return True if profile changed"""
+        cached_profile = self.profiles.get(account_id)
+        profile_changed = cached_profile is None or (
+            (cached_profile.name, cached_profile.avatar) != (name, avatar)
+        )
+        if profile_changed:
+            self.sqlite_connection.execute(
+                "UPDATE users SET username = ?, photo = ? WHERE account_id = ?",
+                (name, avatar, account_id),
+            )
+            self.sqlite_connection.commit()
+        self.remember(account_id, UserProfile(name, avatar, time.monotonic()))
+        return profile_changed
+
+    async def refresh(self, dropbox_client: AsyncDropboxClient) -> bool:
+        """Fetch account profile from Dropbox once at a time per account,
+        return True if profile changed"""
+        account_id = dropbox_client.account_id
+        if not account_id or account_id in self.refreshing_accounts:
+            return False
+        self.refreshing_accounts.add(account_id)
+        try:
+            user_info = await dropbox_client.get_dropbox_user_info()
+        finally:
+            self.refreshing_accounts.discard(account_id)
+        return self.set(
+            account_id, user_info.user_name, user_info.user_profile_photo_url
+        )
+
+    def discard(self, account_id: str) -> None:
+        """Forget cached account profile, so it's loaded from users table again"""
+        self.profiles.pop(account_id, None)
@@ -1,27 +1,42 @@
 """Services for Monefy Web Application"""
+import asyncio
 import hmac
 import os
 from hashlib import sha256
 from http import HTTPStatus
+from typing import Any, cast
+from urllib.parse import urlencode
 
-from sanic import Blueprint
+from sanic import Blueprint, Sanic
 from sanic.exceptions import Forbidden
 from sanic.log import logger
+from sanic.models.protocol_types import Range
 from sanic.request import Request
-from sanic.response import HTTPResponse, file, json, redirect, text
+from sanic.response import HTTPResponse, empty, file, json, redirect, text
 from sanic.views import HTTPMethodView
-from sanic_ext import render
 
 from src.common.authentication import Authenticator, require_jwt_authentication
+from src.common.conditional_requests import BackupValidators, ByteRange
 from src.common.http_codes import NotAcceptable
+from src.common.utils import format_decimals, json_dumps
+from src.domain.backup_ingestion import monefy_backup_key
 from src.domain.data_aggregator import MonefyDataAggregator
-from src.domain.dropbox_utils import DropboxClient
+from src.domain.group_by import GROUP_BY_DIMENSIONS
+from src.domain.prefix_sums import (DailyPrefixSums, parse_analytics_query,
+                                    parse_windows)
+from src.domain.transaction_query import TransactionPage, TransactionQuery
+
+STREAM_CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "json": "application/json; charset=utf-8",
+}
 
 homepage_bp = Blueprint("homepage_bp")
 monefy_info_bp = Blueprint("monefy_info_bp")
 dropbox_webhook_bp = Blueprint("dropbox_webhook_bp")
 healthcheck_bp = Blueprint("healthcheck_bp")
 data_aggregation_bp = Blueprint("data_aggregation_bp")
+analytics_bp = Blueprint("analytics_bp")
 dropbox_authentication_bp = Blueprint("dropbox_authentication_bp")
 
 
@@ -72,11 +87,93 @@ class MonefyInfo(MonefyApplicationView, attach=monefy_info_bp, uri="/info"):
 
     decorators = [require_jwt_authentication]
 
-    async def get(self, request: Request) -> HTTPResponse:
-        """Returns JSON formatted monefy transactions from csv files"""
+    template_chunk_size = 16 * 1024
+
+    async def get(self, request: Request) -> HTTPResponse | None:
+        """Returns page of monefy transactions from csv files
+        rendered to response by chunks"""
+        try:
+            transaction_query = TransactionQuery.from_args(request.args)
+            transaction_page = TransactionPage.from_args(
+                request.args,
+                request.app.config.MONEFY_INFO_PAGE_SIZE,
+                request.app.config.MONEFY_INFO_MAX_PAGE_SIZE,
+            )
+        except NotAcceptable as query_error:
+            return json({"message": str(query_error)}, status=HTTPStatus.NOT_ACCEPTABLE)
         dp_client = self.authenticator.get_user_dropbox_client(request)
-        monefy_stats = dp_client.get_monefy_info()
-        return await render("info.html", context={"monefy_data": monefy_stats})
+        latest_monefy_backup = await dp_client.get_latest_monefy_backup()
+        validators = BackupValidators.for_backup(
+            latest_monefy_backup,
+            (
+                dp_client.account_id,
+                monefy_backup_key(latest_monefy_backup),
+                "info",
+                repr(transaction_query),
+                repr(transaction_page),
+            ),
+        )
+        if validators.is_not_modified(request):
+            return empty(HTTPStatus.NOT_MODIFIED, headers=validators.headers)
+        monefy_stats = transaction_query.apply(
+            await dp_client.get_monefy_info(latest_monefy_backup)
+        )
+        await self.stream_template(
+            request,
+            "info.html",
+            {
+                "fieldnames": monefy_stats.fieldnames,
+                "monefy_data": transaction_page.rows(monefy_stats),
+                "previous_page_url": self.page_url(
+                    request, transaction_page.previous_cursor()
+                ),
+                "next_page_url": self.page_url(
+                    request, transaction_page.next_cursor(monefy_stats)
+                ),
+            },
+            validators.headers,
+        )
+        return None
+
+    @staticmethod
+    def page_url(request: Request, cursor: int | None) -> str | None:
+        """Get url of transactions page with the same query parameters"""
+        if cursor is None:
+            return None
+        query_args = [
+            (name, value) for name, value in request.query_args if name != "cursor"
+        ]
+        return f"{request.path}?{urlencode([*query_args, ('cursor', str(cursor))])}"
+
+    @classmethod
+    async def stream_template(
+        cls,
+        request: Request,
+        template_name: str,
+        context: dict[str, Any],
+        headers: dict[str, str],
+    ) -> None:
+        """Render template to response by chunks, so page head and first rows
+        are sent before the whole page is rendered"""
+        template = request.app.ctx.monefy_page_cache.get_template(template_name)
+        response = await request.respond(
+            headers=headers, content_type="text/html; charset=utf-8"
+        )
+        if not template.environment.is_async:
+            await response.send(template.render(**context))
+            await response.eof()
+            return
+        rendered_parts: list[str] = []
+        rendered_size = 0
+        async for rendered_part in template.generate_async(**context):
+            rendered_parts.append(rendered_part)
+            rendered_size += len(rendered_part)
+            if rendered_size >= cls.template_chunk_size:
+                await response.send("".join(rendered_parts))
+                rendered_parts.clear()
+                rendered_size = 0
+        await response.send("".join(rendered_parts))
+        await response.eof()
 
 
 class DropboxWebhook(HTTPMethodView, attach=dropbox_webhook_bp, uri="/dropbox-webhook"):
@@ -114,25 +211,51 @@ class DropboxWebhook(HTTPMethodView, attach=dropbox_webhook_bp, uri="/dropbox-we
         logger.info(f"webhook post {request.body=}")
         if accounts := request.json.get("list_folder").get("accounts"):
             for account in accounts:
-                # We need to respond quickly to the webhook request, so we do the
-                # actual work in a separate thread. For more robustness, it's a
-                # good idea to add the work to a reliable queue and process the queue
-                # in a worker process.
-                logger.info(account)
-                user_access_token = request.app.ctx.sqlite_cursor.execute(
-                    f"""
-                                SELECT access_token FROM users
-                                WHERE account_id = '{account}'
-                                """
-                ).fetchone()[0]
-                dp_client = DropboxClient(user_access_token)
-                data_aggregator = MonefyDataAggregator(dp_client, "csv", True)
-                result_file = data_aggregator.get_result_file_data()
-                dp_client.upload_summarized_file(result_file)
-
+                request.app.ctx.monefy_aggregation_cache.invalidate(account)
+                request.app.ctx.monefy_page_cache.invalidate(account)
+            # We need to respond quickly to the webhook request, so we do the
+            # actual work in a background task. Accounts are processed concurrently
+            # within DROPBOX_WEBHOOK_CONCURRENCY limit. For more robustness, it's a
+            # good idea to add the work to a reliable queue and process the queue
+            # in a worker process.
+            request.app.add_task(self.upload_summarized_files(request.app, accounts))
             return json({"message": "test webhook"})
         return json({"message": "no users in list folder"})
 
+    @classmethod
+    async def upload_summarized_files(cls, app: Sanic, accounts: list[str]) -> None:
+        """Upload summarized Monefy backup files for accounts from webhook"""
+        upload_results = await asyncio.gather(
+            *(cls.upload_summarized_file(app, account) for account in accounts),
+            return_exceptions=True,
+        )
+        for account, upload_result in zip(accounts, upload_results):
+            if isinstance(upload_result, Exception):
+                logger.error(
+                    f"summarized file upload for {account} failed: {upload_result}"
+                )
+
+    @staticmethod
+    async def upload_summarized_file(app: Sanic, account: str) -> None:
+        """Summarize account latest Monefy backup and upload it to Dropbox storage"""
+        async with app.ctx.dropbox_upload_semaphore:
+            logger.info(account)
+            user_info = app.ctx.sqlite_cursor.execute(
+                f"""
+                            SELECT access_token FROM users
+                            WHERE account_id = '{account}'
+                            """
+            ).fetchone()
+            if not user_info:
+                logger.warning(f"webhook account {account} is not registered")
+                return
+            dp_client = app.ctx.dropbox_client_pool.get_client(account, user_info[0])
+            data_aggregator = MonefyDataAggregator(dp_client, "csv", True)
+            result_file = await data_aggregator.get_result_file_data()
+            await dp_client.upload_summarized_file(
+                result_file, f"{data_aggregator.result_file_name}.csv"
+            )
+
 
 class MonefyDataAggregatorView(
     MonefyApplicationView, attach=data_aggregation_bp, uri="/aggregation"
@@ -141,7 +264,7 @@ class MonefyDataAggregatorView(
 
     decorators = [require_jwt_authentication]
 
-    async def get(self, request: Request) -> HTTPResponse:
+    async def get(self, request: Request) -> HTTPResponse | None:
         """Return Monefy file with spending's in json/csv format"""
         dp_client = self.authenticator.get_user_dropbox_client(request)
 
@@ -150,25 +273,117 @@ class MonefyDataAggregatorView(
             f"{request.args.get('format')} format"
             f"{', summarized' if request.args.get('summarized') else '.'}"
         )
-        data_aggregator = MonefyDataAggregator(
-            dp_client, request.args.get("format"), request.args.get("summarized")
-        )
         try:
-            result_file_path = data_aggregator.get_result_file_data()
-            logger.info(f"--- result file name - {os.path.basename(result_file_path)}")
-            return await file(
-                result_file_path, filename=os.path.basename(result_file_path)
+            data_aggregator = MonefyDataAggregator(
+                dp_client,
+                request.args.get("format"),
+                request.args.get("summarized"),
+                request.args.get("group_by"),
+                TransactionQuery.from_args(request.args),
+                pretty=bool(request.args.get("pretty")),
             )
-        except NotAcceptable:
-            logger.error(
-                f"{request.args.get('format')} format is not supported for data aggregation"
+            data_aggregator.check_result_file_format()
+            latest_monefy_backup = await dp_client.get_latest_monefy_backup()
+            validators = BackupValidators.for_backup(
+                latest_monefy_backup,
+                data_aggregator.get_result_key(monefy_backup_key(latest_monefy_backup)),
             )
+            if validators.is_not_modified(request):
+                return empty(HTTPStatus.NOT_MODIFIED, headers=validators.headers)
+            if request.args.get("stream"):
+                await self.stream_result(
+                    request, data_aggregator, latest_monefy_backup, validators
+                )
+                return None
+            result_file_path = await data_aggregator.get_result_file_data(
+                latest_monefy_backup
+            )
+            file_name = (
+                f"{data_aggregator.result_file_name}."
+                f"{data_aggregator.result_file_format}"
+            )
+            logger.info(f"--- result file name - {file_name}")
+            byte_range = (
+                ByteRange.from_request(request, os.path.getsize(result_file_path))
+                if validators.matches_if_range(request)
+                else None
+            )
+            return await file(
+                result_file_path,
+                filename=file_name,
+                headers={"ETag": validators.etag, "Accept-Ranges": "bytes"},
+                last_modified=validators.last_modified,
+                # file response reads range positions as attributes
+                _range=cast(Range | None, byte_range),
+            )
+        except NotAcceptable as aggregation_error:
+            logger.error(f"data aggregation is not acceptable: {aggregation_error}")
             return json(
                 {
-                    "message": f"Provided format ({request.args.get('format')}) "
-                    f"not supported for data aggregation."
-                    f" Acceptable arguments - 'format - csv or json' and 'summarized (optional)'"
-                    f" Example: /aggregation?format=FORMAT&summarized=True "
+                    "message": f"{aggregation_error} for data aggregation."
+                    f" Acceptable arguments - 'format - "
+                    f"{', '.join(MonefyDataAggregator.accepted_file_formats)}',"
+                    f" 'summarized (optional)',"
+                    f" 'stream (optional)', 'pretty (optional)',"
+                    f" 'group_by (optional) - {', '.join(GROUP_BY_DIMENSIONS)}'"
+                    f" and filters 'from', 'to', 'category', 'account', 'min_amount',"
+                    f" 'max_amount', 'columns' (optional)"
+                    f" Example: /aggregation?format=FORMAT&group_by=category,month "
                 },
                 status=HTTPStatus.NOT_ACCEPTABLE,
             )
+
+    @staticmethod
+    async def stream_result(
+        request: Request,
+        data_aggregator: MonefyDataAggregator,
+        latest_monefy_backup: dict[str, Any],
+        validators: BackupValidators,
+    ) -> None:
+        """Stream result file content to response by chunks without writing file"""
+        result_chunks = await data_aggregator.get_result_chunks(latest_monefy_backup)
+        file_name = (
+            f"{data_aggregator.result_file_name}.{data_aggregator.result_file_format}"
+        )
+        logger.info(f"--- streaming result file - {file_name}")
+        response = await request.respond(
+            headers={
+                "Content-Disposition": f'attachment; filename="{file_name}"',
+                **validators.headers,
+            },
+            content_type=STREAM_CONTENT_TYPES[data_aggregator.result_file_format],
+        )
+        # byte order mark is the same as in result files
+        await response.send("\ufeff")
+        for result_chunk in result_chunks:
+            await response.send(result_chunk)
+        await response.eof()
+
+
+class MonefyAnalyticsView(MonefyApplicationView, attach=analytics_bp, uri="/analytics"):
+    """View for Monefy date range analytics"""
+
+    decorators = [require_jwt_authentication]
+
+    async def get(self, request: Request) -> HTTPResponse:
+        """Return date range and category totals, rolling windows totals
+        and running balance of Monefy transactions in json format.
+        All totals are calculated from transactions matching account, category
+        and amount filters"""
+        try:
+            transaction_query = parse_analytics_query(request.args)
+            windows = parse_windows(request.args)
+        except NotAcceptable as analytics_error:
+            return json(
+                {"message": str(analytics_error)}, status=HTTPStatus.NOT_ACCEPTABLE
+            )
+        dp_client = self.authenticator.get_user_dropbox_client(request)
+        transactions = await dp_client.get_monefy_info()
+        analytics = DailyPrefixSums.for_query(transactions, transaction_query).analyze(
+            transactions,
+            transaction_query.date_from,
+            transaction_query.date_to,
+            transaction_query.categories,
+            windows,
+        )
+        return json(format_decimals(analytics), dumps=json_dumps)
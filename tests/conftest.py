@@ -1,20 +1,20 @@
 """PyTests configuration for Sanic Application"""
+import json
 import shutil
 from unittest.mock import MagicMock
 
+import httpx
 import pytest
 import pytest_asyncio
 
 from run import monefy_web_app
-from src.domain import dropbox_utils
-from src.domain.dropbox_utils import DropboxClient
+from src.domain.backup_mirror import MonefyBackupMirror
+from src.domain.dropbox_utils import AsyncDropboxClient
+from src.domain.transaction_store import MonefyTransactionStore
 
 csv_file = MagicMock()
 csv_file.name = "monefy-2022-01-01_01-01-01.csv"
 
-test_file = MagicMock()
-test_file.entries = [csv_file]
-
 ContentMock = MagicMock
 ContentMock.content = (
     b"\xef\xbb\xbfdate,account,category,amount,"
@@ -23,28 +23,6 @@ ContentMock.content = (
 )
 
 
-class MockDropbox:
-    """Mock data for Dropbox utils tests"""
-
-    @staticmethod
-    def files_list_folder(*args, **kwargs):
-        """Mocked test file for Unittests"""
-        return test_file
-
-    @staticmethod
-    def files_download(*args, **kwargs):
-        """Mock download method for Dropbox client"""
-        return "test", ContentMock
-
-
-class MockDropboxIOError(MockDropbox):
-    """Mock IOError for Unittests"""
-
-    @staticmethod
-    def files_download(*args, **kwargs):
-        raise IOError("Test IOError")
-
-
 class MockDropboxClient:
     """Mocked Dropbox Client for Unittests"""
 
@@ -77,28 +55,51 @@ def monefy_app():
     return monefy_test_app
 
 
-@pytest_asyncio.fixture()
-def dropbox_client(monkeypatch):
-    """Mocked Dropbox Client for Unittests"""
-
-    def mock_dropbox(*args, **kwargs):
-        return MockDropbox()
-
-    monkeypatch.setattr(dropbox_utils, "Dropbox", mock_dropbox)
-    mocked_dropbox_client = DropboxClient()
-    mocked_dropbox_client.monefy_backup_files_folder = "test_folder"
-    return mocked_dropbox_client
+def mock_dropbox_api(request: httpx.Request) -> httpx.Response:
+    """Mocked Dropbox HTTP API for async Dropbox client Unittests"""
+    route = request.url.path
+    if route == "/2/files/list_folder":
+        return httpx.Response(
+            200,
+            json={
+                "entries": [
+                    {
+                        ".tag": "file",
+                        "name": csv_file.name,
+                        "rev": "015e9fb5a8d3a5f000000027b9d0c41",
+                        "content_hash": "test_content_hash",
+                        "size": len(ContentMock.content),
+                    }
+                ],
+                "cursor": "test_cursor",
+                "has_more": False,
+            },
+        )
+    if route == "/2/files/list_folder/continue":
+        return httpx.Response(
+            200, json={"entries": [], "cursor": "test_cursor", "has_more": False}
+        )
+    if route == "/2/files/download":
+        path = json.loads(request.headers["Dropbox-API-Arg"])["path"]
+        return httpx.Response(
+            200,
+            content=ContentMock.content,
+            headers={"Dropbox-API-Result": json.dumps({"path_display": path})},
+        )
+    if route == "/2/files/upload":
+        return httpx.Response(200, json={"size": len(request.content)})
+    return httpx.Response(409, json={"error_summary": "path/not_found/"})
 
 
 @pytest_asyncio.fixture()
-def dropbox_error_client(monkeypatch):
-    """Mock Dropbox Client with raised error for Unittests"""
-
-    def mock_dropbox(*args, **kwargs):
-        return MockDropboxIOError()
-
-    monkeypatch.setattr(dropbox_utils, "Dropbox", mock_dropbox)
-    mocked_dropbox_client = DropboxClient()
+def async_dropbox_client(tmp_path):
+    """Async Dropbox Client with mocked Dropbox HTTP API for Unittests"""
+    access_token = monefy_web_app.ctx.token_cryptography.encrypt(b"test").decode()
+    mocked_dropbox_client = AsyncDropboxClient(
+        access_token,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(mock_dropbox_api)),
+        backup_mirror=MonefyBackupMirror(str(tmp_path), 1024),
+    )
     mocked_dropbox_client.monefy_backup_files_folder = "test_folder"
     return mocked_dropbox_client
 
@@ -137,3 +138,31 @@ def monefy_data():
         "Donations": -999,
     }
     return monefy_categories
+
+
+def monefy_transaction(
+    transaction_date, category, amount, description="", account="Cash"
+):
+    """Parsed Monefy csv transaction for Unittests"""
+    return {
+        "date": transaction_date,
+        "account": account,
+        "category": category,
+        "amount": amount,
+        "currency": "USD",
+        "converted amount": amount,
+        "converted currency": "USD",
+        "description": description,
+    }
+
+
+@pytest.fixture()
+def transaction_store():
+    """Factory of transaction stores with provided transactions for Unittests"""
+
+    def create_transaction_store(*transactions):
+        transactions_store = MonefyTransactionStore()
+        transactions_store.extend(transactions)
+        return transactions_store
+
+    return create_transaction_store
@@ -0,0 +1,161 @@
+"""Unittests for aggregation result files cache"""
+import os
+
+import pytest
+
+from src.domain.aggregation_cache import AggregationResultCache
+from src.domain.data_aggregator import MonefyDataAggregator
+from src.domain.transaction_store import MonefyTransactionStore
+
+
+def cache_key(account_id, backup_key="rev", result_file_format="csv"):
+    """Aggregation cache key for Unittests"""
+    return account_id, backup_key, result_file_format, True, False, "", ""
+
+
+def write_bytes(size):
+    """Get result writer of provided size for Unittests"""
+
+    def write_result(file_path):
+        with open(file_path, "wb") as result_file:
+            result_file.write(b"0" * size)
+
+    return write_result
+
+
+def test_aggregation_cache_is_content_addressed(tmp_path):
+    """Unittests results are stored by cache key and served from disk"""
+    aggregation_cache = AggregationResultCache(str(tmp_path), 100)
+    result_path = aggregation_cache.store(cache_key("account"), "csv", write_bytes(10))
+
+    assert result_path == aggregation_cache.result_path(cache_key("account"), "csv")
+    assert AggregationResultCache(str(tmp_path), 100).get(cache_key("account")) == (
+        result_path
+    )
+    assert aggregation_cache.get(cache_key("account", "new rev")) is None
+    assert aggregation_cache.store(None, "csv", write_bytes(10)) != result_path
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_aggregation_cache_evicts_over_budget(tmp_path):
+    """Unittests least recently used result is evicted over size limit"""
+    aggregation_cache = AggregationResultCache(str(tmp_path), 25, serve_time=0)
+    aggregation_cache.store(cache_key("first"), "csv", write_bytes(10))
+    aggregation_cache.store(cache_key("second"), "csv", write_bytes(10))
+    aggregation_cache.get(cache_key("first"))
+    aggregation_cache.store(cache_key("third"), "csv", write_bytes(10))
+
+    assert aggregation_cache.cache_size == 20
+    assert aggregation_cache.get(cache_key("second")) is None
+    assert aggregation_cache.get(cache_key("first")) is not None
+    assert aggregation_cache.get(cache_key("third")) is not None
+
+
+def test_aggregation_cache_keeps_served_results(tmp_path):
+    """Unittests recently returned results aren't evicted while they are served"""
+    aggregation_cache = AggregationResultCache(str(tmp_path), 15)
+    first_path = aggregation_cache.store(cache_key("first"), "csv", write_bytes(10))
+    aggregation_cache.store(cache_key("second"), "csv", write_bytes(10))
+
+    assert os.path.getsize(first_path) == 10
+    assert aggregation_cache.cache_size == 20
+
+    aggregation_cache.serve_time = 0
+    aggregation_cache.store(cache_key("third"), "csv", write_bytes(10))
+
+    assert aggregation_cache.cache_size == 10
+    assert not os.path.exists(first_path)
+    assert AggregationResultCache(str(tmp_path), 15).get(cache_key("third"))
+
+
+def test_aggregation_cache_failed_write(tmp_path):
+    """Unittests partially written result isn't added to cache"""
+    aggregation_cache = AggregationResultCache(str(tmp_path), 100)
+
+    def write_result(file_path):
+        write_bytes(10)(file_path)
+        raise ValueError("Test write error")
+
+    with pytest.raises(ValueError):
+        aggregation_cache.store(cache_key("account"), "csv", write_result)
+    assert not list(tmp_path.iterdir())
+
+
+def test_aggregation_cache_invalidation(tmp_path):
+    """Unittests account results aren't served until account is aggregated again"""
+    aggregation_cache = AggregationResultCache(str(tmp_path), 100)
+    aggregation_cache.store(cache_key("account"), "csv", write_bytes(10))
+    aggregation_cache.store(cache_key("other"), "csv", write_bytes(10))
+
+    aggregation_cache.invalidate("account")
+    assert aggregation_cache.get(cache_key("account")) is None
+    assert aggregation_cache.get(cache_key("other")) is not None
+    aggregation_cache.store(cache_key("account", "new rev"), "csv", write_bytes(10))
+    assert aggregation_cache.get(cache_key("account", "new rev")) is not None
+
+
+class IngestedDropboxClient:
+    """Dropbox client with ingested backup for Unittests"""
+
+    account_id = "account"
+
+    def __init__(self):
+        self.transactions = MonefyTransactionStore()
+        self.transactions.append(
+            {
+                "date": "12/12/2021",
+                "account": "Cash",
+                "category": "Salary",
+                "amount": "1111",
+                "currency": "USD",
+                "converted amount": "1111",
+                "converted currency": "USD",
+                "description": "",
+            }
+        )
+        self.ingested = False
+        self.downloads = 0
+        # fake client keeps ingestion state itself
+        self.backup_ingestion = self
+
+    async def get_monefy_info(self, latest_monefy_backup=None):
+        """Ingest transactions"""
+        self.downloads += 1
+        self.ingested = True
+        return self.transactions
+
+    async def get_ingested_backup_key(self, transactions=None):
+        """Get ingested backup key"""
+        return "rev" if self.ingested else None
+
+    @staticmethod
+    async def query_ingested_backup(monefy_backup, transaction_query):
+        """Transactions are not stored in ledger"""
+        return None
+
+    @staticmethod
+    async def get_monefy_rollups(transactions, rollup_table):
+        """Rollups are not stored"""
+        return None
+
+
+@pytest.mark.asyncio
+async def test_aggregation_result_is_cached(tmp_path):
+    """Unittests repeated aggregation returns cached result file"""
+    dropbox_client = IngestedDropboxClient()
+    aggregation_cache = AggregationResultCache(str(tmp_path), 1024)
+
+    result_file_paths = [
+        await MonefyDataAggregator(
+            dropbox_client, "csv", True, aggregation_cache=aggregation_cache
+        ).get_result_file_data()
+        for _ in range(3)
+    ]
+
+    assert dropbox_client.downloads == 1
+    assert len(set(result_file_paths)) == 1
+    aggregation_cache.invalidate("account")
+    await MonefyDataAggregator(
+        dropbox_client, "csv", True, aggregation_cache=aggregation_cache
+    ).get_result_file_data()
+    assert dropbox_client.downloads == 2
@@ -0,0 +1,40 @@
+"""Unittests for incremental index of Monefy backup files"""
+from src.domain.backup_index import MonefyBackupIndex
+
+
+def test_backup_index_latest_backup():
+    """Unittests latest backup is taken from sorted backup timestamps"""
+    backup_index = MonefyBackupIndex()
+    backup_index.apply_entries(
+        [
+            {".tag": "file", "name": "monefy-2022-05-01_10-00-00.csv"},
+            {".tag": "file", "name": "monefy-2022-01-01_01-01-01.csv"},
+            {".tag": "file", "name": "summarized_monefy-2022-06-01.csv"},
+            {".tag": "folder", "name": "backups"},
+        ]
+    )
+
+    assert backup_index.timestamps == ["2022-01-01_01-01-01", "2022-05-01_10-00-00"]
+    assert backup_index.latest()[1]["name"] == "monefy-2022-05-01_10-00-00.csv"
+
+
+def test_backup_index_deleted_entries():
+    """Unittests deleted Dropbox entries are removed from backup index"""
+    backup_index = MonefyBackupIndex()
+    backup_index.apply_entries(
+        [
+            {".tag": "file", "name": "monefy-2022-05-01_10-00-00.csv"},
+            {".tag": "file", "name": "monefy-2022-01-01_01-01-01.csv"},
+        ]
+    )
+    added, removed = backup_index.apply_entries(
+        [{".tag": "deleted", "name": "monefy-2022-05-01_10-00-00.csv"}]
+    )
+
+    assert added == []
+    assert removed == ["2022-05-01_10-00-00"]
+    assert backup_index.latest()[0] == "2022-01-01_01-01-01"
+    backup_index.apply_entries(
+        [{".tag": "deleted", "name": "monefy-2022-01-01_01-01-01.csv"}]
+    )
+    assert backup_index.latest() is None
@@ -0,0 +1,31 @@
+"""Unittests for local mirror of Monefy backup files"""
+import os
+
+from src.domain.backup_mirror import MonefyBackupMirror
+
+
+def test_backup_mirror_store_and_get(tmp_path):
+    """Unittests stored backup is found by its content hash"""
+    backup_mirror = MonefyBackupMirror(str(tmp_path), 1024)
+
+    assert backup_mirror.get("first_hash") is None
+    backup_path = backup_mirror.store("first_hash", b"date,account")
+
+    assert backup_mirror.get("first_hash") == backup_path
+    with open(backup_path, "rb") as backup_file:
+        assert backup_file.read() == b"date,account"
+
+
+def test_backup_mirror_evicts_least_recently_used(tmp_path):
+    """Unittests mirror size limit evicts least recently used backups"""
+    backup_mirror = MonefyBackupMirror(str(tmp_path), 20)
+    backup_mirror.store("first_hash", b"0123456789")
+    backup_mirror.store("second_hash", b"0123456789")
+    os.utime(backup_mirror.backup_path("first_hash"), (0, 0))
+    os.utime(backup_mirror.backup_path("second_hash"), (1, 1))
+    backup_mirror.get("first_hash")
+    backup_mirror.store("third_hash", b"0123456789")
+
+    assert backup_mirror.get("second_hash") is None
+    assert backup_mirror.get("first_hash") is not None
+    assert backup_mirror.get("third_hash") is not None
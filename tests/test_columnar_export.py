@@ -0,0 +1,60 @@
+"""Unittests for Arrow IPC and Parquet export"""
+import datetime
+from decimal import Decimal
+
+import pytest
+
+from src.domain.columnar_export import write_columnar_file
+from src.domain.transaction_query import TransactionQuery
+from tests.conftest import monefy_transaction
+
+pyarrow = pytest.importorskip("pyarrow")
+
+
+@pytest.fixture()
+def transactions(transaction_store):
+    """Transaction store for columnar export"""
+    return transaction_store(
+        monefy_transaction("12/12/2021", "Salary", "1111"),
+        monefy_transaction("12/12/2021", "Food", "-12.5"),
+        monefy_transaction("12/12/2021", "Food", "-7"),
+    )
+
+
+def test_arrow_export(tmp_path, transactions):
+    """Unittests Arrow IPC file contains typed transaction columns"""
+    arrow_file_path = str(tmp_path / "transactions.arrow")
+    write_columnar_file(arrow_file_path, transactions, "arrow")
+
+    with pyarrow.memory_map(arrow_file_path) as arrow_file:
+        table = pyarrow.ipc.open_file(arrow_file).read_all()
+    assert table.column_names == list(transactions.fieldnames)
+    assert table.schema.field("category").type == pyarrow.dictionary(
+        pyarrow.int32(), pyarrow.string()
+    )
+    assert table.column("date").to_pylist()[0] == datetime.date(2021, 12, 12)
+    assert table.column("amount").to_pylist() == [
+        Decimal("1111.0"),
+        Decimal("-12.5"),
+        Decimal("-7.0"),
+    ]
+
+
+def test_parquet_export(tmp_path, transactions):
+    """Unittests Parquet file of projected transactions and summarized data"""
+    parquet_file_path = str(tmp_path / "transactions.parquet")
+    projected_transactions = TransactionQuery(columns=("category", "amount")).apply(
+        transactions
+    )
+    write_columnar_file(parquet_file_path, projected_transactions, "parquet")
+    assert pyarrow.parquet.read_table(parquet_file_path).column_names == [
+        "category",
+        "amount",
+    ]
+
+    write_columnar_file(
+        parquet_file_path, {"income": Decimal("1111.0"), "currency": "USD"}, "parquet"
+    )
+    assert pyarrow.parquet.read_table(parquet_file_path).to_pylist() == [
+        {"income": Decimal("1111.0"), "currency": "USD"}
+    ]
@@ -0,0 +1,109 @@
+"""Unittests for conditional GET request validators"""
+from types import SimpleNamespace
+
+import pytest
+
+from src.common.conditional_requests import BackupValidators, ByteRange
+from src.common.http_codes import RangeNotSatisfiable
+
+monefy_backup = {"name": "monefy-2022-01-01_01-01-01.csv", "rev": "rev"}
+
+
+def conditional_request(**headers):
+    """Request with conditional headers for Unittests"""
+    return SimpleNamespace(
+        headers={header.replace("_", "-"): value for header, value in headers.items()}
+    )
+
+
+def test_backup_validators():
+    """Unittests ETag depends on response key and Last-Modified on backup name"""
+    validators = BackupValidators.for_backup(monefy_backup, ("account", "rev", "csv"))
+
+    assert validators.headers == {
+        "ETag": validators.etag,
+        "Last-Modified": "Sat, 01 Jan 2022 01:01:01 GMT",
+    }
+    assert validators.etag.startswith('"') and validators.etag.endswith('"')
+    assert validators.etag == (
+        BackupValidators.for_backup(monefy_backup, ("account", "rev", "csv")).etag
+    )
+    assert validators.etag != (
+        BackupValidators.for_backup(monefy_backup, ("account", "rev", "json")).etag
+    )
+
+
+def test_not_modified_requests():
+    """Unittests If-None-Match and If-Modified-Since request headers"""
+    validators = BackupValidators.for_backup(monefy_backup, ("account", "rev", "csv"))
+
+    assert validators.is_not_modified(
+        conditional_request(If_None_Match=f'"other", W/{validators.etag}')
+    )
+    assert not validators.is_not_modified(
+        conditional_request(
+            If_None_Match='"other"',
+            If_Modified_Since="Sun, 02 Jan 2022 00:00:00 GMT",
+        )
+    )
+    assert validators.is_not_modified(
+        conditional_request(If_Modified_Since="Sun, 02 Jan 2022 00:00:00 GMT")
+    )
+    assert not validators.is_not_modified(
+        conditional_request(If_Modified_Since="Fri, 31 Dec 2021 00:00:00 GMT")
+    )
+    assert not validators.is_not_modified(
+        conditional_request(If_Modified_Since="yesterday")
+    )
+    assert not validators.is_not_modified(conditional_request())
+
+
+def test_if_range_requests():
+    """Unittests If-Range matches only the same strong ETag or Last-Modified date"""
+    validators = BackupValidators.for_backup(monefy_backup, ("account", "rev", "csv"))
+
+    assert validators.matches_if_range(conditional_request())
+    assert validators.matches_if_range(conditional_request(If_Range=validators.etag))
+    assert not validators.matches_if_range(
+        conditional_request(If_Range=f"W/{validators.etag}")
+    )
+    assert not validators.matches_if_range(conditional_request(If_Range='"other"'))
+    assert validators.matches_if_range(
+        conditional_request(If_Range="Sat, 01 Jan 2022 01:01:01 GMT")
+    )
+    assert not validators.matches_if_range(
+        conditional_request(If_Range="Sun, 02 Jan 2022 00:00:00 GMT")
+    )
+
+
+@pytest.mark.parametrize(
+    "range_header, byte_range",
+    [
+        ("bytes=0-99", ByteRange(0, 99, 1000)),
+        ("bytes=100-", ByteRange(100, 999, 1000)),
+        ("bytes=-100", ByteRange(900, 999, 1000)),
+        ("bytes=900-5000", ByteRange(900, 999, 1000)),
+        ("bytes=-5000", ByteRange(0, 999, 1000)),
+        ("bytes=5-5", ByteRange(5, 5, 1000)),
+        ("bytes=0-9,20-29", None),
+        ("bytes=10-5", None),
+        ("bytes=-", None),
+        ("bytes=5", None),
+        ("items=0-9", None),
+    ],
+)
+def test_byte_range(range_header, byte_range):
+    """Unittests Range header parsing with clamped range end"""
+    assert ByteRange.from_request(conditional_request(Range=range_header), 1000) == (
+        byte_range
+    )
+    assert ByteRange.from_request(conditional_request(), 1000) is None
+
+
+def test_byte_range_not_satisfiable():
+    """Unittests Range that starts after file end"""
+    with pytest.raises(RangeNotSatisfiable) as range_error:
+        ByteRange.from_request(conditional_request(Range="bytes=1000-"), 1000)
+
+    assert range_error.value.headers == {"Content-Range": "bytes */1000"}
+    assert ByteRange(5, 5, 1000).size == 1
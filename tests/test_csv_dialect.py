@@ -0,0 +1,56 @@
+"""Unittests for Monefy backup csv dialect detection"""
+import pytest
+
+from src.domain.csv_dialect import MonefyCsvDialect, detect_monefy_csv_dialect
+from src.domain.csv_stream import MonefyCsvStreamParser
+from src.domain.transaction_store import MonefyTransactionStore
+
+SEMICOLON_MONEFY_CSV = (
+    "date;account;category;amount;currency;converted amount;currency;description\r\n"
+    "31.12.2021;Cash;Salary;1.111,00;EUR;1.111,00;EUR;\r\n"
+    "01.01.2022;Cash;Food;-12,5;EUR;-12,5;EUR;lunch\r\n"
+)
+
+
+def test_detect_semicolon_dialect():
+    """Unittests delimiter, decimal separator and date format detection"""
+    assert detect_monefy_csv_dialect(SEMICOLON_MONEFY_CSV) == MonefyCsvDialect(
+        delimiter=";", decimal_separator=",", date_format="%d.%m.%Y"
+    )
+
+
+def test_detect_comma_dialect():
+    """Unittests month first dates and thousands separator in quoted amount"""
+    monefy_csv = (
+        "date,account,category,amount,currency,converted amount,currency,description\n"
+        '12/31/2021,Cash,Salary,"1,111.25",USD,"1,111.25",USD,\n'
+        "01/01/2022,Cash,Food,-5,USD,-5,USD,\n"
+    )
+
+    assert detect_monefy_csv_dialect(monefy_csv) == MonefyCsvDialect(
+        delimiter=",", decimal_separator=".", date_format="%m/%d/%Y"
+    )
+
+
+@pytest.mark.parametrize(
+    "amount, expected_amount",
+    [("1.111,00", (111100, 2)), ("-12,5", (-125, 1)), ("-,5", (-5, 1)), ("7", (7, 0))],
+)
+def test_dialect_parse_amount(amount, expected_amount):
+    """Unittests amounts are parsed to integer units and fraction digits"""
+    assert MonefyCsvDialect(";", ",").parse_amount(amount) == expected_amount
+
+
+def test_parse_semicolon_transactions():
+    """Unittests transactions of detected dialect are parsed to transaction store"""
+    monefy_csv_parser = MonefyCsvStreamParser()
+    parsed_transactions = list(monefy_csv_parser.feed(SEMICOLON_MONEFY_CSV, final=True))
+    transactions = MonefyTransactionStore(monefy_csv_parser.csv_dialect)
+    transactions.extend(parsed_transactions)
+
+    assert [transaction["amount"] for transaction in transactions] == [
+        "1111.00",
+        "-12.5",
+    ]
+    assert transactions[1]["date"] == "01.01.2022"
+    assert transactions[1]["converted currency"] == "EUR"
@@ -0,0 +1,33 @@
+"""Unittests for streaming Monefy backup csv parser"""
+import pytest
+
+from src.domain.csv_stream import iter_monefy_transactions
+
+MONEFY_CSV = (
+    "﻿date,account,category,amount,currency,converted amount,currency,description\r\n"
+    "12/12/2021,Cash,Salary,1111,USD,1111,USD,\r\n"
+    '13/12/2021,Cash,Food,-12.5,USD,-12.5,USD,"Café\r\nlunch, ""big"""\r\n'
+).encode()
+
+
+async def split_chunks(content, chunk_size):
+    """Split bytes content to async chunks of provided size"""
+    for chunk_start in range(0, len(content), chunk_size):
+        yield content[chunk_start : chunk_start + chunk_size]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chunk_size", [1, 7, 1024])
+async def test_iter_monefy_transactions(chunk_size):
+    """Unittests transactions are parsed from chunks of any size"""
+    transactions = [
+        transaction
+        async for transaction in iter_monefy_transactions(
+            split_chunks(MONEFY_CSV, chunk_size)
+        )
+    ]
+
+    assert len(transactions) == 2
+    assert transactions[0]["converted currency"] == "USD"
+    assert transactions[0]["amount"] == "1111"
+    assert transactions[1]["description"] == 'Café\r\nlunch, "big"'
@@ -0,0 +1,76 @@
+"""Unittests for Monefy data aggregation result encoding"""
+import csv
+import io
+import json
+from decimal import Decimal
+
+import pytest
+
+from src.domain.aggregation_cache import AggregationResultCache
+from src.domain.data_aggregator import MonefyDataAggregator
+from tests.conftest import monefy_transaction
+
+
+@pytest.fixture()
+def transactions(transaction_store):
+    """Transaction store with description containing csv and json special symbols"""
+    return transaction_store(
+        monefy_transaction("12/12/2021", "Salary", "1111"),
+        monefy_transaction("12/12/2021", "Food", "-12.5", 'bread, "milk"\nand eggs'),
+        monefy_transaction("12/12/2021", "Food", "-7"),
+    )
+
+
+@pytest.fixture()
+def data_aggregator(tmp_path, monkeypatch):
+    """Data aggregator that encodes result by small chunks"""
+    monkeypatch.setattr(MonefyDataAggregator, "chunk_size", 16)
+    return MonefyDataAggregator(
+        None, "json", False, aggregation_cache=AggregationResultCache(str(tmp_path), 0)
+    )
+
+
+@pytest.mark.parametrize("pretty", [False, True])
+def test_json_chunks(
+    data_aggregator, transactions, transaction_store, monkeypatch, pretty
+):
+    """Unittests json chunks are the same as compact or indented json of records"""
+    monkeypatch.setattr(MonefyDataAggregator, "json_chunk_rows", 2)
+    data_aggregator.pretty = pretty
+    json_options = {"indent": 4} if pretty else {"separators": (",", ":")}
+    json_chunks = list(data_aggregator.iter_json_chunks(transactions))
+
+    assert len(json_chunks) > 3
+    assert "".join(json_chunks) == json.dumps(transactions.to_records(), **json_options)
+    assert "".join(data_aggregator.iter_json_chunks(transaction_store())) == "[]"
+    assert "".join(
+        data_aggregator.iter_json_chunks({"balance": Decimal("1.50")})
+    ) == json.dumps({"balance": "1.50"}, **json_options)
+
+
+def test_csv_chunks(data_aggregator, transactions):
+    """Unittests csv chunks contain header and all transaction rows"""
+    csv_chunks = list(data_aggregator.iter_csv_chunks(transactions))
+
+    assert len(csv_chunks) > 1
+    assert list(csv.DictReader(io.StringIO("".join(csv_chunks)))) == (
+        transactions.to_records()
+    )
+    assert "".join(
+        data_aggregator.iter_csv_chunks([{"category": "Food", "balance": 1}])
+    ) == ("category,balance\r\nFood,1\r\n")
+
+
+def test_mixed_precision_export(data_aggregator, transactions):
+    """Unittests exported amounts keep their own fraction digits"""
+    exported_rows = csv.DictReader(
+        io.StringIO("".join(data_aggregator.iter_csv_chunks(transactions)))
+    )
+
+    assert [row["amount"] for row in exported_rows] == ["1111", "-12.5", "-7"]
+    assert [
+        record["converted amount"]
+        for record in json.loads(
+            "".join(data_aggregator.iter_json_chunks(transactions))
+        )
+    ] == ["1111", "-12.5", "-7"]
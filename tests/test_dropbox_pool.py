@@ -0,0 +1,37 @@
+"""Unittests for pool of reusable async Dropbox clients"""
+from src.domain import dropbox_pool
+from src.domain.dropbox_pool import DropboxClientPool
+
+
+class MockAsyncDropboxClient:
+    """Mocked async Dropbox client for Unittests"""
+
+    def __init__(self, token, account_id):
+        self.token = token
+        self.account_id = account_id
+
+
+def test_dropbox_pool_reuses_client(monkeypatch):
+    """Unittests the same account and token reuse pooled client"""
+    monkeypatch.setattr(dropbox_pool, "AsyncDropboxClient", MockAsyncDropboxClient)
+    client_pool = DropboxClientPool(max_size=2, time_to_live=60)
+    dropbox_client = client_pool.get_client("dbid:first", "token")
+
+    assert client_pool.get_client("dbid:first", "token") is dropbox_client
+    assert client_pool.get_client("dbid:first", "new_token") is not dropbox_client
+
+
+def test_dropbox_pool_eviction(monkeypatch):
+    """Unittests pool evicts least recently used and expired clients"""
+    monkeypatch.setattr(dropbox_pool, "AsyncDropboxClient", MockAsyncDropboxClient)
+    client_pool = DropboxClientPool(max_size=2, time_to_live=60)
+    first_client = client_pool.get_client("dbid:first", "token")
+    client_pool.get_client("dbid:second", "token")
+    client_pool.get_client("dbid:first", "token")
+    client_pool.get_client("dbid:third", "token")
+
+    assert list(client_pool.clients) == ["dbid:first", "dbid:third"]
+    assert client_pool.get_client("dbid:first", "token") is first_client
+
+    client_pool.time_to_live = 0
+    assert client_pool.get_client("dbid:first", "token") is not first_client
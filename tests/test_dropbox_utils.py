@@ -1,22 +1,144 @@
 """Unittests for implemented Dropbox client in Monefy Application"""
-import logging
 
+import httpx
+import pytest
 
-def test_dropbox_get_monefy_csv(monkeypatch, dropbox_client):
-    """Unittests get file from Dropbox storage"""
-    csv_files = dropbox_client.get_monefy_info()
+from src.domain.backup_ingestion import DropboxContentHasher
+from tests.conftest import ContentMock
 
-    assert list(csv_files.keys()) == ["monefy-2022-01-01_01-01-01.csv"]
 
+@pytest.mark.asyncio
+async def test_async_dropbox_get_monefy_info(async_dropbox_client):
+    """Unittests get monefy transactions by async Dropbox client"""
+    monefy_info = await async_dropbox_client.get_monefy_info()
 
-def test_dropbox_write_monefy_csv(dropbox_client):
-    """Unittests writing monefy info to Dropbox"""
-    csv_files = dropbox_client.write_monefy_info()
-    assert csv_files == ["monefy-2022-01-01_01-01-01.csv"]
+    assert monefy_info.to_records() == [
+        {
+            "date": "12/12/2021",
+            "account": "Cash",
+            "category": "Salary",
+            "amount": "1111",
+            "currency": "USD",
+            "converted amount": "1111",
+            "converted currency": "USD",
+            "description": "",
+        }
+    ]
 
 
-def test_dropbox_write_monefy_io_error(dropbox_error_client, caplog):
-    """Unittests exception raise for writing monefy information to Dropbox"""
-    caplog.set_level(logging.ERROR)
-    dropbox_error_client.write_monefy_info()
-    assert "ERROR" in caplog.text
+@pytest.mark.asyncio
+async def test_async_dropbox_latest_monefy_csv(async_dropbox_client):
+    """Unittests get latest monefy backup file name by async Dropbox client"""
+    latest_file = await async_dropbox_client.get_latest_monefy_csv_file()
+
+    assert latest_file == "monefy-2022-01-01_01-01-01.csv"
+
+
+@pytest.mark.asyncio
+async def test_async_dropbox_api_error(async_dropbox_client):
+    """Unittests Dropbox API error raise for async Dropbox client"""
+    with pytest.raises(httpx.HTTPStatusError):
+        await async_dropbox_client.rpc_request("files/get_metadata", {"path": "test"})
+
+
+@pytest.mark.asyncio
+async def test_async_dropbox_monefy_info_from_mirror(async_dropbox_client, monkeypatch):
+    """Unittests unchanged monefy backup is read from local mirror"""
+    await async_dropbox_client.get_monefy_info()
+
+    async def files_download(*args, **kwargs):
+        raise AssertionError("backup should be served from local mirror")
+
+    monkeypatch.setattr(async_dropbox_client, "files_download", files_download)
+    monefy_info = await async_dropbox_client.get_monefy_info()
+
+    assert monefy_info[0]["category"] == "Salary"
+
+
+@pytest.mark.asyncio
+async def test_async_dropbox_listing_cursor(async_dropbox_client):
+    """Unittests account backup listing continues from persisted cursor"""
+    async_dropbox_client.account_id = "dbid:test_listing_cursor"
+    async_dropbox_client.backup_listing.reset_index(async_dropbox_client.account_id)
+    await async_dropbox_client.get_latest_monefy_backup()
+    async_dropbox_client.backup_listing.backup_indexes.clear()
+
+    backup_index = await async_dropbox_client.sync_monefy_backup_index()
+
+    assert backup_index.cursor == "test_cursor"
+    assert backup_index.latest()[1]["name"] == "monefy-2022-01-01_01-01-01.csv"
+
+
+@pytest.mark.asyncio
+async def test_async_dropbox_monefy_info_tail(async_dropbox_client, monkeypatch):
+    """Unittests only appended tail of monefy backup is downloaded and parsed"""
+    backup_content = {"content": ContentMock.content + b"\r\n"}
+    requested_ranges = []
+
+    def monefy_backup_entry():
+        content_hasher = DropboxContentHasher()
+        content_hasher.update(backup_content["content"])
+        return {
+            ".tag": "file",
+            "name": "monefy-2022-01-01_01-01-01.csv",
+            "content_hash": content_hasher.hexdigest(),
+            "size": len(backup_content["content"]),
+        }
+
+    def mock_api(request):
+        if request.url.path == "/2/files/download":
+            requested_ranges.append(request.headers.get("Range"))
+            range_start = int(request.headers.get("Range", "bytes=0-")[6:-1])
+            return httpx.Response(
+                206 if "Range" in request.headers else 200,
+                content=backup_content["content"][range_start:],
+            )
+        entries = [monefy_backup_entry()] if len(requested_ranges) < 2 else []
+        return httpx.Response(
+            200, json={"entries": entries, "cursor": "tail", "has_more": False}
+        )
+
+    async_dropbox_client.account_id = "dbid:test_monefy_info_tail"
+    async_dropbox_client.http_client = httpx.AsyncClient(
+        transport=httpx.MockTransport(mock_api)
+    )
+    assert len(await async_dropbox_client.get_monefy_info()) == 1
+
+    backup_content["content"] += b"13/12/2021,Cash,Food,-5,USD,-5,USD,\r\n"
+    async_dropbox_client.backup_listing.reset_index(async_dropbox_client.account_id)
+    monefy_info = await async_dropbox_client.get_monefy_info()
+
+    assert requested_ranges[1].startswith("bytes=")
+    assert [transaction["category"] for transaction in monefy_info] == [
+        "Salary",
+        "Food",
+    ]
+    assert await async_dropbox_client.get_monefy_info() == monefy_info
+
+
+@pytest.mark.asyncio
+async def test_async_dropbox_upload_session(async_dropbox_client, tmp_path):
+    """Unittests summarized file is uploaded by chunks with upload session"""
+    uploaded_chunks = []
+
+    def mock_api(request):
+        uploaded_chunks.append((request.url.path, request.content))
+        return httpx.Response(200, json={"session_id": "test_session"})
+
+    summarized_file = tmp_path / "summarized_monefy.csv"
+    summarized_file.write_bytes(b"income,expense,balance\r\n10,-5,5\r\n")
+    async_dropbox_client.upload_chunk_size = 10
+    async_dropbox_client.http_client = httpx.AsyncClient(
+        transport=httpx.MockTransport(mock_api)
+    )
+    await async_dropbox_client.upload_summarized_file(str(summarized_file))
+
+    assert [route for route, _ in uploaded_chunks] == [
+        "/2/files/upload_session/start",
+        "/2/files/upload_session/append_v2",
+        "/2/files/upload_session/append_v2",
+        "/2/files/upload_session/finish",
+    ]
+    assert b"".join(chunk for _, chunk in uploaded_chunks) == (
+        summarized_file.read_bytes()
+    )
@@ -0,0 +1,68 @@
+"""Unittests for Monefy transactions group by engine"""
+from decimal import Decimal
+
+import pytest
+
+from src.common.http_codes import NotAcceptable
+from src.domain.group_by import TransactionGroupBy, parse_group_by
+from tests.conftest import monefy_transaction
+
+
+@pytest.fixture()
+def transactions(transaction_store):
+    """Transaction store with transactions of two accounts and months"""
+    return transaction_store(
+        monefy_transaction("30/11/2021", "Salary", "1000"),
+        monefy_transaction("12/12/2021", "Food", "-12.5"),
+        monefy_transaction("13/12/2021", "Food", "-7.5", account="Card"),
+        monefy_transaction("14/12/2021", "Salary", "500", account="Card"),
+    )
+
+
+def test_group_by_account_and_month(transactions):
+    """Unittests transactions are grouped by account and month bucket"""
+    grouped_data = TransactionGroupBy(transactions, ("account", "month")).aggregate()
+
+    assert grouped_data == [
+        {
+            "account": "Card",
+            "month": "2021-12",
+            "income": Decimal("500.0"),
+            "expense": Decimal("-7.5"),
+            "balance": Decimal("492.5"),
+            "transactions": 2,
+        },
+        {
+            "account": "Cash",
+            "month": "2021-11",
+            "income": Decimal("1000.0"),
+            "expense": Decimal("0.0"),
+            "balance": Decimal("1000.0"),
+            "transactions": 1,
+        },
+        {
+            "account": "Cash",
+            "month": "2021-12",
+            "income": Decimal("0.0"),
+            "expense": Decimal("-12.5"),
+            "balance": Decimal("-12.5"),
+            "transactions": 1,
+        },
+    ]
+
+
+def test_group_by_week_and_total(transactions):
+    """Unittests ISO week buckets and aggregation without dimensions"""
+    weeks = TransactionGroupBy(transactions, ("week",)).aggregate()
+    total = TransactionGroupBy(transactions, ()).aggregate()
+
+    assert [week["week"] for week in weeks] == ["2021-W48", "2021-W49", "2021-W50"]
+    assert total[0]["balance"] == Decimal("1480.0")
+    assert total[0]["transactions"] == 4
+
+
+def test_parse_group_by():
+    """Unittests group by argument parsing"""
+    assert parse_group_by("Category, month,category") == ("category", "month")
+    with pytest.raises(NotAcceptable):
+        parse_group_by("description")
@@ -2,7 +2,7 @@
 import hmac
 from hashlib import sha256
 
-from src.resources import monefy_service
+from src.domain import dropbox_pool
 from tests.conftest import MockDropbox404Error, MockDropboxClient
 
 
@@ -21,7 +21,7 @@ def test_get_monefy_info(monefy_app, monkeypatch):
     def mock_dropbox():
         return MockDropboxClient()
 
-    monkeypatch.setattr(monefy_service, "DropboxClient", mock_dropbox)
+    monkeypatch.setattr(dropbox_pool, "AsyncDropboxClient", mock_dropbox)
     request, response = monefy_app.test_client.get("/monefy/monefy_info")
 
     assert request.method == "GET"
@@ -36,7 +36,7 @@ def test_get_monefy_info_not_found(monefy_app, monkeypatch):
 
         return MockDropbox404Error()
 
-    monkeypatch.setattr(monefy_service, "DropboxClient", mock_dropbox)
+    monkeypatch.setattr(dropbox_pool, "AsyncDropboxClient", mock_dropbox)
     request, response = monefy_app.test_client.get("/monefy/monefy_info")
 
     assert request.method == "GET"
@@ -49,7 +49,7 @@ def test_post_monefy_info(monefy_app, monkeypatch):
     def mock_dropbox():
         return MockDropboxClient()
 
-    monkeypatch.setattr(monefy_service, "DropboxClient", mock_dropbox)
+    monkeypatch.setattr(dropbox_pool, "AsyncDropboxClient", mock_dropbox)
     request, response = monefy_app.test_client.post("/monefy/monefy_info")
     assert request.method == "POST"
     assert response.body == b'{"message":["monefy-2022-01-01_01-01-01.csv"]}'
@@ -62,7 +62,7 @@ def test_get_data_aggregation(monefy_app, monkeypatch):
     def mock_dropbox():
         return MockDropboxClient()
 
-    monkeypatch.setattr(monefy_service, "DropboxClient", mock_dropbox)
+    monkeypatch.setattr(dropbox_pool, "AsyncDropboxClient", mock_dropbox)
     monefy_app.test_client.post("/monefy/monefy_info")
     request, response = monefy_app.test_client.get(
         "/monefy_aggregation", params={"format": "json"}
@@ -96,7 +96,7 @@ def test_get_data_aggregation_not_acceptable(monefy_app, monkeypatch):
     def mock_dropbox():
         return MockDropboxClient()
 
-    monkeypatch.setattr(monefy_service, "DropboxClient", mock_dropbox)
+    monkeypatch.setattr(dropbox_pool, "AsyncDropboxClient", mock_dropbox)
     monefy_app.test_client.post("/monefy/monefy_info")
 
     request, response = monefy_app.test_client.get(
@@ -137,7 +137,7 @@ def test_post_dropbox_webhook_200(monefy_app, monkeypatch):
     def mock_dropbox():
         return MockDropboxClient()
 
-    monkeypatch.setattr(monefy_service, "DropboxClient", mock_dropbox)
+    monkeypatch.setattr(dropbox_pool, "AsyncDropboxClient", mock_dropbox)
 
     test_signature = hmac.new("TEST".encode(), "".encode(), sha256).hexdigest()
     request, response = monefy_app.test_client.post(
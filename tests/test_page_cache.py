@@ -0,0 +1,48 @@
+"""Unittests for compiled templates and rendered pages cache"""
+import pytest
+from jinja2 import DictLoader, Environment
+
+from src.common.page_cache import RenderedPageCache
+
+
+@pytest.fixture()
+def page_cache():
+    """Page cache with compiled in-memory templates"""
+    rendered_page_cache = RenderedPageCache(2)
+    rendered_page_cache.compile_templates(
+        Environment(
+            loader=DictLoader({"home.html": "{{ message }}", "auth.html": "auth"}),
+            enable_async=True,
+        ),
+        ("home.html", "auth.html"),
+    )
+    return rendered_page_cache
+
+
+@pytest.mark.asyncio
+async def test_rendered_pages(page_cache):
+    """Unittests guest and user pages are rendered once until invalidation"""
+    assert page_cache.get("home.html") is None
+    assert await page_cache.render("home.html", {"message": "guest"}) == "guest"
+    assert await page_cache.render("home.html", {"message": "user"}, "user") == "user"
+
+    assert page_cache.get("home.html") == "guest"
+    assert page_cache.get("home.html", "user") == "user"
+
+    page_cache.invalidate("user")
+
+    assert page_cache.get("home.html", "user") is None
+    assert page_cache.get("home.html") == "guest"
+
+
+@pytest.mark.asyncio
+async def test_rendered_pages_eviction(page_cache):
+    """Unittests least recently used pages are evicted"""
+    await page_cache.render("home.html", {"message": "first"}, "first")
+    await page_cache.render("home.html", {"message": "second"}, "second")
+    page_cache.get("home.html", "first")
+    await page_cache.render("auth.html", {})
+
+    assert page_cache.get("home.html", "first") == "first"
+    assert page_cache.get("home.html", "second") is None
+    assert page_cache.get_template("auth.html") is page_cache.templates["auth.html"]
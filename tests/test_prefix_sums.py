@@ -0,0 +1,115 @@
+"""Unittests for per day prefix sums analytics"""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from src.common.http_codes import NotAcceptable
+from src.domain.prefix_sums import (DailyPrefixSums, parse_analytics_query,
+                                    parse_windows)
+from src.domain.transaction_query import TransactionQuery
+from tests.conftest import monefy_transaction
+
+
+@pytest.fixture()
+def transactions(transaction_store):
+    """Transaction store with transactions of several weeks"""
+    return transaction_store(
+        monefy_transaction("01/12/2021", "Salary", "1000"),
+        monefy_transaction("03/12/2021", "Food", "-10.5"),
+        monefy_transaction("03/12/2021", "Food", "-4.5", account="Card"),
+        monefy_transaction("10/12/2021", "Rent", "-500", account="Card"),
+        monefy_transaction("28/12/2021", "Food", "-20"),
+    )
+
+
+def test_prefix_sums_date_range_totals(transactions):
+    """Unittests range and rolling totals match transaction scan"""
+    analytics = DailyPrefixSums.for_store(transactions).analyze(
+        transactions, date(2021, 12, 2), date(2021, 12, 10), windows=(7, 30)
+    )
+
+    assert analytics["from"] == "2021-12-02"
+    assert analytics["income"] == Decimal("0")
+    assert analytics["expense"] == Decimal("-515")
+    assert analytics["categories"] == {
+        "Salary": Decimal("0"),
+        "Food": Decimal("-15"),
+        "Rent": Decimal("-500"),
+    }
+    assert analytics["rolling"] == {
+        "7": {"income": Decimal("0"), "expense": Decimal("-500")},
+        "30": {"income": Decimal("1000"), "expense": Decimal("-515")},
+    }
+    assert analytics["running_balance"][0] == {
+        "date": "2021-12-02",
+        "balance": Decimal("1000"),
+    }
+    assert analytics["running_balance"][-1] == {
+        "date": "2021-12-10",
+        "balance": Decimal("485"),
+    }
+
+
+def test_prefix_sums_are_rebuilt(transactions):
+    """Unittests prefix sums are built once per store and rebuilt after append"""
+    prefix_sums = DailyPrefixSums.for_store(transactions)
+    assert DailyPrefixSums.for_store(transactions) is prefix_sums
+    assert prefix_sums.range_total(prefix_sums.expense, 0, 10**6) == -5350
+
+    transactions.append({**transactions[0], "date": "05/01/2022"})
+    prefix_sums = DailyPrefixSums.for_store(transactions)
+    assert prefix_sums.balance_until(date(2022, 1, 5).toordinal()) == 14650
+
+
+def test_prefix_sums_query_filters(transactions):
+    """Unittests account, category and amount filters apply to all totals"""
+    category_query = parse_analytics_query(
+        {"category": ["Food"], "from": ["2021-12-02"], "to": ["2021-12-10"]}
+    )
+    analytics = DailyPrefixSums.for_query(transactions, category_query).analyze(
+        transactions,
+        category_query.date_from,
+        category_query.date_to,
+        category_query.categories,
+        (30,),
+    )
+
+    assert (analytics["income"], analytics["expense"]) == (0, Decimal("-15"))
+    assert analytics["categories"] == {"Food": Decimal("-15")}
+    assert analytics["rolling"]["30"]["expense"] == Decimal("-15")
+    assert analytics["running_balance"][-1]["balance"] == Decimal("-15")
+
+    account_query = TransactionQuery(accounts=["Card"], min_amount=Decimal("-100"))
+    prefix_sums = DailyPrefixSums.for_query(transactions, account_query)
+    assert DailyPrefixSums.for_query(transactions, account_query) is prefix_sums
+    assert prefix_sums.analyze(transactions)["balance"] == Decimal("-4.5")
+
+    transactions.append({**transactions[2], "amount": "-1", "converted amount": "-1"})
+    prefix_sums = DailyPrefixSums.for_query(transactions, account_query)
+    assert prefix_sums.analyze(transactions)["balance"] == Decimal("-5.5")
+
+
+def test_parse_analytics_query():
+    """Unittests analytics don't accept columns projection"""
+    assert parse_analytics_query({"account": ["Cash"]}).accounts == ["Cash"]
+    with pytest.raises(NotAcceptable):
+        parse_analytics_query({"columns": ["date,amount"]})
+
+
+def test_prefix_sums_empty_store(transaction_store):
+    """Unittests analytics of store without transactions"""
+    transactions = transaction_store()
+    analytics = DailyPrefixSums.for_store(transactions).analyze(transactions)
+
+    assert analytics["from"] is None
+    assert analytics["balance"] == Decimal("0")
+    assert analytics["running_balance"] == []
+
+
+def test_parse_windows():
+    """Unittests rolling windows query parameter"""
+    assert parse_windows({}) == (7, 30, 90)
+    assert parse_windows({"window": ["14,7", "14"]}) == (14, 7)
+    with pytest.raises(NotAcceptable):
+        parse_windows({"window": ["week"]})
@@ -0,0 +1,209 @@
+"""Unittests for persistent Monefy transaction ledger"""
+import threading
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from src.domain.backup_ingestion import IngestedMonefyBackup
+from src.domain.group_by import TransactionGroupBy, aggregate_rollups
+from src.domain.transaction_ledger import MonefyTransactionLedger
+from src.domain.transaction_query import TransactionQuery
+from src.domain.transaction_store import MonefyTransactionStore
+
+MONEFY_FIELDNAMES = [
+    "date",
+    "account",
+    "category",
+    "amount",
+    "currency",
+    "converted amount",
+    "converted currency",
+    "description",
+]
+
+
+def ingested_monefy_backup(backup_key, transactions):
+    """Ingested Monefy backup with provided transactions for Unittests"""
+    return IngestedMonefyBackup(
+        backup_key=backup_key,
+        length=100,
+        prefix_tail_digest="digest",
+        prefix_tail_size=100,
+        fieldnames=MONEFY_FIELDNAMES,
+        transactions=transactions,
+    )
+
+
+def test_transaction_ledger_appends_rows(monefy_app):
+    """Unittests ledger stores appended transactions and rescales stored amounts"""
+    ledger = MonefyTransactionLedger(monefy_app.ctx.sqlite_connection)
+    transactions = MonefyTransactionStore()
+    transactions.append(
+        dict(
+            zip(
+                MONEFY_FIELDNAMES,
+                ["12/12/2021", "Cash", "Salary", "1111", "USD", "1111", "USD", ""],
+            )
+        )
+    )
+    previous_backup = ingested_monefy_backup("first", transactions)
+    ledger.save_ingested_backup("dbid:test_ledger", previous_backup)
+
+    new_transactions = transactions.copy()
+    new_transactions.append(
+        dict(
+            zip(
+                MONEFY_FIELDNAMES,
+                ["13/12/2021", "Cash", "Food", "-2.5", "USD", "-2.5", "USD", "lunch"],
+            )
+        )
+    )
+    ledger.save_ingested_backup(
+        "dbid:test_ledger",
+        ingested_monefy_backup("second", new_transactions),
+        previous_backup,
+    )
+    ingested_backup = ledger.load_ingested_backup("dbid:test_ledger")
+
+    assert ingested_backup.backup_key == "second"
+    assert ingested_backup.fieldnames == MONEFY_FIELDNAMES
+    assert ingested_backup.transactions.to_records() == new_transactions.to_records()
+    assert ledger.load_ingested_backup("dbid:test_ledger_unknown") is None
+
+
+def test_transaction_ledger_rollups(monefy_app):
+    """Unittests rollups are updated by appended transactions and match group by"""
+    ledger = MonefyTransactionLedger(monefy_app.ctx.sqlite_connection)
+    transactions = MonefyTransactionStore()
+    transactions.append(
+        dict(
+            zip(
+                MONEFY_FIELDNAMES,
+                ["12/11/2021", "Cash", "Food", "-3", "USD", "-3", "USD", ""],
+            )
+        )
+    )
+    previous_backup = ingested_monefy_backup("first", transactions)
+    ledger.save_ingested_backup("dbid:test_rollups", previous_backup)
+    new_transactions = transactions.copy()
+    for transaction_date, amount in (("12/12/2021", "10.5"), ("13/12/2021", "-2")):
+        new_transactions.append(
+            dict(
+                zip(
+                    MONEFY_FIELDNAMES,
+                    [
+                        transaction_date,
+                        "Cash",
+                        "Food",
+                        amount,
+                        "USD",
+                        amount,
+                        "USD",
+                        "",
+                    ],
+                )
+            )
+        )
+    ledger.save_ingested_backup(
+        "dbid:test_rollups",
+        ingested_monefy_backup("second", new_transactions),
+        previous_backup,
+    )
+
+    monthly_rollups = ledger.get_rollups(
+        "dbid:test_rollups", "second", "monthly_rollups"
+    )
+    assert monthly_rollups == [
+        (date(2021, 11, 1).toordinal(), "Food", "USD", 0, -30, -30, 1),
+        (date(2021, 12, 1).toordinal(), "Food", "USD", 105, -20, 85, 2),
+    ]
+    assert (
+        aggregate_rollups(
+            ledger.get_rollups("dbid:test_rollups", "second", "daily_rollups"),
+            ("category", "week"),
+            new_transactions,
+        )
+        == TransactionGroupBy(new_transactions, ("category", "week")).aggregate()
+    )
+    assert ledger.get_rollups("dbid:test_rollups", "first", "daily_rollups") is None
+
+
+@pytest.mark.asyncio
+async def test_transaction_ledger_thread(monefy_app):
+    """Unittests ledger queries are run in ledger thread off the event loop"""
+    ledger = monefy_app.ctx.monefy_transaction_ledger
+    transactions = MonefyTransactionStore()
+    transactions.append(
+        dict(
+            zip(
+                MONEFY_FIELDNAMES,
+                ["12/12/2021", "Cash", "Salary", "1111", "USD", "1111", "USD", ""],
+            )
+        )
+    )
+    await ledger.run(
+        ledger.save_ingested_backup,
+        "dbid:test_thread",
+        ingested_monefy_backup("thread", transactions),
+    )
+    ingested_backup = await ledger.run(ledger.load_ingested_backup, "dbid:test_thread")
+
+    assert ingested_backup.transactions.to_records() == transactions.to_records()
+    assert await ledger.run(threading.current_thread) is not threading.current_thread()
+
+
+def test_transaction_ledger_select_transactions(monefy_app):
+    """Unittests filtered transactions are selected from ledger by indexes"""
+    ledger = MonefyTransactionLedger(monefy_app.ctx.sqlite_connection)
+    transactions = MonefyTransactionStore()
+    for transaction_date, category, amount in (
+        ("12/11/2021", "Food", "-3"),
+        ("12/12/2021", "Salary", "1111"),
+        ("13/12/2021", "Food", "-2.5"),
+    ):
+        transactions.append(
+            dict(
+                zip(
+                    MONEFY_FIELDNAMES,
+                    [
+                        transaction_date,
+                        "Cash",
+                        category,
+                        amount,
+                        "USD",
+                        amount,
+                        "USD",
+                        "",
+                    ],
+                )
+            )
+        )
+    ledger.save_ingested_backup(
+        "dbid:test_select", ingested_monefy_backup("select", transactions)
+    )
+    transaction_query = TransactionQuery(
+        date_from=date(2021, 12, 1),
+        categories=["Food"],
+        max_amount=Decimal("-1"),
+        columns=("date", "amount"),
+    )
+
+    selected_transactions = ledger.select_transactions(
+        "dbid:test_select", "select", transaction_query
+    )
+    assert selected_transactions.to_records() == (
+        transaction_query.apply(transactions).to_records()
+    )
+    assert selected_transactions.to_records() == [
+        {"date": "13/12/2021", "amount": "-2.5"}
+    ]
+    assert (
+        ledger.select_transactions("dbid:test_select", "old", transaction_query) is None
+    )
+    query_plan = monefy_app.ctx.sqlite_connection.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM transactions "
+        "WHERE account_id = ? AND category IN (?)",
+        ("dbid:test_select", "Food"),
+    ).fetchall()
+    assert "transactions_account_category" in str(query_plan)
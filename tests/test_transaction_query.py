@@ -0,0 +1,105 @@
+"""Unittests for filtered and projected transaction queries"""
+from decimal import Decimal
+
+import pytest
+
+from src.common.http_codes import NotAcceptable
+from src.domain.transaction_query import (TransactionIndex, TransactionPage,
+                                          TransactionQuery)
+from tests.conftest import monefy_transaction
+
+
+@pytest.fixture()
+def transactions(transaction_store):
+    """Transaction store with not date ordered transactions"""
+    return transaction_store(
+        monefy_transaction("12/12/2021", "Food", "-12.5"),
+        monefy_transaction("30/11/2021", "Food", "-3"),
+        monefy_transaction("13/12/2021", "Food", "-70", account="Card"),
+        monefy_transaction("14/12/2021", "Salary", "500", account="Card"),
+        monefy_transaction("01/12/2021", "Food", "-1"),
+    )
+
+
+def test_transaction_query_filters(transactions):
+    """Unittests date range, category, account and amount filters"""
+    transaction_query = TransactionQuery.from_args(
+        {
+            "from": ["2021-12-01"],
+            "to": ["2021-12-31"],
+            "category": ["Food,Unknown"],
+            "min_amount": ["-20"],
+        }
+    )
+
+    assert transaction_query.select_rows(transactions) == [0, 4]
+    assert TransactionQuery(accounts=["Card"], max_amount=Decimal("0")).select_rows(
+        transactions
+    ) == [2]
+
+
+def test_transaction_query_projection(transactions):
+    """Unittests filtered store contains only projected columns"""
+    food_transactions = TransactionQuery(
+        categories=["Food"], date_to=None, columns=("date", "amount")
+    ).apply(transactions)
+
+    assert food_transactions.to_records() == [
+        {"date": "12/12/2021", "amount": "-12.5"},
+        {"date": "30/11/2021", "amount": "-3"},
+        {"date": "13/12/2021", "amount": "-70"},
+        {"date": "01/12/2021", "amount": "-1"},
+    ]
+    assert dict(food_transactions[0]) == {"date": "12/12/2021", "amount": "-12.5"}
+
+
+def test_transaction_index_is_rebuilt(transactions):
+    """Unittests cached index is rebuilt after transactions are appended"""
+    transaction_index = TransactionIndex.for_store(transactions)
+    assert TransactionIndex.for_store(transactions) is transaction_index
+    assert list(transaction_index.date_range_rows(None, None)) == [1, 4, 0, 2, 3]
+
+    transactions.append({**transactions[0], "date": "01/01/2022"})
+    assert TransactionIndex.for_store(transactions) is not transaction_index
+
+
+def test_transaction_query_invalid_arguments():
+    """Unittests invalid query parameters are not acceptable"""
+    with pytest.raises(NotAcceptable):
+        TransactionQuery.from_args({"from": ["12/12/2021"]})
+    with pytest.raises(NotAcceptable):
+        TransactionQuery.from_args({"columns": ["date,password"]})
+
+
+@pytest.mark.parametrize(
+    "amount", ["Infinity", "-inf", "NaN", "sNaN", "1e999999999", "1e-999999999"]
+)
+def test_transaction_query_invalid_amounts(amount):
+    """Unittests non-finite and out of range amounts are not acceptable"""
+    with pytest.raises(NotAcceptable):
+        TransactionQuery.from_args({"min_amount": [amount]})
+    assert TransactionQuery.from_args({"max_amount": ["-12.5"]}).max_amount == (
+        Decimal("-12.5")
+    )
+
+
+def test_transaction_pages(transactions):
+    """Unittests cursor pages of transactions with limited page size"""
+    first_page = TransactionPage.from_args({"page_size": ["2"]}, 100, 1000)
+    last_page = TransactionPage.from_args({"cursor": ["4"]}, 2, 1000)
+
+    assert [row["amount"] for row in first_page.rows(transactions)] == [
+        "-12.5",
+        "-3",
+    ]
+    assert first_page.previous_cursor() is None
+    assert first_page.next_cursor(transactions) == 2
+    assert [row["amount"] for row in last_page.rows(transactions)] == ["-1"]
+    assert last_page.previous_cursor() == 2
+    assert last_page.next_cursor(transactions) is None
+    assert TransactionPage.from_args({"page_size": ["5000"]}, 100, 1000).page_size == (
+        1000
+    )
+    for invalid_args in ({"cursor": ["-1"]}, {"page_size": ["0"]}, {"cursor": ["a"]}):
+        with pytest.raises(NotAcceptable):
+            TransactionPage.from_args(invalid_args, 100, 1000)
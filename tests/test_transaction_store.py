@@ -0,0 +1,146 @@
+"""Unittests for columnar Monefy transaction store"""
+from decimal import Decimal
+
+import pytest
+
+from src.domain.data_aggregator import MonefyDataAggregator
+from src.domain.transaction_query import TransactionQuery
+from src.domain.transaction_store import MonefyTransactionStore
+from tests.conftest import monefy_transaction
+
+
+def test_transaction_store_rows():
+    """Unittests transactions are stored by columns and read as mapping rows"""
+    transactions = MonefyTransactionStore()
+    transactions.extend(
+        [
+            monefy_transaction("12/12/2021", "Salary", "1111"),
+            monefy_transaction("13/12/2021", "Food", "-12.5", "lunch"),
+        ]
+    )
+
+    assert len(transactions) == 2
+    assert transactions.amount_scale == 1
+    assert list(transactions.amounts) == [11110, -125]
+    assert transactions.categories.values == ["Salary", "Food"]
+    assert dict(transactions[-1]) == monefy_transaction(
+        "13/12/2021", "Food", "-12.5", "lunch"
+    )
+    assert transactions[0]["amount"] == "1111"
+    with pytest.raises(IndexError):
+        transactions[2]  # pylint: disable=pointless-statement
+
+
+def test_transaction_store_date_format_switch():
+    """Unittests month first dates are detected after day first format fails"""
+    transactions = MonefyTransactionStore()
+    transactions.extend(
+        [
+            monefy_transaction("01/02/2022", "Salary", "10"),
+            monefy_transaction("12/31/2022", "Food", "-5"),
+        ]
+    )
+
+    assert transactions.date_format == "%m/%d/%Y"
+    assert [transaction["date"] for transaction in transactions] == [
+        "01/02/2022",
+        "12/31/2022",
+    ]
+
+
+def test_transaction_store_copy():
+    """Unittests appending to copied store doesn't change original store"""
+    transactions = MonefyTransactionStore()
+    transactions.append(monefy_transaction("12/12/2021", "Salary", "1111"))
+    transactions_copy = transactions.copy()
+    transactions_copy.append(monefy_transaction("13/12/2021", "Food", "-0.25"))
+
+    assert len(transactions) == 1
+    assert transactions[0]["amount"] == "1111"
+    assert transactions_copy[0]["amount"] == "1111"
+    assert list(transactions_copy.amounts) == [111100, -25]
+
+
+def test_summarize_transaction_store():
+    """Unittests summary is calculated from integer minor units"""
+    transactions = MonefyTransactionStore()
+    transactions.extend(
+        [
+            monefy_transaction("12/12/2021", "Salary", "1111"),
+            monefy_transaction("13/12/2021", "Food", "-12.5"),
+            monefy_transaction("14/12/2021", "Food", "-0.5"),
+        ]
+    )
+
+    assert MonefyDataAggregator.summarize_data(transactions) == {
+        "income": Decimal("1111"),
+        "expense": Decimal("-13"),
+        "balance": Decimal("1098"),
+        "currency": "USD",
+        "Salary": Decimal("1111"),
+        "Food": Decimal("-13"),
+        "USD amount": Decimal("1098"),
+    }
+
+
+def test_summarize_multi_currency_transactions():
+    """Unittests summary uses converted amounts with subtotals by currency"""
+    transactions = MonefyTransactionStore()
+    transactions.append(monefy_transaction("12/12/2021", "Salary", "1000"))
+    transactions.append(
+        {
+            **monefy_transaction("13/12/2021", "Food", "-50"),
+            "currency": "EUR",
+            "converted amount": "-55",
+        }
+    )
+
+    summarized_data = MonefyDataAggregator.summarize_data(transactions)
+
+    assert summarized_data["balance"] == Decimal("945")
+    assert summarized_data["Food"] == Decimal("-55")
+    assert summarized_data["EUR amount"] == Decimal("-50")
+    assert summarized_data["USD amount"] == Decimal("1000")
+
+
+def test_summarize_empty_filtered_transactions():
+    """Unittests summary of multi-currency transactions filtered to no rows"""
+    transactions = MonefyTransactionStore()
+    transactions.append(monefy_transaction("12/12/2021", "Salary", "1000"))
+    transactions.append(
+        {
+            **monefy_transaction("13/12/2021", "Food", "-50"),
+            "currency": "EUR",
+            "converted currency": "EUR",
+        }
+    )
+
+    summarized_data = MonefyDataAggregator.summarize_data(
+        TransactionQuery(categories=["Nope"]).apply(transactions)
+    )
+
+    assert summarized_data["balance"] == Decimal("0")
+    assert summarized_data["currency"] == ""
+
+
+def test_summarize_filtered_transactions():
+    """Unittests summary of filtered transactions has only their categories"""
+    transactions = MonefyTransactionStore()
+    transactions.append(monefy_transaction("12/12/2021", "Salary", "1000"))
+    transactions.append(
+        {
+            **monefy_transaction("13/12/2021", "Food", "-50"),
+            "currency": "EUR",
+            "converted amount": "-55",
+        }
+    )
+
+    summarized_data = MonefyDataAggregator.summarize_data(
+        TransactionQuery(categories=["Food"]).apply(transactions)
+    )
+
+    assert summarized_data["balance"] == Decimal("-55")
+    assert summarized_data["Food"] == Decimal("-55")
+    assert summarized_data["EUR amount"] == Decimal("-50")
+    assert "Salary" not in summarized_data
+    assert "USD amount" not in summarized_data
@@ -0,0 +1,62 @@
+"""Unittests for Dropbox user profiles cache"""
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from src.domain.user_profiles import UserProfileCache
+
+
+class ProfileDropboxClient:
+    """Dropbox client that returns provided user profile"""
+
+    def __init__(self, account_id, user_name, photo_url):
+        self.account_id = account_id
+        self.user_info = SimpleNamespace(
+            user_name=user_name, user_profile_photo_url=photo_url
+        )
+        self.requests = 0
+
+    async def get_dropbox_user_info(self):
+        """Return user profile and count Dropbox requests"""
+        self.requests += 1
+        return self.user_info
+
+
+@pytest.fixture()
+def user_profiles():
+    """Profile cache backed by in-memory users table with one user"""
+    sqlite_connection = sqlite3.connect(":memory:")
+    sqlite_connection.execute(
+        "CREATE TABLE users (account_id TEXT, username TEXT, photo TEXT)"
+    )
+    sqlite_connection.execute(
+        "INSERT INTO users VALUES ('dbid:user', 'User', 'None')",
+    )
+    return UserProfileCache(sqlite_connection, 1, 3600)
+
+
+def test_user_profile_from_users_table(user_profiles):
+    """Unittests profile loaded from users table is served and should be refreshed"""
+    user_profile = user_profiles.get("dbid:user")
+
+    assert (user_profile.name, user_profile.avatar) == ("User", None)
+    assert user_profiles.is_stale(user_profile)
+    assert user_profiles.get("dbid:user") is user_profile
+    assert user_profiles.get("dbid:unknown") is None
+
+
+@pytest.mark.asyncio
+async def test_user_profile_refresh(user_profiles):
+    """Unittests refreshed profile is saved to users table only when it changed"""
+    user_profiles.get("dbid:user")
+    dropbox_client = ProfileDropboxClient("dbid:user", "User", "https://photo")
+
+    assert await user_profiles.refresh(dropbox_client)
+    assert not user_profiles.is_stale(user_profiles.get("dbid:user"))
+    assert not await user_profiles.refresh(dropbox_client)
+    assert dropbox_client.requests == 2
+
+    user_profiles.discard("dbid:user")
+
+    assert user_profiles.get("dbid:user").avatar == "https://photo"